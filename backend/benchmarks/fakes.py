@@ -0,0 +1,183 @@
+"""Local stand-ins for every external service the backend talks to.
+
+One threaded HTTP server plays all the upstreams:
+
+  GET  /article/<n>                 canned news page (large body, rich <head>)
+  GET  /img/<name>                  tiny preview image (og:image / Instagram thumbnail)
+  GET  /v1/post_info?url=…          RapidAPI Instagram response
+  POST /openai/v1/chat/completions  OpenAI-compatible chat completion
+  POST /gemini/generate             Gemini stand-in
+  POST /meta/<phone-id>/messages    Meta Graph WhatsApp send (message sink)
+
+LLM endpoints sleep for a configurable latency before answering, and can be
+told to fail a share of requests.
+"""
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+
+ARTICLE_BODY = "".join(
+    f"<p>Paragraph {i}: the benchmark article talks about distributed systems, queues and latency budgets.</p>"
+    for i in range(2000)
+)
+
+ARTICLE_TEMPLATE = """<!doctype html><html><head>
+<title>Benchmark article {n}</title>
+<meta property="og:title" content="Scaling queues, part {n}">
+<meta property="og:description" content="{description}">
+<meta property="og:image" content="http://{host}/img/{n}.jpg">
+<meta name="author" content="Bench Writer">
+</head><body><nav>Home | About | Subscribe</nav>{body}</body></html>"""
+
+# 1×1 GIF
+PIXEL = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+
+DESCRIPTION = (
+    "A long-form look at how durable job queues, leases and exponential backoff keep an "
+    "enrichment pipeline healthy under load, with measurements from a production system."
+)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Listen backlog; the default of 5 makes bursts of concurrent sends fail
+    request_queue_size = 1024
+
+
+class FakeUpstreams:
+    def __init__(self, llm_latency: float = 0.2, llm_error_rate: float = 0.0):
+        self.llm_latency = llm_latency
+        self.llm_error_rate = llm_error_rate
+        self.counts: dict[str, int] = {}
+        self.messages: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstreams":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _handler_class(self):
+        fakes = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                # One request per connection: the threaded server drops idle
+                # keep-alive connections, which pooled clients then hit as
+                # ReadError on their next request
+                self.close_connection = True
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # scraper stopped reading early — expected
+
+            def _json(self, payload: dict, status: int = 200):
+                self._send(status, json.dumps(payload).encode(), "application/json")
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path.startswith("/article/"):
+                    fakes._count("article")
+                    n = parsed.path.rsplit("/", 1)[-1]
+                    html = ARTICLE_TEMPLATE.format(
+                        n=n, host=self.headers.get("Host", ""), description=DESCRIPTION, body=ARTICLE_BODY
+                    )
+                    self._send(200, html.encode(), "text/html; charset=utf-8")
+                elif parsed.path.startswith("/img/"):
+                    fakes._count("image")
+                    self._send(200, PIXEL, "image/gif")
+                elif parsed.path == "/v1/post_info":
+                    fakes._count("instagram")
+                    url = parse_qs(parsed.query).get("url", [""])[0]
+                    self._json({"data": {
+                        "caption": f"Leg day routine 💪 squats, lunges and deadlifts #fitness #gym ({url})",
+                        "thumbnail_url": f"{fakes.base_url}/img/ig.jpg",
+                        "owner": {"username": "bench_athlete"},
+                    }})
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                path = urlparse(self.path).path
+                if path in ("/openai/v1/chat/completions", "/gemini/generate"):
+                    provider = "openai" if path.startswith("/openai") else "gemini"
+                    fakes._count(provider)
+                    time.sleep(fakes.llm_latency)
+                    if random.random() < fakes.llm_error_rate:
+                        self._json({"error": "overloaded"}, status=503)
+                        return
+                    content = json.dumps({
+                        "title": "Scaling queues under load",
+                        "summary": "How durable queues and backoff keep pipelines healthy.",
+                        "category": "Coding",
+                        "tags": ["queues", "latency", "backend"],
+                    })
+                    self._json({"choices": [{"message": {"content": content}}]})
+                elif path.endswith("/messages"):
+                    fakes._count("whatsapp")
+                    with fakes._lock:
+                        fakes.messages.append(payload)
+                    self._json({"messages": [{"id": "wamid.bench"}]})
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+        return Handler
+
+
+def make_llm_provider(base_url: str, path: str):
+    """Provider coroutine that talks to a fake LLM endpoint over real HTTP,
+    mirroring what the SDK-based providers do (prompt build → call → parse)."""
+    from services.ai_synthesizer import _build_prompt, _parse_ai_response
+
+    client = httpx.AsyncClient(base_url=base_url, timeout=30)
+
+    async def provider(raw_text: str, url: str):
+        resp = await client.post(path, json={"messages": [{"role": "user", "content": _build_prompt(raw_text, url)}]})
+        resp.raise_for_status()
+        return _parse_ai_response(resp.json()["choices"][0]["message"]["content"])
+
+    return provider
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a dashboard WebSocket client."""
+
+    def __init__(self):
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.received += 1
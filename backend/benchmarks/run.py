@@ -0,0 +1,308 @@
+"""End-to-end benchmark suite: the real FastAPI app against local fakes.
+
+    cd backend
+    python -m benchmarks.run                          # writes benchmarks/results/latest.json
+    python -m benchmarks.run --baseline benchmarks/results/baseline.json
+    python -m benchmarks.run --storage sqlite         # same suite on the SQLite backend
+
+Measures webhook throughput, end-to-end enrichment latency percentiles,
+WebSocket fan-out time and in-memory storage cost per 10k links. The job
+queue is drained between phases so each one measures only its own work, and
+failed WhatsApp replies are reported next to the results. With
+--baseline, exits non-zero when any metric regresses by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from benchmarks.fakes import FakeUpstreams, FakeWebSocket, make_llm_provider
+
+# Direction of each metric, for regression checks
+HIGHER_IS_BETTER = {"webhook_rps"}
+
+
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "p50_ms": round(pct(0.50) * 1000, 2),
+        "p95_ms": round(pct(0.95) * 1000, 2),
+        "p99_ms": round(pct(0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+    }
+
+
+def _configure_env(fakes: FakeUpstreams, workers: int, workdir: str, storage: str):
+    """Point every external integration at the fakes. Must run before the app is imported."""
+    os.environ.update({
+        "SUPABASE_URL": "",
+        "STORAGE_BACKEND": storage,  # memory | sqlite
+        "SQLITE_PATH": os.path.join(workdir, "links.db"),
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.db"),
+        "JOB_WORKERS": str(workers),
+        "JOB_POLL_INTERVAL": "0.5",
+        "RAPIDAPI_KEY": "bench",
+        "RAPIDAPI_BASE_URL": fakes.base_url,
+        "WEBHOOK_PROVIDER": "meta",
+        "META_ACCESS_TOKEN": "bench",
+        "META_PHONE_NUMBER_ID": "bench-phone",
+        "META_GRAPH_BASE_URL": f"{fakes.base_url}/meta",
+        "AI_PROVIDER": "openai",
+        "OPENAI_API_KEY": "bench",
+        "GEMINI_API_KEY": "bench",
+        "SCRAPE_PARSE_EXECUTOR": "thread",
+        "INGEST_RATE_PER_MIN": "0",  # measure the pipeline, not admission control
+    })
+
+
+async def bench_webhook(client, requests: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with sem:
+            start = time.perf_counter()
+            resp = await client.post("/webhook/twilio", data={
+                "From": f"whatsapp:+1555{i % 50:07d}",
+                "Body": f"save this https://www.instagram.com/p/BENCH{i}/",
+            })
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {"requests": requests, "webhook_rps": round(requests / elapsed, 1), **_percentiles(latencies)}
+
+
+async def drain_queue(timeout: float) -> float:
+    """Wait until the job queue is empty, so the next phase doesn't measure the
+    previous phase's backlog. Returns the seconds it took."""
+    from services import job_queue
+
+    start = time.perf_counter()
+    while await job_queue.backlog(max_age=0) and time.perf_counter() - start < timeout:
+        await asyncio.sleep(0.1)
+    return time.perf_counter() - start
+
+
+async def bench_enrichment(client, manager, base_url: str, links: int, timeout: float) -> dict:
+    """Time from POST /links until the pipeline broadcasts link_updated."""
+    submitted: dict[str, float] = {}
+    finished: dict[str, float] = {}
+    all_done = asyncio.Event()
+    original = manager.broadcast
+
+    async def recording_broadcast(data: dict):
+        if data.get("type") == "link_updated":
+            link_id = (data.get("data") or {}).get("id")
+            if link_id in submitted:
+                finished[link_id] = time.perf_counter()
+                if len(finished) == links:
+                    all_done.set()
+        await original(data)
+
+    manager.broadcast = recording_broadcast
+    try:
+        start = time.perf_counter()
+        for i in range(links):
+            t0 = time.perf_counter()
+            resp = await client.post("/links/", json={"url": f"{base_url}/article/{i}"})
+            resp.raise_for_status()
+            submitted[resp.json()["id"]] = t0
+        try:
+            await asyncio.wait_for(all_done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+    finally:
+        manager.broadcast = original
+
+    latencies = [finished[i] - submitted[i] for i in finished]
+    return {
+        "links": links,
+        "completed": len(finished),
+        "enrich_throughput_per_s": round(len(finished) / elapsed, 1),
+        **_percentiles(latencies),
+    }
+
+
+async def bench_ws_fanout(manager_cls, clients: int, rounds: int) -> dict:
+    manager = manager_cls()
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    for ws in sockets:
+        manager.active_connections.append(ws)
+    payload = {"type": "link_updated", "data": {"id": str(uuid.uuid4()), "title": "x" * 80, "summary": "y" * 300}}
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await manager.broadcast(payload)
+        timings.append(time.perf_counter() - start)
+    return {"clients": clients, "rounds": rounds, **_percentiles(timings)}
+
+
+async def bench_memory(db, links: int = 10_000) -> dict:
+    rows = [{
+        "id": str(uuid.uuid4()),
+        "raw_url": f"https://example.com/articles/{i}",
+        "source": "web",
+        "title": f"A reasonably descriptive article title number {i}",
+        "summary": "Two or three sentences of AI-written summary describing what the saved link is about. " * 2,
+        "category": "Coding",
+        "tags": ["python", "async", "backend", "queues"],
+        "thumbnail_url": f"https://cdn.example.com/img/{i}.jpg",
+        "author": "Bench Writer",
+        "sender_phone": "+15550000000",
+        "processed": True,
+    } for i in range(links)]
+    before = len(db._demo_store)
+    tracemalloc.start()
+    snapshot_start = tracemalloc.take_snapshot()
+    await db.insert_links(rows)
+    snapshot_end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snapshot_end.compare_to(snapshot_start, "filename")
+    allocated = sum(s.size_diff for s in stats)
+    ids = {r["id"] for r in rows}
+    db._demo_store[:] = [l for l in db._demo_store if l["id"] not in ids]
+    db.rebuild_sender_index()
+    assert len(db._demo_store) == before
+    return {"links": links, "mb_per_10k_links": round(allocated / links * 10_000 / 1e6, 2)}
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return ""
+
+
+def _flatten(results: dict) -> dict:
+    flat = {}
+    for group, values in results.items():
+        if isinstance(values, dict):
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and (key.endswith("_ms") or key in HIGHER_IS_BETTER or key.startswith("mb_") or key.endswith("_per_s")):
+                    flat[f"{group}.{key}"] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    cur, base = _flatten(current["results"]), _flatten(baseline["results"])
+    for key, old in base.items():
+        new = cur.get(key)
+        if new is None or not old:
+            continue
+        higher_better = key.split(".")[-1] in HIGHER_IS_BETTER or key.endswith("_per_s")
+        change = (old - new) / old if higher_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{key}: {old} → {new} ({change:+.0%} worse)")
+    return regressions
+
+
+async def run(args) -> dict:
+    fakes = FakeUpstreams(llm_latency=args.llm_latency_ms / 1000, llm_error_rate=args.llm_error_rate).start()
+    _configure_env(fakes, args.workers, tempfile.mkdtemp(prefix="bench-"), args.storage)
+
+    import httpx
+    import main
+    from db import supabase_client as db
+    from services import ai_synthesizer, metrics
+
+    ai_synthesizer.PROVIDERS["openai"] = make_llm_provider(fakes.base_url, "/openai/v1/chat/completions")
+    ai_synthesizer.PROVIDERS["gemini"] = make_llm_provider(fakes.base_url, "/gemini/generate")
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                print(f"[Bench] webhook throughput ({args.webhook_requests} requests)…")
+                results["webhook"] = await bench_webhook(client, args.webhook_requests, args.concurrency)
+                drained = await drain_queue(args.timeout)
+                results["webhook"]["drain_ms"] = round(drained * 1000, 2)
+                print(f"[Bench] end-to-end enrichment ({args.links} links)…")
+                results["enrichment"] = await bench_enrichment(
+                    client, main.manager, fakes.base_url, args.links, args.timeout
+                )
+                # Failed replies mean the benchmarked path wasn't the healthy one
+                results["whatsapp"] = {
+                    "sent": fakes.counts.get("whatsapp", 0),
+                    "send_errors": int(metrics.errors("whatsapp")),
+                }
+        print(f"[Bench] WebSocket fan-out ({args.ws_clients} clients)…")
+        results["ws_fanout"] = await bench_ws_fanout(main.ConnectionManager, args.ws_clients, rounds=20)
+        if args.storage == "memory":
+            print("[Bench] memory per 10k links…")
+            results["memory"] = await bench_memory(db)
+    finally:
+        fakes.stop()
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_sha": _git_sha(),
+        "python": platform.python_version(),
+        "config": {
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "storage": args.storage,
+        },
+        "upstream_calls": fakes.counts,
+        "results": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Social Saver end-to-end benchmarks")
+    parser.add_argument("--webhook-requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--links", type=int, default=200, help="links pushed through the full enrichment pipeline")
+    parser.add_argument("--workers", type=int, default=16, help="job queue workers")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory", help="storage backend under test")
+    parser.add_argument("--ws-clients", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120, help="max seconds to wait for enrichment to drain")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "latest.json"))
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression ratio")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"[Bench] Results written to {args.out}")
+    if report["results"]["whatsapp"]["send_errors"]:
+        print(f"[Bench] Warning: {report['results']['whatsapp']['send_errors']} WhatsApp send(s) failed")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("[Bench] Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("[Bench] No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main_cli()
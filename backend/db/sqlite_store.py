@@ -0,0 +1,435 @@
+"""Embedded SQLite storage backend (STORAGE_BACKEND=sqlite).
+
+Durable local storage for single-node installs and load tests: the same
+`links` schema and indexes as MIGRATION_SQL, in WAL mode so readers never
+block the writer. The functions here mirror the public API of
+db.supabase_client, which routes to them when this backend is selected.
+
+- Reads run on a small thread pool (SQLITE_READ_THREADS), one connection per
+  thread, so the event loop never waits on disk.
+- Writes go to a single writer thread that group-commits: whatever writes
+  are queued when it wakes up run in one transaction (each in its own
+  savepoint, so one failing write doesn't undo the others), paying for one
+  WAL sync instead of one per write.
+- All SQL is parameterised and constant per call shape, so sqlite3's
+  per-connection statement cache reuses the prepared statements.
+"""
+import os
+import json
+import queue
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from services.response_cache import links_cache
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "social_saver.db")
+SQLITE_READ_THREADS = int(os.getenv("SQLITE_READ_THREADS", "4"))
+SQLITE_WRITE_BATCH = int(os.getenv("SQLITE_WRITE_BATCH", "256"))  # max writes per transaction
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL: durable across app crashes
+
+COLUMNS = (
+    "id", "raw_url", "source", "title", "summary", "category", "tags", "thumbnail_url",
+    "thumbnail_source", "author", "sender_phone", "processed", "created_at", "updated_at", "deleted_at",
+)
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS links (
+  id            TEXT PRIMARY KEY,
+  raw_url       TEXT NOT NULL,
+  source        TEXT NOT NULL DEFAULT 'unknown',
+  title         TEXT,
+  summary       TEXT,
+  category      TEXT,
+  tags          TEXT NOT NULL DEFAULT '[]',  -- JSON array
+  thumbnail_url TEXT,
+  thumbnail_source TEXT,
+  author        TEXT,
+  sender_phone  TEXT,
+  processed     INTEGER NOT NULL DEFAULT 0,
+  created_at    TEXT NOT NULL,
+  updated_at    TEXT NOT NULL,
+  deleted_at    TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_links_category ON links(category);
+CREATE INDEX IF NOT EXISTS idx_links_created_at ON links(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_links_sender_created ON links(sender_phone, created_at DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_links_sender_category ON links(sender_phone, category) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_links_updated_at ON links(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_links_raw_url ON links(raw_url) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_links_thumbnail ON links(thumbnail_url) WHERE thumbnail_url LIKE '/thumbs/%';
+CREATE INDEX IF NOT EXISTS idx_links_unprocessed ON links(created_at) WHERE processed = 0 AND deleted_at IS NULL;
+"""
+
+# Columns added after the first release: (name, type) added to older files on open
+ADDED_COLUMNS = (("thumbnail_source", "TEXT"),)
+
+INSERT_SQL = f"INSERT INTO links ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+# ── Connections ──────────────────────────────────────────────────────
+_schema_lock = threading.Lock()
+_schema_ready = False
+_local = threading.local()
+_reader_conns: list[sqlite3.Connection] = []
+_read_pool: ThreadPoolExecutor | None = None
+_writer: "_Writer | None" = None
+_start_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    global _schema_ready
+    conn = sqlite3.connect(SQLITE_PATH, check_same_thread=False, isolation_level=None, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    with _schema_lock:
+        if not _schema_ready:
+            conn.execute("PRAGMA journal_mode = WAL")
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(links)")}
+            if existing:
+                for name, kind in ADDED_COLUMNS:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE links ADD COLUMN {name} {kind}")
+            conn.executescript(SCHEMA_SQL)
+            _schema_ready = True
+    return conn
+
+
+def _reader_conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+        _reader_conns.append(conn)
+    return conn
+
+
+class _Writer(threading.Thread):
+    """Single writer thread with group commit."""
+
+    _STOP = object()
+
+    def __init__(self, conn: sqlite3.Connection):
+        super().__init__(name="sqlite-writer", daemon=True)
+        self._conn = conn
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    def submit(self, fn) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((fn, loop, future))
+        return future
+
+    def stop(self):
+        self._queue.put(self._STOP)
+        self.join()
+
+    def run(self):
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is self._STOP:
+                    break
+                batch = [item]
+                while len(batch) < SQLITE_WRITE_BATCH:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._run_batch(self._conn, batch)
+        finally:
+            self._conn.close()
+            # Never leave a caller awaiting a write that will not run
+            error = RuntimeError("SQLite writer stopped")
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not self._STOP:
+                    _fn, loop, future = item
+                    loop.call_soon_threadsafe(_resolve, future, None, error)
+
+    @staticmethod
+    def _run_batch(conn: sqlite3.Connection, batch: list):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, loop, future in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((loop, future, fn(conn), None))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((loop, future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(loop, future, None, e) for _, loop, future in batch]
+        for loop, future, result, error in results:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+
+def _resolve(future: asyncio.Future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _start():
+    global _read_pool, _writer
+    with _start_lock:
+        if _writer is None:
+            # Opened here so a bad path or a locked file raises to the caller
+            # instead of killing the writer thread with writes queued behind it
+            _writer = _Writer(_connect())
+            _writer.start()
+            _read_pool = ThreadPoolExecutor(SQLITE_READ_THREADS, thread_name_prefix="sqlite-read")
+
+
+async def _read(fn):
+    """Run `fn(conn)` on the read pool."""
+    if _writer is None:
+        _start()
+    return await asyncio.get_running_loop().run_in_executor(_read_pool, lambda: fn(_reader_conn()))
+
+
+async def _write(fn):
+    """Run `fn(conn)` inside the writer's next group-commit transaction."""
+    if _writer is None:
+        _start()
+    return await _writer.submit(fn)
+
+
+def shutdown():
+    """Flush pending writes and close connections (app shutdown, tests)."""
+    global _read_pool, _writer, _schema_ready
+    with _start_lock:
+        if _writer is not None:
+            _writer.stop()
+            _read_pool.shutdown(wait=True)
+            _writer, _read_pool = None, None
+        for conn in _reader_conns:
+            conn.close()
+        _reader_conns.clear()
+        _schema_ready = False
+
+
+# ── Row mapping ──────────────────────────────────────────────────────
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _to_dict(row: sqlite3.Row) -> dict:
+    d = dict(row)
+    if "tags" in d:
+        d["tags"] = json.loads(d["tags"] or "[]")
+    if "processed" in d:
+        d["processed"] = bool(d["processed"])
+    return d
+
+
+def _params(record: dict) -> tuple:
+    return tuple(
+        json.dumps(record.get("tags") or []) if col == "tags"
+        else int(bool(record.get("processed"))) if col == "processed"
+        else getattr(record.get(col), "value", record.get(col))  # enums → plain strings
+        for col in COLUMNS
+    )
+
+
+def _record(data: dict, now: str) -> dict:
+    created = data.get("created_at") or now
+    return {"source": "unknown", "tags": [], "processed": False, **data, "created_at": created, "updated_at": created}
+
+
+def _select(fields: list[str] | None) -> str:
+    cols = [c for c in (fields or COLUMNS) if c in COLUMNS]  # whitelist: names go into SQL
+    return ", ".join(cols)
+
+
+def _where(clauses: list[str]) -> str:
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def _scan_filters(since, until, category, processed) -> tuple[list[str], list]:
+    clauses, params = ["deleted_at IS NULL"], []
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("created_at < ?")
+        params.append(until)
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    if processed is not None:
+        clauses.append("processed = ?")
+        params.append(int(processed))
+    return clauses, params
+
+
+# ── Public API (mirrors db.supabase_client) ─────────────────────────
+async def insert_link(data: dict) -> dict:
+    record = _record(data, _now())
+    await _write(lambda conn: conn.execute(INSERT_SQL, _params(record)))
+    links_cache.invalidate_lists()
+    return record
+
+
+async def insert_links(rows: list[dict]) -> list[dict]:
+    if not rows:
+        return []
+    now = _now()
+    records = [_record(row, now) for row in rows]
+    await _write(lambda conn: conn.executemany(INSERT_SQL, [_params(r) for r in records]))
+    links_cache.invalidate_lists()
+    return records
+
+
+async def get_links(
+    limit: int = 100,
+    offset: int = 0,
+    category: str | None = None,
+    fields: list[str] | None = None,
+    sender: str | None = None,
+) -> list[dict]:
+    clauses, params = ["deleted_at IS NULL"], []
+    if sender:
+        clauses.append("sender_phone = ?")
+        params.append(sender)
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    sql = f"SELECT {_select(fields)} FROM links{_where(clauses)} ORDER BY created_at DESC LIMIT ? OFFSET ?"
+    rows = await _read(lambda conn: conn.execute(sql, (*params, limit, offset)).fetchall())
+    return [_to_dict(r) for r in rows]
+
+
+async def scan_links(
+    after: tuple[str, str] | None = None,
+    limit: int = 500,
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    processed: bool | None = None,
+    newest_first: bool = False,
+) -> list[dict]:
+    clauses, params = _scan_filters(since, until, category, processed)
+    if after:
+        clauses.append(f"(created_at, id) {'<' if newest_first else '>'} (?, ?)")
+        params.extend(after)
+    order = "created_at DESC, id DESC" if newest_first else "created_at, id"
+    sql = f"SELECT * FROM links{_where(clauses)} ORDER BY {order} LIMIT ?"
+    rows = await _read(lambda conn: conn.execute(sql, (*params, limit)).fetchall())
+    return [_to_dict(r) for r in rows]
+
+
+async def count_links(
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    processed: bool | None = None,
+) -> int:
+    clauses, params = _scan_filters(since, until, category, processed)
+    sql = f"SELECT COUNT(*) FROM links{_where(clauses)}"
+    return await _read(lambda conn: conn.execute(sql, params).fetchone()[0])
+
+
+async def get_existing_urls(urls: list[str]) -> set[str]:
+    def lookup(conn):
+        found = set()
+        for start in range(0, len(urls), 500):
+            chunk = urls[start: start + 500]
+            sql = f"SELECT raw_url FROM links WHERE raw_url IN ({', '.join('?' * len(chunk))}) AND deleted_at IS NULL"
+            found.update(row[0] for row in conn.execute(sql, chunk))
+        return found
+    return await _read(lookup)
+
+
+async def get_link_by_id(link_id: str) -> dict | None:
+    row = await _read(lambda conn: conn.execute(
+        "SELECT * FROM links WHERE id = ? AND deleted_at IS NULL", (link_id,)
+    ).fetchone())
+    return _to_dict(row) if row else None
+
+
+async def update_link(link_id: str, data: dict) -> dict:
+    record = {k: v for k, v in data.items() if k in COLUMNS and k not in ("id", "created_at")}
+    record["updated_at"] = _now()
+    ordered = [c for c in COLUMNS if c in record]
+    values = [v for c, v in zip(COLUMNS, _params(record)) if c in record]
+    sql = (
+        f"UPDATE links SET {', '.join(f'{c} = ?' for c in ordered)} "
+        "WHERE id = ? AND deleted_at IS NULL RETURNING *"
+    )
+    row = await _write(lambda conn: conn.execute(sql, (*values, link_id)).fetchone())
+    links_cache.invalidate_link(link_id)
+    return _to_dict(row) if row else {}
+
+
+async def get_thumbnail_source(digest: str) -> str | None:
+    row = await _read(lambda conn: conn.execute(
+        "SELECT thumbnail_source FROM links WHERE thumbnail_url = ? AND thumbnail_source IS NOT NULL LIMIT 1",
+        (f"/thumbs/{digest}",),
+    ).fetchone())
+    return row[0] if row else None
+
+
+async def delete_link(link_id: str) -> bool:
+    now = _now()
+    count = await _write(lambda conn: conn.execute(
+        "UPDATE links SET deleted_at = ?, updated_at = ? WHERE id = ? AND deleted_at IS NULL",
+        (now, now, link_id),
+    ).rowcount)
+    links_cache.invalidate_link(link_id)
+    return count > 0
+
+
+async def get_change_cutoff(settle_seconds: float) -> str:
+    # Rows are stamped by this process (_now), so its clock is the right one
+    return (datetime.utcnow() - timedelta(seconds=settle_seconds)).isoformat()
+
+
+async def get_changes(after: tuple[str, str] | None = None, until: str | None = None, limit: int = 500) -> list[dict]:
+    clauses, params = [], []
+    if until:
+        clauses.append("updated_at < ?")
+        params.append(until)
+    if after:
+        clauses.append("(updated_at, id) > (?, ?)")
+        params.extend(after)
+    sql = f"SELECT * FROM links{_where(clauses)} ORDER BY updated_at, id LIMIT ?"
+    rows = await _read(lambda conn: conn.execute(sql, (*params, limit)).fetchall())
+    return [_to_dict(r) for r in rows]
+
+
+async def purge_tombstones(before: str) -> int:
+    return await _write(lambda conn: conn.execute(
+        "DELETE FROM links WHERE deleted_at IS NOT NULL AND deleted_at < ?", (before,)
+    ).rowcount)
+
+
+async def get_forgotten_gems(days_ago: int = 30, sender: str | None = None) -> list[dict]:
+    cutoff = (datetime.utcnow() - timedelta(days=days_ago)).isoformat()
+    clauses, params = ["deleted_at IS NULL", "processed = 1", "created_at < ?"], [cutoff]
+    if sender:
+        clauses.append("sender_phone = ?")
+        params.append(sender)
+    sql = f"SELECT * FROM links{_where(clauses)}"
+    rows = await _read(lambda conn: conn.execute(sql, params).fetchall())
+    return [_to_dict(r) for r in rows]
@@ -1,7 +1,11 @@
 import os
 import uuid
-from datetime import datetime
+import functools
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from services.metrics import track
+from services.response_cache import links_cache
+from db import sqlite_store
 
 load_dotenv()
 
@@ -23,6 +27,39 @@ _demo_store: list[dict] = [
     } for i in range(1, 41)
 ]
 
+# Per-sender buckets over the same row dicts, newest first, so one person's
+# dashboard doesn't walk everyone's links (mirrors idx_links_sender_created).
+_demo_by_sender: dict[str, list[dict]] = {}
+
+
+def rebuild_sender_index():
+    """Rebuild the demo per-sender buckets from `_demo_store`. Call after
+    replacing or filtering the store wholesale (tests, benchmarks)."""
+    _demo_by_sender.clear()
+    for row in _demo_store:
+        _demo_by_sender.setdefault(row.get("sender_phone") or "", []).append(row)
+
+
+def _replace_in_sender_index(old: dict, new: dict):
+    if (old.get("sender_phone") or "") != (new.get("sender_phone") or ""):
+        # Moved to another sender: rebuild so the new bucket keeps store order
+        rebuild_sender_index()
+        return
+    bucket = _demo_by_sender.get(old.get("sender_phone") or "", [])
+    for i, row in enumerate(bucket):
+        if row is old:
+            bucket[i] = new
+            return
+
+
+def _demo_rows(sender: str | None) -> list[dict]:
+    """Demo rows saved by `sender`, or every row when it is None or "" — the
+    same truthiness test the Supabase and SQLite filters use."""
+    return _demo_by_sender.get(sender, []) if sender else _demo_store
+
+
+rebuild_sender_index()
+
 _use_demo_mode = True  # Flipped to False when real Supabase is connected
 
 try:
@@ -34,10 +71,41 @@ except ImportError:
 _client = None
 
 
+# auto: Supabase when configured, else the in-memory demo store.
+# sqlite: durable local storage in db/sqlite_store.py.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "auto")  # auto | supabase | memory | sqlite
+
+
 def _is_demo_mode() -> bool:
     """Return True if Supabase is not configured (placeholder values)."""
+    if STORAGE_BACKEND in ("supabase", "sqlite"):
+        return False
     url = os.getenv("SUPABASE_URL", "")
-    return not url or "placeholder" in url or not _supabase_available
+    return STORAGE_BACKEND == "memory" or not url or "placeholder" in url or not _supabase_available
+
+
+def storage_backend() -> str:
+    if STORAGE_BACKEND == "sqlite":
+        return "sqlite"
+    return "memory" if _is_demo_mode() else "supabase"
+
+
+def _timed(fn):
+    """Record latency/errors of a data-layer call under stage="db". With
+    STORAGE_BACKEND=sqlite the call goes to the same-named sqlite_store function."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        backend = storage_backend()
+        with track("db", backend, fn.__name__):
+            if backend == "sqlite":
+                return await getattr(sqlite_store, fn.__name__)(*args, **kwargs)
+            return await fn(*args, **kwargs)
+    return wrapper
+
+
+def _live(rows: list[dict]) -> list[dict]:
+    """Demo-store rows that aren't soft-deleted tombstones."""
+    return [l for l in rows if not l.get("deleted_at")]
 
 
 def get_supabase():
@@ -49,23 +117,70 @@ def get_supabase():
     return _client
 
 
+@_timed
 async def insert_link(data: dict) -> dict:
     if _is_demo_mode():
-        record = {**data, "created_at": data.get("created_at", datetime.utcnow().isoformat())}
+        created = data.get("created_at", datetime.utcnow().isoformat())
+        record = {**data, "created_at": created, "updated_at": created}
         _demo_store.insert(0, record)
+        _demo_by_sender.setdefault(record.get("sender_phone") or "", []).insert(0, record)
+        links_cache.invalidate_lists()
         return record
     sb = get_supabase()
     result = sb.table("links").insert(data).execute()
+    links_cache.invalidate_lists()
     return result.data[0] if result.data else {}
 
 
-async def get_links(limit: int = 100, offset: int = 0) -> list[dict]:
+@_timed
+async def insert_links(rows: list[dict]) -> list[dict]:
+    """Insert many links with a single multi-row insert (one round trip)."""
+    if not rows:
+        return []
     if _is_demo_mode():
-        return _demo_store[offset: offset + limit]
+        now = datetime.utcnow().isoformat()
+        records = [
+            {**row, "created_at": row.get("created_at", now), "updated_at": row.get("created_at", now)}
+            for row in rows
+        ]
+        # Newest first, same ordering as repeated insert_link calls
+        _demo_store[:0] = records[::-1]
+        for record in records:
+            _demo_by_sender.setdefault(record.get("sender_phone") or "", []).insert(0, record)
+        links_cache.invalidate_lists()
+        return records
     sb = get_supabase()
+    result = sb.table("links").insert(rows).execute()
+    links_cache.invalidate_lists()
+    return result.data or []
+
+
+@_timed
+async def get_links(
+    limit: int = 100,
+    offset: int = 0,
+    category: str | None = None,
+    fields: list[str] | None = None,
+    sender: str | None = None,
+) -> list[dict]:
+    """Newest links first, optionally only those saved by `sender` (sender_phone).
+    `fields` limits the columns returned (None = all)."""
+    if _is_demo_mode():
+        rows = _live(_demo_rows(sender))
+        if category is not None:
+            rows = [l for l in rows if l.get("category") == category]
+        rows = rows[offset: offset + limit]
+        if fields:
+            rows = [{f: l.get(f) for f in fields} for l in rows]
+        return rows
+    sb = get_supabase()
+    query = sb.table("links").select(",".join(fields) if fields else "*").is_("deleted_at", "null")
+    if sender:
+        query = query.eq("sender_phone", sender)
+    if category:
+        query = query.eq("category", category)
     result = (
-        sb.table("links")
-        .select("*")
+        query
         .order("created_at", desc=True)
         .range(offset, offset + limit - 1)
         .execute()
@@ -73,56 +188,271 @@ async def get_links(limit: int = 100, offset: int = 0) -> list[dict]:
     return result.data or []
 
 
+def _matches_scan(l: dict, since, until, category, processed) -> bool:
+    created = l.get("created_at", "")
+    return (
+        not l.get("deleted_at")
+        and (since is None or created >= since)
+        and (until is None or created < until)
+        and (category is None or l.get("category") == category)
+        and (processed is None or bool(l.get("processed")) == processed)
+    )
+
+
+@_timed
+async def scan_links(
+    after: tuple[str, str] | None = None,
+    limit: int = 500,
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    processed: bool | None = None,
+    newest_first: bool = False,
+) -> list[dict]:
+    """Keyset-paginate links oldest first (or newest first), ordered by (created_at, id).
+
+    `after` is the (created_at, id) of the last row of the previous page, so
+    scans stay stable and cheap however deep they go (used by the backfill runner).
+    """
+    if _is_demo_mode():
+        rows = sorted(
+            (l for l in _demo_store if _matches_scan(l, since, until, category, processed)),
+            key=lambda l: (l.get("created_at", ""), l["id"]),
+            reverse=newest_first,
+        )
+        if after:
+            after = tuple(after)
+            rows = [
+                l for l in rows
+                if ((l.get("created_at", ""), l["id"]) < after if newest_first else (l.get("created_at", ""), l["id"]) > after)
+            ]
+        return rows[:limit]
+    sb = get_supabase()
+    query = sb.table("links").select("*").is_("deleted_at", "null")
+    if since:
+        query = query.gte("created_at", since)
+    if until:
+        query = query.lt("created_at", until)
+    if category:
+        query = query.eq("category", category)
+    if processed is not None:
+        query = query.eq("processed", processed)
+    op = "lt" if newest_first else "gt"
+    if after:
+        created, last_id = after
+        query = query.or_(f'created_at.{op}."{created}",and(created_at.eq."{created}",id.{op}.{last_id})')
+    result = (
+        query.order("created_at", desc=newest_first).order("id", desc=newest_first).limit(limit).execute()
+    )
+    return result.data or []
+
+
+@_timed
+async def count_links(
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    processed: bool | None = None,
+) -> int:
+    if _is_demo_mode():
+        return sum(1 for l in _demo_store if _matches_scan(l, since, until, category, processed))
+    sb = get_supabase()
+    query = sb.table("links").select("id", count="exact").is_("deleted_at", "null")
+    if since:
+        query = query.gte("created_at", since)
+    if until:
+        query = query.lt("created_at", until)
+    if category:
+        query = query.eq("category", category)
+    if processed is not None:
+        query = query.eq("processed", processed)
+    result = query.limit(1).execute()
+    return result.count or 0
+
+
+@_timed
+async def get_existing_urls(urls: list[str]) -> set[str]:
+    """The subset of `urls` already saved as live links (idx_links_raw_url), so
+    a retried import doesn't insert and enrich the same links again."""
+    if _is_demo_mode():
+        wanted = set(urls)
+        return {l["raw_url"] for l in _live(_demo_store) if l["raw_url"] in wanted}
+    sb = get_supabase()
+    found = set()
+    # Kept small: the list travels in the PostgREST query string
+    for start in range(0, len(urls), 100):
+        result = (
+            sb.table("links")
+            .select("raw_url")
+            .in_("raw_url", urls[start: start + 100])
+            .is_("deleted_at", "null")
+            .execute()
+        )
+        found.update(row["raw_url"] for row in result.data or [])
+    return found
+
+
+@_timed
 async def get_link_by_id(link_id: str) -> dict | None:
     if _is_demo_mode():
-        return next((l for l in _demo_store if l["id"] == link_id), None)
+        return next((l for l in _demo_store if l["id"] == link_id and not l.get("deleted_at")), None)
     sb = get_supabase()
-    result = sb.table("links").select("*").eq("id", link_id).execute()
+    result = sb.table("links").select("*").eq("id", link_id).is_("deleted_at", "null").execute()
     return result.data[0] if result.data else None
 
 
+@_timed
 async def update_link(link_id: str, data: dict) -> dict:
     if _is_demo_mode():
         for i, link in enumerate(_demo_store):
-            if link["id"] == link_id:
-                _demo_store[i] = {**link, **data}
+            if link["id"] == link_id and not link.get("deleted_at"):
+                _demo_store[i] = {**link, **data, "updated_at": datetime.utcnow().isoformat()}
+                _replace_in_sender_index(link, _demo_store[i])
+                links_cache.invalidate_link(link_id)
                 return _demo_store[i]
         return {}
     sb = get_supabase()
-    result = sb.table("links").update(data).eq("id", link_id).execute()
+    # updated_at is maintained by the links_set_updated_at trigger
+    result = sb.table("links").update(data).eq("id", link_id).is_("deleted_at", "null").execute()
+    links_cache.invalidate_link(link_id)
     return result.data[0] if result.data else {}
 
 
+@_timed
+async def get_thumbnail_source(digest: str) -> str | None:
+    """Source image URL of a link whose thumbnail is /thumbs/{digest}, for
+    refetching an image evicted from the thumbnail cache."""
+    path = f"/thumbs/{digest}"
+    if _is_demo_mode():
+        return next((l["thumbnail_source"] for l in _demo_store
+                     if l.get("thumbnail_url") == path and l.get("thumbnail_source")), None)
+    sb = get_supabase()
+    result = (
+        sb.table("links")
+        .select("thumbnail_source")
+        .eq("thumbnail_url", path)
+        .not_.is_("thumbnail_source", "null")
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]["thumbnail_source"] if result.data else None
+
+
+@_timed
 async def delete_link(link_id: str) -> bool:
+    """Soft delete: the row stays as a tombstone (deleted_at set) so the change
+    feed can tell clients about it, until purge_tombstones removes it."""
+    now = datetime.utcnow().isoformat()
     if _is_demo_mode():
-        before = len(_demo_store)
-        _demo_store[:] = [l for l in _demo_store if l["id"] != link_id]
-        return len(_demo_store) < before
+        for i, link in enumerate(_demo_store):
+            if link["id"] == link_id and not link.get("deleted_at"):
+                _demo_store[i] = {
+                    "id": link_id,
+                    "sender_phone": link.get("sender_phone"),
+                    "created_at": link.get("created_at", ""),
+                    "deleted_at": now,
+                    "updated_at": now,
+                }
+                _replace_in_sender_index(link, _demo_store[i])
+                links_cache.invalidate_link(link_id)
+                return True
+        return False
     sb = get_supabase()
     try:
-        result = sb.table("links").delete().eq("id", link_id).execute()
+        result = (
+            sb.table("links")
+            .update({"deleted_at": _utc(now)})
+            .eq("id", link_id)
+            .is_("deleted_at", "null")
+            .execute()
+        )
         return len(result.data) > 0
     except Exception as e:
         print(f"Error deleting link {link_id}: {e}")
         return False
+    finally:
+        links_cache.invalidate_link(link_id)
 
 
-async def get_forgotten_gems(days_ago: int = 30) -> list[dict]:
-    """Fetch links older than `days_ago` days for the Inspiration Roulette feature."""
+def _utc(ts: str) -> str:
+    """Naive UTC ISO timestamps (as generated here) → explicit offset for PostgREST."""
+    return ts if ts.endswith("Z") or "+" in ts[10:] else ts + "+00:00"
+
+
+def _changed_at(l: dict) -> str:
+    return l.get("updated_at") or l.get("created_at", "")
+
+
+@_timed
+async def get_change_cutoff(settle_seconds: float) -> str:
+    """Upper bound for a change-feed page: now minus `settle_seconds`, read from
+    the clock that stamps updated_at (the database's NOW() on Supabase), so app
+    clock skew can't hide changes."""
     if _is_demo_mode():
-        from datetime import timedelta
-        cutoff = (datetime.utcnow() - timedelta(days=days_ago)).isoformat()
-        return [l for l in _demo_store if l.get("processed") and l.get("created_at", "") < cutoff]
+        return (datetime.utcnow() - timedelta(seconds=settle_seconds)).isoformat()
+    result = get_supabase().rpc("links_change_cutoff", {"settle_seconds": settle_seconds}).execute()
+    return result.data
+
+
+@_timed
+async def get_changes(after: tuple[str, str] | None = None, until: str | None = None, limit: int = 500) -> list[dict]:
+    """Rows inserted, updated or soft-deleted after the keyset `after`, ordered
+    by (updated_at, id) and served by idx_links_updated_at. Tombstones come back
+    with `deleted_at` set. `until` excludes changes at or after that timestamp."""
+    if _is_demo_mode():
+        rows = [
+            l for l in _demo_store
+            if (after is None or (_changed_at(l), l["id"]) > tuple(after))
+            and (until is None or _changed_at(l) < until)
+        ]
+        rows.sort(key=lambda l: (_changed_at(l), l["id"]))
+        return rows[:limit]
+    sb = get_supabase()
+    query = sb.table("links").select("*")
+    if until:
+        query = query.lt("updated_at", _utc(until))
+    if after:
+        changed, last_id = after[0] and _utc(after[0]), after[1]
+        if last_id:
+            query = query.or_(f'updated_at.gt."{changed}",and(updated_at.eq."{changed}",id.gt.{last_id})')
+        else:
+            query = query.gte("updated_at", changed)
+    result = query.order("updated_at").order("id").limit(limit).execute()
+    return result.data or []
+
+
+@_timed
+async def purge_tombstones(before: str) -> int:
+    """Hard-delete tombstones whose deletion is older than `before`."""
+    if _is_demo_mode():
+        count = len(_demo_store)
+        _demo_store[:] = [l for l in _demo_store if not (l.get("deleted_at") and l["deleted_at"] < before)]
+        rebuild_sender_index()
+        return count - len(_demo_store)
     sb = get_supabase()
-    from datetime import datetime, timedelta
+    result = sb.table("links").delete().lt("deleted_at", _utc(before)).execute()
+    return len(result.data or [])
+
+
+@_timed
+async def get_forgotten_gems(days_ago: int = 30, sender: str | None = None) -> list[dict]:
+    """Fetch links older than `days_ago` days for the Inspiration Roulette feature."""
+    from datetime import timedelta
     cutoff = (datetime.utcnow() - timedelta(days=days_ago)).isoformat()
-    result = (
+    if _is_demo_mode():
+        rows = _demo_rows(sender)
+        return [l for l in _live(rows) if l.get("processed") and l.get("created_at", "") < cutoff]
+    sb = get_supabase()
+    query = (
         sb.table("links")
         .select("*")
         .lt("created_at", cutoff)
         .eq("processed", True)
-        .execute()
+        .is_("deleted_at", "null")
     )
+    if sender:
+        query = query.eq("sender_phone", sender)
+    result = query.execute()
     return result.data or []
 
 
@@ -139,12 +469,48 @@ CREATE TABLE IF NOT EXISTS links (
   category      TEXT,
   tags          TEXT[] DEFAULT '{}',
   thumbnail_url TEXT,
+  thumbnail_source TEXT,
   author        TEXT,
   sender_phone  TEXT,
   processed     BOOLEAN DEFAULT FALSE,
-  created_at    TIMESTAMPTZ DEFAULT NOW()
+  created_at    TIMESTAMPTZ DEFAULT NOW(),
+  updated_at    TIMESTAMPTZ DEFAULT NOW(),
+  deleted_at    TIMESTAMPTZ
 );
 
+-- Existing installs: add the change-feed columns. updated_at is added without
+-- a default so existing rows can be backfilled from created_at first.
+ALTER TABLE links ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE links ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+ALTER TABLE links ADD COLUMN IF NOT EXISTS thumbnail_source TEXT;
+UPDATE links SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE links ALTER COLUMN updated_at SET DEFAULT NOW();
+
 CREATE INDEX IF NOT EXISTS idx_links_category ON links(category);
 CREATE INDEX IF NOT EXISTS idx_links_created_at ON links(created_at DESC);
+-- Per-sender dashboards, roulette and export (live rows only)
+CREATE INDEX IF NOT EXISTS idx_links_sender_created ON links(sender_phone, created_at DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_links_sender_category ON links(sender_phone, category) WHERE deleted_at IS NULL;
+-- /thumbs cache misses: find the source URL of an evicted image
+CREATE INDEX IF NOT EXISTS idx_links_thumbnail ON links(thumbnail_url) WHERE thumbnail_url LIKE '/thumbs/%';
+-- Change feed: keyset scan over (updated_at, id), tombstones included
+CREATE INDEX IF NOT EXISTS idx_links_updated_at ON links(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_links_raw_url ON links(raw_url) WHERE deleted_at IS NULL;
+
+CREATE OR REPLACE FUNCTION links_set_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Change-feed cutoff on the database clock, the same clock that stamps updated_at
+CREATE OR REPLACE FUNCTION links_change_cutoff(settle_seconds DOUBLE PRECISION) RETURNS TIMESTAMPTZ AS $$
+  SELECT NOW() - make_interval(secs => settle_seconds);
+$$ LANGUAGE sql STABLE;
+
+DROP TRIGGER IF EXISTS links_set_updated_at ON links;
+CREATE TRIGGER links_set_updated_at
+  BEFORE UPDATE ON links
+  FOR EACH ROW EXECUTE FUNCTION links_set_updated_at();
 """
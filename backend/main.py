@@ -1,14 +1,27 @@
 # Trigger reload to load new pip dependencies  
+import time
+
+# Startup time is measured from here to ready, so this stays above every other
+# import: the imports below are part of what it measures.
+_IMPORT_STARTED = time.perf_counter()
+
 import json
 import asyncio
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from routers import webhook, links, export
+from routers import webhook, links, export, admin, thumbs
+from routers.webhook import process_link_pipeline
+from db.supabase_client import purge_tombstones
+from db import sqlite_store
+from services import job_queue, metrics, scraper, classifier, http_clients, warmup
+from services.responses import DefaultJSONResponse
 
 # ── WebSocket Connection Manager ─────────────────────────────────────
 class ConnectionManager:
@@ -18,22 +31,28 @@ class ConnectionManager:
     async def connect(self, ws: WebSocket):
         await ws.accept()
         self.active_connections.append(ws)
+        metrics.WS_CONNECTIONS.set(len(self.active_connections))
         print(f"[WS] Client connected. Total: {len(self.active_connections)}")
 
     def disconnect(self, ws: WebSocket):
         if ws in self.active_connections:
             self.active_connections.remove(ws)
+        metrics.WS_CONNECTIONS.set(len(self.active_connections))
         print(f"[WS] Client disconnected. Total: {len(self.active_connections)}")
 
     async def broadcast(self, data: dict):
+        start = time.perf_counter()
+        message = json.dumps(data)
         dead = []
         for connection in self.active_connections:
             try:
-                await connection.send_text(json.dumps(data))
+                await connection.send_text(message)
+                metrics.WS_MESSAGES.inc()
             except Exception:
                 dead.append(connection)
         for ws in dead:
             self.disconnect(ws)
+        metrics.WS_BROADCAST_LATENCY.observe(time.perf_counter() - start)
 
 
 manager = ConnectionManager()
@@ -42,7 +61,33 @@ manager = ConnectionManager()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.broadcast = manager.broadcast
+
+    async def run_job(job: dict):
+        await process_link_pipeline(
+            job["link_id"], job["url"], job["source"], job["sender"], manager.broadcast
+        )
+
+    retention = timedelta(days=links.TOMBSTONE_RETENTION_DAYS)
+    purged = await purge_tombstones((datetime.utcnow() - retention).isoformat())
+    if purged:
+        print(f"[DB] Purged {purged} expired tombstone(s)")
+    await classifier.train_from_store()
+    # Re-queue work interrupted by the previous process before taking traffic
+    await job_queue.recover()
+    if warmup.WARM_START:
+        for phase, seconds in (await warmup.warm_up()).items():
+            metrics.STARTUP_SECONDS.set(seconds, phase=phase)
+    job_queue.start_workers(run_job)
+    app.state.startup_seconds = round(time.perf_counter() - _IMPORT_STARTED, 3)
+    metrics.STARTUP_SECONDS.set(app.state.startup_seconds, phase="total")
+    app.state.ready = True
+    print(f"[Startup] Ready in {app.state.startup_seconds}s")
     yield
+    app.state.ready = False  # drain: stop taking new traffic while shutting down
+    await job_queue.stop_workers()
+    await http_clients.aclose_all()
+    scraper.shutdown_parse_executor()
+    sqlite_store.shutdown()
 
 
 # ── App Setup ────────────────────────────────────────────────────────
@@ -51,7 +96,9 @@ app = FastAPI(
     description="WhatsApp → AI → Knowledge Dashboard pipeline",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=DefaultJSONResponse,
 )
+app.state.ready = False
 
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +112,8 @@ app.add_middleware(
 app.include_router(webhook.router)
 app.include_router(links.router)
 app.include_router(export.router)
+app.include_router(admin.router)
+app.include_router(thumbs.router)
 
 
 # ── WebSocket Endpoint ───────────────────────────────────────────────
@@ -87,6 +136,21 @@ def health():
     return {"status": "ok", "service": "social-saver-backend"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until startup (recovery, warm-up, workers) has finished
+    and again while shutting down, so deploys only route traffic to warm workers."""
+    if not app.state.ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready", "startup_seconds": app.state.startup_seconds}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Per-stage latency/error/in-flight metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def root():
     return {"message": "Social Saver API 🔗", "docs": "/docs", "websocket": "/ws"}
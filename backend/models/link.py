@@ -38,13 +38,18 @@ class LinkRecord(BaseModel):
     summary: Optional[str] = None
     category: Optional[Category] = None
     tags: list[str] = []
-    thumbnail_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None  # /thumbs/{hash} once mirrored, else the source URL
+    thumbnail_source: Optional[str] = None  # original image URL, kept for refetching
     author: Optional[str] = None
     sender_phone: Optional[str] = None
     created_at: datetime
     processed: bool = False
 
 
+# Columns a client may request with `fields=` on list endpoints
+LINK_FIELDS = tuple(LinkRecord.model_fields)
+
+
 class AIResult(BaseModel):
     title: str
     summary: str
@@ -0,0 +1,86 @@
+import os
+import asyncio
+from fastapi import APIRouter, HTTPException, Header, Request
+from pydantic import BaseModel
+
+from services.backfill import BackfillRunner
+from services import classifier
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # unset = admin endpoints disabled
+
+_backfill: BackfillRunner | None = None
+_backfill_task: asyncio.Task | None = None
+
+
+def _check_token(token: str | None):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+class BackfillRequest(BaseModel):
+    name: str = "default"
+    stages: list[str] = ["scrape", "synthesize"]
+    since: str | None = None
+    until: str | None = None
+    category: str | None = None
+    processed: bool | None = None
+    concurrency: int = 4
+    rpm: float = 60
+
+
+@router.post("/backfill")
+async def start_backfill(req: BackfillRequest, request: Request, x_admin_token: str | None = Header(None)):
+    """Start (or resume, if a checkpoint with the same name exists) a re-enrichment backfill."""
+    global _backfill, _backfill_task
+    _check_token(x_admin_token)
+    if _backfill_task and not _backfill_task.done():
+        raise HTTPException(status_code=409, detail="A backfill is already running")
+    try:
+        _backfill = BackfillRunner(
+            name=req.name,
+            stages=tuple(req.stages),
+            since=req.since,
+            until=req.until,
+            category=req.category,
+            processed=req.processed,
+            concurrency=req.concurrency,
+            rpm=req.rpm,
+            broadcast_fn=request.app.state.broadcast,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _backfill_task = asyncio.create_task(_backfill.run())
+    return {"status": "started", "name": req.name}
+
+
+@router.get("/backfill")
+async def backfill_status(x_admin_token: str | None = Header(None)):
+    """Progress of the current/last backfill: counts, throughput and ETA."""
+    _check_token(x_admin_token)
+    if _backfill is None:
+        raise HTTPException(status_code=404, detail="No backfill has been started")
+    if _backfill_task and _backfill_task.done() and not _backfill_task.cancelled() and _backfill_task.exception():
+        return {**_backfill.progress(), "status": "error", "error": str(_backfill_task.exception())}
+    return _backfill.progress()
+
+
+@router.delete("/backfill")
+async def cancel_backfill(x_admin_token: str | None = Header(None)):
+    """Stop the running backfill; its checkpoint is kept so it can be resumed."""
+    _check_token(x_admin_token)
+    if not _backfill_task or _backfill_task.done():
+        raise HTTPException(status_code=404, detail="No backfill is running")
+    _backfill_task.cancel()
+    return {"status": "cancelling", "name": _backfill.name}
+
+
+@router.post("/classifier/train")
+async def train_classifier(x_admin_token: str | None = Header(None)):
+    """Retrain the local classifier from the links stored so far."""
+    _check_token(x_admin_token)
+    trained_on = await classifier.train_from_store()
+    return {"status": "trained" if trained_on else "skipped", "examples": trained_on}
@@ -1,13 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 from db.supabase_client import get_links
+from services.responses import negotiated_response
 
 router = APIRouter(prefix="/export", tags=["export"])
 
 
 @router.get("/markdown")
-async def export_markdown():
-    """Export all saved links as a Markdown document."""
-    links = await get_links(limit=500)
+async def export_markdown(
+    request: Request,
+    sender: str | None = Query(None, description="Only export links saved by this sender_phone"),
+):
+    """Export all saved links (or one sender's) as a Markdown document."""
+    links = await get_links(limit=500, fields=["raw_url", "title", "summary", "category", "tags"], sender=sender)
     lines = [
         "# 🔖 Social Saver — My Knowledge Base\n",
         f"> Exported {len(links)} links\n",
@@ -37,9 +41,9 @@ async def export_markdown():
             lines.append("\n")
 
     markdown = "\n".join(lines)
-    from fastapi.responses import Response
-    return Response(
-        content=markdown,
+    return negotiated_response(
+        request,
+        markdown.encode(),
         media_type="text/markdown",
         headers={"Content-Disposition": "attachment; filename=social_saver_export.md"},
     )
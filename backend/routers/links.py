@@ -1,47 +1,176 @@
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
+import os
+import math
 import uuid
+import base64
 import random
-from datetime import datetime
-from db.supabase_client import get_links, get_link_by_id, delete_link, get_forgotten_gems, insert_link
+import binascii
+from datetime import datetime, timedelta, timezone
+from db.supabase_client import (
+    get_links, get_link_by_id, delete_link, get_forgotten_gems, insert_link, insert_links, get_changes,
+    get_change_cutoff, get_existing_urls,
+)
 from services.sanitizer import sanitize_url, extract_urls
-from routers.webhook import process_link_pipeline
+from services.job_queue import enqueue_link, enqueue_links
+from services import admission
+from services.response_cache import links_cache, etag_matches, LIST_PREFIX
+from services.metrics import LINKS_CACHE
+from services.responses import dumps, negotiate, negotiated_response, representation_etag
+from models.link import LINK_FIELDS
 
 router = APIRouter(prefix="/links", tags=["links"])
 
+BULK_MAX_URLS = int(os.getenv("BULK_MAX_URLS", "10000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+# Changes newer than this are held back one round, so a write whose transaction
+# started earlier but committed later can't slip behind a client's token. The
+# cutoff is read from the clock that stamps updated_at (see get_change_cutoff),
+# so this only has to cover the longest write transaction, not clock skew.
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "10"))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+
+async def _cached_json(request: Request, key: str, endpoint: str, load) -> Response:
+    """Serve `await load()` as JSON through the read cache, answering 304 when
+    the client's If-None-Match still matches. `load` returning None means 404."""
+    entry = links_cache.get(key)
+    if entry is None:
+        LINKS_CACHE.inc(endpoint=endpoint, result="miss")
+        generation = links_cache.generation
+        payload = await load()
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Link not found")
+        entry = links_cache.put(key, dumps(payload), generation)
+    else:
+        LINKS_CACHE.inc(endpoint=endpoint, result="hit")
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        LINKS_CACHE.inc(endpoint=endpoint, result="not_modified")
+        headers["ETag"] = representation_etag(entry.etag, negotiate(request, entry.body))
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+    return negotiated_response(request, entry.body, headers=headers, variants=entry.variants)
+
+
+def _parse_fields(fields: str | None) -> list[str] | None:
+    """`fields=id,title,thumbnail_url` → validated column list (id always included)."""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(LINK_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return [f for f in LINK_FIELDS if f in requested]
+
 
 @router.get("/")
 async def list_links(
+    request: Request,
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
     category: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated columns to return, e.g. id,title,thumbnail_url"),
+    sender: str | None = Query(None, description="Only links saved by this sender_phone"),
+):
+    """Get all saved links, optionally filtered by category and/or sender."""
+    columns = _parse_fields(fields)
+
+    async def load():
+        links = await get_links(limit=limit, offset=offset, category=category, fields=columns, sender=sender)
+        return {"links": links, "count": len(links)}
+
+    key = f"{LIST_PREFIX}{limit}:{offset}:{category or ''}:{','.join(columns or [])}:{sender or ''}"
+    return await _cached_json(request, key, "list", load)
+
+
+def _encode_token(changed_at: str, link_id: str, synced_at: str) -> str:
+    """`changed_at|id` is the keyset position; `synced_at` is when the client's
+    copy was last complete (the start of a full sync, or the last caught-up
+    cutoff), carried unchanged through the paging tokens of one sync."""
+    return base64.urlsafe_b64encode(f"{changed_at}|{link_id}|{synced_at}".encode()).decode().rstrip("=")
+
+
+def _parse_ts(value: str) -> datetime:
+    """ISO timestamp → naive UTC (the database cutoff carries an offset)."""
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _decode_token(token: str) -> tuple[tuple[str, str], str]:
+    try:
+        parts = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode().split("|")
+        if len(parts) == 2:
+            parts.append(parts[0])  # issued before synced_at was added
+        changed_at, link_id, synced_at = parts
+        _parse_ts(changed_at)
+        synced = _parse_ts(synced_at)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    # Checked against synced_at, not the keyset position: a full sync pages
+    # through rows of any age, but only tombstones of deletions after the
+    # client's copy was complete matter, and those are kept for the window
+    if synced < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        # Deletions since then may already be purged — the client must resync
+        raise HTTPException(status_code=410, detail="Sync token expired, fetch the full library again")
+    return (changed_at, link_id), synced_at
+
+
+@router.get("/changes")
+async def link_changes(
+    request: Request,
+    since: str | None = Query(None, description="Token from a previous response; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
 ):
-    """Get all saved links, optionally filtered by category."""
-    links = await get_links(limit=limit, offset=offset)
-    if category:
-        links = [l for l in links if l.get("category") == category]
-    return {"links": links, "count": len(links)}
+    """Links inserted, updated or deleted since `since`, oldest change first.
+
+    Keep calling with the returned `next` token while `has_more` is true; the
+    final token can be stored and used for the next incremental sync.
+    """
+    cutoff = await get_change_cutoff(CHANGES_SETTLE_SECONDS)
+    # A full sync starts from nothing, so any deletion before now is irrelevant to it
+    after, synced_at = _decode_token(since) if since else (None, cutoff)
+    rows = await get_changes(after=after, until=cutoff, limit=limit)
+    has_more = len(rows) == limit
+    if has_more:
+        last = rows[-1]
+        token = _encode_token(last.get("updated_at") or last.get("created_at", ""), last["id"], synced_at)
+    else:
+        # Caught up: nothing changed before the cutoff, so the next sync can start there
+        token = _encode_token(cutoff, "", cutoff)
+    payload = {
+        "upserts": [r for r in rows if not r.get("deleted_at")],
+        "deletes": [r["id"] for r in rows if r.get("deleted_at")],
+        "next": token,
+        "has_more": has_more,
+    }
+    return negotiated_response(request, dumps(payload))
 
 
 @router.get("/roulette")
-async def inspiration_roulette(days_ago: int = Query(30, ge=1)):
+async def inspiration_roulette(
+    request: Request,
+    days_ago: int = Query(30, ge=1),
+    sender: str | None = Query(None, description="Only pick from links saved by this sender_phone"),
+):
     """Return a random forgotten gem from more than `days_ago` days ago."""
-    gems = await get_forgotten_gems(days_ago=days_ago)
+    gems = await get_forgotten_gems(days_ago=days_ago, sender=sender)
     if not gems:
         # Fall back to any random link
-        all_links = await get_links(limit=100)
+        all_links = await get_links(limit=100, sender=sender)
         if not all_links:
             raise HTTPException(status_code=404, detail="No links saved yet!")
         gems = all_links
-    return random.choice(gems)
+    return negotiated_response(request, dumps(random.choice(gems)))
 
 
 @router.get("/{link_id}")
-async def get_link(link_id: str):
-    link = await get_link_by_id(link_id)
-    if not link:
-        raise HTTPException(status_code=404, detail="Link not found")
-    return link
+async def get_link(link_id: str, request: Request):
+    async def load():
+        return await get_link_by_id(link_id) or None
+
+    return await _cached_json(request, f"link:{link_id}", "detail", load)
 
 
 @router.delete("/{link_id}")
@@ -55,10 +184,20 @@ class LinkRequest(BaseModel):
     url: str
 
 @router.post("/")
-async def add_link_manually(req: LinkRequest, request: Request, background_tasks: BackgroundTasks):
+async def add_link_manually(req: LinkRequest, request: Request):
     urls = extract_urls(req.url)
     if not urls:
         raise HTTPException(status_code=400, detail="No valid URL found")
+
+    client_key = f"web:{request.client.host if request.client else 'unknown'}"
+    rejected = await admission.admit(client_key, 1, "links")
+    if rejected:
+        reason, retry_after = rejected
+        raise HTTPException(
+            status_code=429,
+            detail="Too many links, slow down" if reason == "sender_rate" else "Server busy, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
     
     item = urls[0]
     url = sanitize_url(item["url"])
@@ -79,8 +218,73 @@ async def add_link_manually(req: LinkRequest, request: Request, background_tasks
     broadcast = request.app.state.broadcast
     await broadcast({"type": "link_added", "data": link_data})
     
-    background_tasks.add_task(
-        process_link_pipeline, link_id, url, source, "web_manual", broadcast
-    )
+    await enqueue_link(link_id, url, source, "web_manual")
     
     return {"status": "ok", "id": link_id}
+
+
+class BulkLinkRequest(BaseModel):
+    urls: list[str] = []
+    text: str | None = None
+
+
+@router.post("/bulk")
+async def add_links_bulk(req: BulkLinkRequest, request: Request):
+    """Import many links at once from a URL list and/or a free-text blob."""
+    text = "\n".join(req.urls)
+    if req.text:
+        text += "\n" + req.text
+    found = extract_urls(text)
+    if not found:
+        raise HTTPException(status_code=400, detail="No valid URL found")
+
+    rows = []
+    seen = set()
+    now = datetime.utcnow().isoformat()
+    for item in found:
+        url = sanitize_url(item["url"])
+        if url in seen:
+            continue
+        seen.add(url)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "raw_url": url,
+            "source": item["source"],
+            "sender_phone": "web_manual",
+            "processed": False,
+            "created_at": now,
+        })
+    if len(rows) > BULK_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"Too many URLs (max {BULK_MAX_URLS})")
+    # Skip links already saved, so retrying a timed-out import is safe
+    unique = len(rows)
+    existing = await get_existing_urls([row["raw_url"] for row in rows])
+    rows = [row for row in rows if row["raw_url"] not in existing]
+    if not rows:
+        return {"status": "ok", "inserted": 0, "duplicates": len(found) - unique, "existing": unique, "ids": []}
+
+    rejected = await admission.admit_bulk(f"web:{request.client.host if request.client else 'unknown'}", len(rows))
+    if rejected:
+        reason, retry_after = rejected
+        raise HTTPException(
+            status_code=429,
+            detail="Too many imports, try again later" if reason == "sender_rate" else "Server busy, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    broadcast = request.app.state.broadcast
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start: start + BULK_CHUNK_SIZE]
+        await insert_links(chunk)
+        await broadcast({"type": "links_bulk_added", "data": chunk})
+        # Bulk jobs carry a lower priority than interactive saves, and no sender
+        # so thousands of WhatsApp replies aren't fanned out.
+        await enqueue_links(chunk)
+
+    return {
+        "status": "ok",
+        "inserted": len(rows),
+        "duplicates": len(found) - unique,
+        "existing": unique - len(rows),
+        "ids": [row["id"] for row in rows],
+    }
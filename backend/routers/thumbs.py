@@ -0,0 +1,36 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+
+from db.supabase_client import get_thumbnail_source
+from services import thumbnails
+
+router = APIRouter(prefix="/thumbs", tags=["thumbs"])
+
+# Content-addressed: a given URL always serves the same bytes
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/{digest}")
+async def get_thumbnail(digest: str, request: Request, w: int | None = Query(None, ge=1, le=4096)):
+    """Serve a cached thumbnail — the smallest stored width ≥ `w`, else the largest.
+
+    An evicted image is fetched again from the link's source URL; if that
+    no longer yields the same image, the client is redirected to the source.
+    """
+    found = await asyncio.to_thread(thumbnails.find, digest, w)
+    if found is None and thumbnails.HASH_RE.match(digest):
+        source = await get_thumbnail_source(digest)
+        if source:
+            if await thumbnails.cache_thumbnail(source) == thumbnails.thumb_path(digest):
+                found = await asyncio.to_thread(thumbnails.find, digest, w)
+            if found is None:
+                return RedirectResponse(source, status_code=302)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    path, media_type = found
+    etag = f'"{digest}-{path.rsplit("/", 1)[-1].split(".")[0]}"'
+    headers = {"Cache-Control": IMMUTABLE, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,13 +1,18 @@
 import os
 import uuid
+import asyncio
 from datetime import datetime
-from fastapi import APIRouter, Request, Form, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import PlainTextResponse
 
 from services.sanitizer import extract_urls, sanitize_url
 from services.scraper import scrape
 from services.ai_synthesizer import synthesize
+from services import classifier, admission, thumbnails
 from services.whatsapp import send_whatsapp_message
+from services.job_queue import enqueue_link
+from services.metrics import track, WEBHOOK_DUPLICATES
+from services.dedup import webhook_deliveries
 from db.supabase_client import insert_link, update_link
 from models.link import LinkSource
 
@@ -19,64 +24,96 @@ WEBHOOK_PROVIDER = os.getenv("WEBHOOK_PROVIDER", "twilio")
 
 # ── Pipeline ─────────────────────────────────────────────────────────
 async def process_link_pipeline(link_id: str, url: str, source: LinkSource, sender: str, broadcast_fn):
-    """Full async pipeline: scrape → AI → DB update → WebSocket broadcast."""
-    try:
-        # 1. Scrape
-        scraped = await scrape(url, source)
-        raw_text = scraped.get("raw_text", url)
-        thumbnail = scraped.get("thumbnail_url", "")
-        author = scraped.get("author", "") or scraped.get("owner_username", "")
-
-        # 2. AI Synthesis
-        ai_result = await synthesize(raw_text, url)
-
-        # 3. Update DB
-        update_data = {
-            "title": ai_result.title,
-            "summary": ai_result.summary,
-            "category": ai_result.category,
-            "tags": ai_result.tags,
-            "thumbnail_url": thumbnail,
-            "author": author,
-            "processed": True,
-        }
-        updated = await update_link(link_id, update_data)
-
-        # 4. Broadcast via WebSocket
-        await broadcast_fn({"type": "link_updated", "data": updated})
-
-        # 5. Notify user via WhatsApp
-        if sender:
-            msg = (
-                f"✅ *{ai_result.title}*\n"
-                f"📂 {ai_result.category} | 🏷️ {', '.join(ai_result.tags[:3])}\n"
-                f"_{ai_result.summary[:120]}..._"
-            )
-            await send_whatsapp_message(sender, msg)
-
-    except Exception as e:
-        print(f"[Pipeline] Error processing {url}: {e}")
-        await update_link(link_id, {"processed": False})
-
-
-# ── Twilio Webhook ────────────────────────────────────────────────────
-@router.post("/twilio")
-async def twilio_webhook(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    From: str = Form(...),
-    Body: str = Form(...),
-):
-    broadcast = request.app.state.broadcast
-    sender = From  # e.g. "whatsapp:+919876543210"
-
-    urls = extract_urls(Body)
+    """Full async pipeline: scrape → AI → DB update → WebSocket broadcast.
+
+    Runs inside a job-queue worker; errors are re-raised so the queue can
+    schedule a retry.
+    """
+    thumb_task = None
+    with track("pipeline", getattr(source, "value", source)):
+        try:
+            # 1. Scrape
+            scraped = await scrape(url, source)
+            raw_text = scraped.get("raw_text", url)
+            thumbnail = scraped.get("thumbnail_url", "")
+            author = scraped.get("author", "") or scraped.get("owner_username", "")
+            # Mirror the preview image locally while the AI step runs
+            thumb_task = asyncio.create_task(thumbnails.cache_thumbnail(thumbnail))
+
+            # 2. AI Synthesis — the local classifier answers alone when the
+            #    policy allows, and otherwise stands in if every LLM fails.
+            local_result = None
+            if classifier.enabled():
+                local_result, confidence = classifier.predict(url, raw_text, scraped.get("title", ""))
+            if local_result is not None and classifier.handles_alone(confidence, raw_text, url):
+                ai_result = local_result
+            else:
+                ai_result = await synthesize(raw_text, url, fallback=local_result)
+
+            # 3. Update DB — the source URL is kept so an evicted image can be refetched
+            update_data = {
+                "title": ai_result.title,
+                "summary": ai_result.summary,
+                "category": ai_result.category,
+                "tags": ai_result.tags,
+                "thumbnail_url": await thumb_task or thumbnail,
+                "thumbnail_source": thumbnail,
+                "author": author,
+                "processed": True,
+            }
+            updated = await update_link(link_id, update_data)
+
+            # 4. Broadcast via WebSocket
+            await broadcast_fn({"type": "link_updated", "data": updated})
+
+            # 5. Notify user via WhatsApp
+            if sender:
+                msg = (
+                    f"✅ *{ai_result.title}*\n"
+                    f"📂 {ai_result.category} | 🏷️ {', '.join(ai_result.tags[:3])}\n"
+                    f"_{ai_result.summary[:120]}..._"
+                )
+                await send_whatsapp_message(sender, msg)
+
+        except Exception as e:
+            print(f"[Pipeline] Error processing {url}: {e}")
+            await update_link(link_id, {"processed": False})
+            raise
+        finally:
+            # A failed or cancelled attempt must not leave the download running
+            # (or its exception unretrieved); the retry starts a fresh one
+            if thumb_task is not None:
+                thumb_task.cancel()  # no-op once it has finished
+                await asyncio.gather(thumb_task, return_exceptions=True)
+
+
+# ── Message intake (shared by both providers) ─────────────────────────
+async def _ingest_message(text: str, sender_phone: str, reply_to: str, provider: str, broadcast) -> str:
+    """Save every link in one WhatsApp message and queue it for enrichment.
+    Returns "ok", "no url" or "rate_limited"."""
+    urls = extract_urls(text)
     if not urls:
-        await send_whatsapp_message(sender, "🤔 Hmm, I couldn't find a link in that message. Try sending a URL!")
-        return PlainTextResponse("ok")
+        await send_whatsapp_message(reply_to, "🤔 Hmm, I couldn't find a link in that message. Try sending a URL!")
+        return "no url"
+
+    # One message can't carry more links than a full bucket; the rest are dropped
+    limit = admission.max_links_per_request()
+    skipped = max(0, len(urls) - limit) if limit else 0
+    if skipped:
+        urls = urls[:limit]
+
+    # Shed load before doing any work. The provider still gets a 200 so it doesn't retry.
+    rejected = await admission.admit(sender_phone, len(urls), provider)
+    if rejected:
+        if admission.should_notify(sender_phone):
+            await send_whatsapp_message(reply_to, admission.rejection_reply(rejected[0]))
+        return "rate_limited"
 
     # ACK immediately
-    await send_whatsapp_message(sender, "🔗 Link received! Analyzing the vibe... ✨")
+    ack = "🔗 Link received! Analyzing the vibe... ✨"
+    if skipped:
+        ack += f"\n(I saved the first {limit} links — send the other {skipped} again in a minute.)"
+    await send_whatsapp_message(reply_to, ack)
 
     for item in urls:
         url = sanitize_url(item["url"])
@@ -89,7 +126,7 @@ async def twilio_webhook(
             "id": link_id,
             "raw_url": url,
             "source": source,
-            "sender_phone": sender,
+            "sender_phone": sender_phone,
             "processed": False,
             "created_at": now,
         })
@@ -97,11 +134,38 @@ async def twilio_webhook(
         # Broadcast new card immediately
         await broadcast({"type": "link_added", "data": {"id": link_id, "raw_url": url, "source": source}})
 
-        # Process in background
-        background_tasks.add_task(
-            process_link_pipeline, link_id, url, source, sender, broadcast
-        )
+        # Process in background (durable job, survives restarts)
+        await enqueue_link(link_id, url, source, reply_to)
+    return "ok"
+
 
+async def _ingest_once(
+    key: str | None, text: str, sender_phone: str, reply_to: str, provider: str, broadcast
+) -> str:
+    """_ingest_message unless `key` (the provider's message id) was already
+    handled — redeliveries are acknowledged without doing the work again."""
+    if key and not webhook_deliveries.claim(key):
+        WEBHOOK_DUPLICATES.inc(provider=provider)
+        return "duplicate"
+    try:
+        return await _ingest_message(text, sender_phone, reply_to, provider, broadcast)
+    except Exception:
+        if key:
+            webhook_deliveries.release(key)  # let the provider's retry through
+        raise
+
+
+# ── Twilio Webhook ────────────────────────────────────────────────────
+@router.post("/twilio")
+async def twilio_webhook(
+    request: Request,
+    From: str = Form(...),
+    Body: str = Form(...),
+    MessageSid: str | None = Form(None),
+):
+    sender = From  # e.g. "whatsapp:+919876543210"
+    key = f"twilio:{MessageSid}" if MessageSid else None
+    await _ingest_once(key, Body, sender, sender, "twilio", request.app.state.broadcast)
     return PlainTextResponse("ok")
 
 
@@ -115,47 +179,36 @@ async def meta_verify(request: Request):
     raise HTTPException(status_code=403, detail="Invalid verify token")
 
 
+def _meta_messages(body: dict):
+    """Every message in a delivery — Meta batches entries, changes and messages."""
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            for msg in (change.get("value") or {}).get("messages") or []:
+                yield msg
+
+
 @router.post("/meta")
-async def meta_webhook(request: Request, background_tasks: BackgroundTasks):
+async def meta_webhook(request: Request):
     broadcast = request.app.state.broadcast
     body = await request.json()
+    parsed = []
     try:
-        entry = body["entry"][0]
-        change = entry["changes"][0]
-        value = change["value"]
-        messages = value.get("messages", [])
-        if not messages:
-            return {"status": "no messages"}
-
-        msg = messages[0]
-        sender = msg["from"]
-        text = msg.get("text", {}).get("body", "")
-
-        urls = extract_urls(text)
-        if not urls:
-            await send_whatsapp_message(f"+{sender}", "🤔 I couldn't find a link. Try sending a URL!")
-            return {"status": "no url"}
-
-        await send_whatsapp_message(f"+{sender}", "🔗 Link received! Analyzing the vibe... ✨")
-
-        for item in urls:
-            url = sanitize_url(item["url"])
-            source = item["source"]
-            link_id = str(uuid.uuid4())
-            now = datetime.utcnow().isoformat()
-            await insert_link({
-                "id": link_id,
-                "raw_url": url,
-                "source": source,
-                "sender_phone": sender,
-                "processed": False,
-                "created_at": now,
-            })
-            await broadcast({"type": "link_added", "data": {"id": link_id, "raw_url": url, "source": source}})
-            background_tasks.add_task(
-                process_link_pipeline, link_id, url, source, f"+{sender}", broadcast
-            )
-    except (KeyError, IndexError) as e:
+        for msg in _meta_messages(body):
+            try:
+                key = f"meta:{msg['id']}" if msg.get("id") else None
+                parsed.append((key, (msg.get("text") or {}).get("body", ""), msg["from"]))
+            except (KeyError, TypeError, AttributeError) as e:
+                print(f"[Meta] Parse error: {e}")
+    except (AttributeError, TypeError) as e:
         print(f"[Meta] Parse error: {e}")
 
-    return {"status": "ok"}
+    # Outside the parse guard: a failure while ingesting is a real error, not a
+    # malformed payload, and must not be answered 200
+    counts: dict[str, int] = {}
+    for key, text, sender in parsed:
+        status = await _ingest_once(key, text, sender, f"+{sender}", "meta", broadcast)
+        counts[status] = counts.get(status, 0) + 1
+
+    if not counts:
+        return {"status": "no messages"}
+    return {"status": "ok", "messages": counts}
@@ -0,0 +1,75 @@
+import os
+
+from services.rate_limit import KeyedTokenBuckets
+from services.metrics import ADMISSION_SHED
+from services import job_queue
+
+# ── Ingest admission control ─────────────────────────────────────────
+# Each sender gets a token bucket (one token per link); on top of that the
+# whole pipeline has a backlog cap, so one looping bot can't monopolise the
+# scrape/LLM budget or grow the queue without bound. Bulk imports have their
+# own bucket counted in imports, not links, and their own backlog cap counted
+# in links: their jobs are paced by the queue, so they never count against
+# interactive admission.
+
+INGEST_RATE_PER_MIN = float(os.getenv("INGEST_RATE_PER_MIN", "20"))  # links per sender per minute
+INGEST_BURST = float(os.getenv("INGEST_BURST", "10"))
+INGEST_MAX_BACKLOG = int(os.getenv("INGEST_MAX_BACKLOG", "5000"))  # pending + running non-bulk jobs
+INGEST_MAX_BULK_BACKLOG = int(os.getenv("INGEST_MAX_BULK_BACKLOG", "50000"))  # pending + running bulk jobs
+INGEST_NOTICE_INTERVAL = float(os.getenv("INGEST_NOTICE_INTERVAL", "60"))
+INGEST_BULK_PER_HOUR = float(os.getenv("INGEST_BULK_PER_HOUR", "10"))  # bulk imports per client per hour
+INGEST_BULK_BURST = float(os.getenv("INGEST_BULK_BURST", "2"))
+
+_buckets = KeyedTokenBuckets(rate=INGEST_RATE_PER_MIN / 60, capacity=INGEST_BURST)
+_bulk_buckets = KeyedTokenBuckets(rate=INGEST_BULK_PER_HOUR / 3600, capacity=INGEST_BULK_BURST)
+_notices = KeyedTokenBuckets(rate=1 / INGEST_NOTICE_INTERVAL, capacity=1)
+
+RATE_LIMIT_REPLY = "⏳ Whoa, that's a lot of links! I'm still reading your last ones — try again in a minute."
+BUSY_REPLY = "⏳ I'm swamped right now and couldn't save that. Please resend it in a few minutes!"
+
+
+async def _admit(
+    buckets: KeyedTokenBuckets | None, key: str, tokens: int, endpoint: str, backlog_cost: int, bulk: bool
+):
+    max_backlog = INGEST_MAX_BULK_BACKLOG if bulk else INGEST_MAX_BACKLOG
+    if max_backlog and await job_queue.backlog(bulk=bulk) + backlog_cost > max_backlog:
+        ADMISSION_SHED.inc(endpoint=endpoint, reason="backlog")
+        return "backlog", 30.0
+    if buckets is not None:
+        bucket = buckets.get(key)
+        if not bucket.try_acquire(tokens):
+            ADMISSION_SHED.inc(endpoint=endpoint, reason="sender_rate")
+            return "sender_rate", bucket.retry_after(tokens)
+    return None
+
+
+async def admit(sender: str, cost: int, endpoint: str) -> tuple[str, float] | None:
+    """Check a request carrying `cost` links from `sender`. Every link costs a
+    token; callers cap `cost` at max_links_per_request() first.
+
+    Returns None when admitted, otherwise (reason, retry_after_seconds) where
+    reason is "sender_rate" or "backlog". Rejections are counted in metrics.
+    """
+    return await _admit(_buckets if INGEST_RATE_PER_MIN > 0 else None, sender, cost, endpoint, cost, bulk=False)
+
+
+async def admit_bulk(client: str, links: int, endpoint: str = "bulk") -> tuple[str, float] | None:
+    """Check one bulk import of `links` links from `client`: INGEST_BULK_PER_HOUR
+    imports per client, refused when the links would push the bulk backlog past
+    INGEST_MAX_BULK_BACKLOG. Same return value as admit()."""
+    return await _admit(_bulk_buckets if INGEST_BULK_PER_HOUR > 0 else None, client, 1, endpoint, links, bulk=True)
+
+
+def max_links_per_request() -> int:
+    """Most links one message can carry (a full bucket); 0 = no limit."""
+    return int(_buckets.capacity) if INGEST_RATE_PER_MIN > 0 else 0
+
+
+def should_notify(sender: str) -> bool:
+    """At most one over-limit WhatsApp reply per sender per INGEST_NOTICE_INTERVAL,
+    so rejecting a looping bot doesn't turn into sending it messages."""
+    return _notices.get(sender).try_acquire()
+
+
+def rejection_reply(reason: str) -> str:
+    return BUSY_REPLY if reason == "backlog" else RATE_LIMIT_REPLY
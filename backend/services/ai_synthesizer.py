@@ -1,11 +1,26 @@
 import os
 import json
+import time
+import asyncio
 from models.link import AIResult, Category
+from services.metrics import track, record_error, LLM_HEDGES, CIRCUIT_STATE
+from services.prompt_compactor import compact_text
+from services.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
 
 AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
+AI_PROVIDER_TIMEOUT = float(os.getenv("AI_PROVIDER_TIMEOUT", "30"))
+# Hedging: if the primary hasn't answered by its p95 latency, race the secondary.
+AI_HEDGE = os.getenv("AI_HEDGE", "false").lower() in ("1", "true", "yes")
+AI_HEDGE_DELAY_SECONDS = float(os.getenv("AI_HEDGE_DELAY_SECONDS", "5"))  # until p95 is known
+AI_BREAKER_WINDOW_SECONDS = float(os.getenv("AI_BREAKER_WINDOW_SECONDS", "60"))
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "5"))
+AI_BREAKER_FAILURE_RATE = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+AI_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", "20"))
+AI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("AI_BREAKER_COOLDOWN_SECONDS", "30"))
+
 VALID_CATEGORIES = [c.value for c in Category]
 
 SYSTEM_PROMPT = """You are a content curator AI. Given raw text from a web page, blog, social media post, or URL, extract structured metadata.
@@ -27,12 +42,44 @@ Rules:
 """
 
 
-async def synthesize_with_gemini(raw_text: str, url: str) -> AIResult:
+def _build_prompt(raw_text: str, url: str) -> str:
+    """User prompt with the scraped text compacted to PROMPT_TOKEN_BUDGET tokens."""
+    return f"URL: {url}\n\nContent:\n{compact_text(raw_text)}"
+
+
+# SDK clients are built once per event loop (their connection pools are loop-bound)
+_sdk_clients: dict[str, tuple[asyncio.AbstractEventLoop, object]] = {}
+
+
+def _loop_cached(name: str, build):
+    loop = asyncio.get_running_loop()
+    entry = _sdk_clients.get(name)
+    if entry is None or entry[0] is not loop:
+        entry = (loop, build())
+        _sdk_clients[name] = entry
+    return entry[1]
+
+
+def _build_gemini_model():
     import google.generativeai as genai
     genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    prompt = f"URL: {url}\n\nContent:\n{raw_text[:4000]}"
-    response = model.generate_content(
+    return genai.GenerativeModel("gemini-2.5-flash")
+
+
+def _build_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+
+def get_provider_client(name: str):
+    """The shared SDK client for a configured provider ("gemini" or "openai")."""
+    return _loop_cached(name, _build_gemini_model if name == "gemini" else _build_openai_client)
+
+
+async def synthesize_with_gemini(raw_text: str, url: str) -> AIResult:
+    model = get_provider_client("gemini")
+    prompt = _build_prompt(raw_text, url)
+    response = await model.generate_content_async(
         [{"role": "user", "parts": [SYSTEM_PROMPT + "\n\n" + prompt]}]
     )
     text = response.text.strip()
@@ -40,9 +87,8 @@ async def synthesize_with_gemini(raw_text: str, url: str) -> AIResult:
 
 
 async def synthesize_with_openai(raw_text: str, url: str) -> AIResult:
-    from openai import AsyncOpenAI
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-    prompt = f"URL: {url}\n\nContent:\n{raw_text[:4000]}"
+    client = get_provider_client("openai")
+    prompt = _build_prompt(raw_text, url)
     response = await client.chat.completions.create(
         model="gpt-4o",
         messages=[
@@ -86,21 +132,121 @@ def _parse_ai_response(text: str) -> AIResult:
         )
 
 
-async def synthesize(raw_text: str, url: str) -> AIResult:
-    """Orchestrate AI synthesis. Tries primary provider, falls back to the other."""
-    if AI_PROVIDER == "openai" and OPENAI_API_KEY:
+# ── Provider routing ─────────────────────────────────────────────────
+PROVIDERS = {
+    "openai": synthesize_with_openai,
+    "gemini": synthesize_with_gemini,
+}
+
+_breakers = {
+    name: CircuitBreaker(
+        name,
+        window_seconds=AI_BREAKER_WINDOW_SECONDS,
+        min_calls=AI_BREAKER_MIN_CALLS,
+        failure_rate=AI_BREAKER_FAILURE_RATE,
+        slow_call_seconds=AI_BREAKER_SLOW_CALL_SECONDS,
+        cooldown_seconds=AI_BREAKER_COOLDOWN_SECONDS,
+    )
+    for name in PROVIDERS
+}
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def configured_providers() -> list[str]:
+    """Providers with an API key, primary (AI_PROVIDER) first."""
+    keys = {"openai": OPENAI_API_KEY, "gemini": GEMINI_API_KEY}
+    configured = [name for name in PROVIDERS if keys.get(name)]
+    return sorted(configured, key=lambda name: name != AI_PROVIDER)
+
+
+def _available_providers() -> list[str]:
+    available = []
+    for name in configured_providers():
+        breaker = _breakers[name]
+        CIRCUIT_STATE.set(_STATE_VALUES[breaker.state], provider=name)
+        if breaker.available():
+            available.append(name)
+    return available
+
+
+async def _call_provider(name: str, raw_text: str, url: str) -> AIResult:
+    breaker = _breakers[name]
+    if not breaker.try_acquire():
+        # Another caller is already probing the half-open provider
+        raise RuntimeError(f"{name} circuit is not closed")
+    start = time.monotonic()
+    try:
+        with track("llm", name):
+            result = await asyncio.wait_for(PROVIDERS[name](raw_text, url), AI_PROVIDER_TIMEOUT)
+    except asyncio.CancelledError:
+        breaker.release()  # e.g. the losing side of a hedge
+        raise
+    except Exception as e:
+        breaker.record(False, time.monotonic() - start)
+        print(f"[AI] {name} failed: {e!r}")
+        raise
+    breaker.record(True, time.monotonic() - start)
+    return result
+
+
+async def _hedged(primary: str, secondary: str, raw_text: str, url: str) -> AIResult:
+    """Run the primary; if it's still pending after its p95 latency, start the
+    secondary as well and return whichever succeeds first."""
+    delay = _breakers[primary].latency_percentile(0.95) or AI_HEDGE_DELAY_SECONDS
+    first = asyncio.create_task(_call_provider(primary, raw_text, url))
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if first in done and first.exception() is None:
+            return first.result()
+        if first in done:
+            pending = set()  # primary failed fast: plain fallback
+            LLM_HEDGES.inc(outcome="fallback")
+        else:
+            LLM_HEDGES.inc(outcome="hedged")
+        pending.add(asyncio.create_task(_call_provider(secondary, raw_text, url)))
+
+        error = first.exception() if first.done() else None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        LLM_HEDGES.inc(outcome="secondary_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def synthesize(raw_text: str, url: str, fallback: AIResult | None = None) -> AIResult:
+    """Orchestrate AI synthesis across providers.
+
+    Providers whose circuit breaker is open are skipped without waiting. With
+    AI_HEDGE on, a slow primary is raced against the secondary; otherwise the
+    providers are tried in order. If every provider fails, `fallback` (e.g. the
+    local classifier's result) is returned instead of the placeholder.
+    """
+    providers = _available_providers()
+    if AI_HEDGE and len(providers) > 1:
         try:
-            return await synthesize_with_openai(raw_text, url)
+            return await _hedged(providers[0], providers[1], raw_text, url)
         except Exception:
-            pass
+            providers = providers[2:]
 
-    if GEMINI_API_KEY:
+    for name in providers:
         try:
-            return await synthesize_with_gemini(raw_text, url)
+            return await _call_provider(name, raw_text, url)
         except Exception:
             pass
 
     # Hard fallback
+    record_error("llm", "fallback")
+    if fallback is not None:
+        return fallback
     return AIResult(
         title="Saved Content",
         summary="AI synthesis unavailable. Content saved.",
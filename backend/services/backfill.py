@@ -0,0 +1,227 @@
+"""Re-enrichment backfill: re-run scrape and/or AI synthesis over stored links.
+
+Run as a batch job after changing SYSTEM_PROMPT or the model:
+
+    python -m services.backfill --stages synthesize --category Coding --rpm 120
+
+or start it through `POST /admin/backfill`. Progress is checkpointed after every
+page, so an interrupted run resumes where it stopped when started again with
+the same `--name`.
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+from db.supabase_client import scan_links, count_links, update_link
+from services.scraper import scrape
+from services.ai_synthesizer import synthesize
+from services import thumbnails
+from services.rate_limit import RateLimiter
+
+BACKFILL_CHECKPOINT_DIR = os.getenv("BACKFILL_CHECKPOINT_DIR", "backfill_checkpoints")
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "200"))
+
+VALID_STAGES = ("scrape", "synthesize")
+
+
+class BackfillRunner:
+    def __init__(
+        self,
+        name: str = "default",
+        stages: tuple[str, ...] = VALID_STAGES,
+        since: str | None = None,
+        until: str | None = None,
+        category: str | None = None,
+        processed: bool | None = None,
+        concurrency: int = 4,
+        rpm: float = 60,
+        broadcast_fn=None,
+    ):
+        unknown = set(stages) - set(VALID_STAGES)
+        if unknown or not stages:
+            raise ValueError(f"stages must be a subset of {VALID_STAGES}")
+        self.name = name
+        self.stages = tuple(stages)
+        self.filters = {"since": since, "until": until, "category": category, "processed": processed}
+        self.concurrency = max(1, concurrency)
+        self.rpm = rpm
+        self.broadcast_fn = broadcast_fn
+        self.state = {
+            "name": name,
+            "status": "pending",
+            "stages": list(self.stages),
+            "filters": self.filters,
+            "cursor": None,
+            "total": 0,
+            "done": 0,
+            "failed": 0,
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._t0 = 0.0
+        self._t_end = 0.0  # set when the run stops, so elapsed/throughput stay frozen
+        self._done_at_start = 0
+        # Here rather than in run(), so a checkpoint created with different
+        # options is rejected before POST /admin/backfill replies "started"
+        self._load_checkpoint()
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(BACKFILL_CHECKPOINT_DIR, f"{self.name}.json")
+
+    # ── Checkpointing ────────────────────────────────────────────────
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path) as f:
+            saved = json.load(f)
+        if saved.get("status") == "completed":
+            return  # start a fresh run
+        if saved.get("filters") != self.filters or saved.get("stages") != list(self.stages):
+            raise ValueError(f"Checkpoint '{self.name}' was created with different options")
+        self.state.update({k: saved[k] for k in ("cursor", "total", "done", "failed", "started_at", "until_cutoff") if k in saved})
+
+    def _save_checkpoint(self):
+        os.makedirs(BACKFILL_CHECKPOINT_DIR, exist_ok=True)
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    # ── Progress ─────────────────────────────────────────────────────
+    def progress(self) -> dict:
+        elapsed = (self._t_end or time.monotonic()) - self._t0 if self._t0 else 0.0
+        processed_now = self.state["done"] + self.state["failed"] - self._done_at_start
+        rate = processed_now / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.state["total"] - self.state["done"] - self.state["failed"])
+        return {
+            **self.state,
+            "elapsed_seconds": round(elapsed, 1),
+            "throughput_per_min": round(rate * 60, 1),
+            "eta_seconds": round(remaining / rate) if rate > 0 else None,
+        }
+
+    # ── Work ─────────────────────────────────────────────────────────
+    async def _reprocess(self, link: dict):
+        url = link["raw_url"]
+        update = {}
+        # Synthesis always works from freshly scraped source text: the stored
+        # title/summary are the previous model output, not the content itself.
+        # Without the scrape stage only the AI fields are rewritten.
+        scraped = await scrape(url, link.get("source", "web"))
+        if scraped.get("error") and "scrape" not in self.stages:
+            raise RuntimeError(f"could not re-scrape source: {scraped['error']}")
+        raw_text = scraped.get("raw_text") or url
+        if "scrape" in self.stages:
+            thumbnail = scraped.get("thumbnail_url", "")
+            if thumbnail:
+                update["thumbnail_url"] = await thumbnails.cache_thumbnail(thumbnail) or thumbnail
+                update["thumbnail_source"] = thumbnail
+            update["author"] = scraped.get("author", "") or scraped.get("owner_username", "") or link.get("author", "")
+        if "synthesize" in self.stages:
+            ai_result = await synthesize(raw_text, url)
+            update.update({
+                "title": ai_result.title,
+                "summary": ai_result.summary,
+                "category": ai_result.category,
+                "tags": ai_result.tags,
+            })
+        update["processed"] = True
+        updated = await update_link(link["id"], update)
+        if self.broadcast_fn and updated:
+            await self.broadcast_fn({"type": "link_updated", "data": updated})
+
+    async def run(self) -> dict:
+        # Freeze the upper bound so links saved during the run aren't swept in
+        self.state.setdefault("until_cutoff", self.filters["until"] or datetime.utcnow().isoformat())
+        if not self.state["started_at"]:
+            self.state["started_at"] = datetime.utcnow().isoformat()
+            self.state["total"] = await count_links(**{**self.filters, "until": self.state["until_cutoff"]})
+        self.state["status"] = "running"
+        self._t0 = time.monotonic()
+        self._done_at_start = self.state["done"] + self.state["failed"]
+
+        limiter = RateLimiter(self.rpm)
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(link: dict):
+            async with sem:
+                await limiter.acquire()
+                try:
+                    await self._reprocess(link)
+                    self.state["done"] += 1
+                except Exception as e:
+                    self.state["failed"] += 1
+                    print(f"[Backfill] Error reprocessing {link.get('raw_url')}: {e}")
+
+        try:
+            while True:
+                page = await scan_links(
+                    after=self.state["cursor"],
+                    limit=BACKFILL_PAGE_SIZE,
+                    **{**self.filters, "until": self.state["until_cutoff"]},
+                )
+                if not page:
+                    break
+                await asyncio.gather(*(one(link) for link in page))
+                last = page[-1]
+                self.state["cursor"] = [last.get("created_at", ""), last["id"]]
+                self._save_checkpoint()
+                p = self.progress()
+                print(
+                    f"[Backfill] {self.name}: {p['done'] + p['failed']}/{p['total']} "
+                    f"({p['throughput_per_min']}/min, ETA {p['eta_seconds']}s)"
+                )
+        except asyncio.CancelledError:
+            self._t_end = time.monotonic()
+            self.state["status"] = "cancelled"
+            self._save_checkpoint()
+            raise
+
+        self._t_end = time.monotonic()
+        self.state["status"] = "completed"
+        self.state["finished_at"] = datetime.utcnow().isoformat()
+        self._save_checkpoint()
+        return self.progress()
+
+
+def _parse_bool(value: str | None) -> bool | None:
+    if value is None:
+        return None
+    return value.lower() in ("1", "true", "yes")
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Re-run scrape/AI synthesis over stored links.")
+    parser.add_argument("--name", default="default", help="checkpoint name (resume by reusing it)")
+    parser.add_argument("--stages", default="scrape,synthesize", help="comma-separated: scrape,synthesize")
+    parser.add_argument("--since", help="only links created at/after this ISO timestamp")
+    parser.add_argument("--until", help="only links created before this ISO timestamp")
+    parser.add_argument("--category")
+    parser.add_argument("--processed", help="true/false to filter on processed state")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=60, help="max links per minute (0 = unlimited)")
+    args = parser.parse_args()
+
+    runner = BackfillRunner(
+        name=args.name,
+        stages=tuple(s.strip() for s in args.stages.split(",") if s.strip()),
+        since=args.since,
+        until=args.until,
+        category=args.category,
+        processed=_parse_bool(args.processed),
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+    )
+    result = asyncio.run(runner.run())
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
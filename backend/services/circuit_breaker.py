@@ -0,0 +1,102 @@
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for one upstream provider.
+
+    Tracks outcome and latency of calls over the last `window_seconds`. When
+    at least `min_calls` were made and the share of failed or slow calls
+    reaches `failure_rate`, the breaker opens and `available()` returns False
+    for `cooldown_seconds`. After that it is half-open: a single probe call
+    is let through (`try_acquire`), other callers keep seeing the provider as
+    unavailable, and the probe's result either closes it again or re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 20,
+        cooldown_seconds: float = 30,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._calls: deque[tuple[float, bool, float]] = deque()  # (timestamp, ok, latency)
+        self._opened_at = 0.0
+        self._state = CLOSED
+        self._probing = False  # half-open probe in flight
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def available(self) -> bool:
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def try_acquire(self) -> bool:
+        """Permission for one call. In half-open only the first caller gets it,
+        until its result is recorded or it is released."""
+        if not self.available():
+            return False
+        if self._state == HALF_OPEN:
+            self._probing = True
+        return True
+
+    def release(self):
+        """Give up an acquired call without a result (e.g. it was cancelled)."""
+        self._probing = False
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        state = self.state
+        if state == HALF_OPEN:
+            self._probing = False
+            if ok and latency < self.slow_call_seconds:
+                self._state = CLOSED
+                self._calls.clear()
+            else:
+                self._trip(now)
+            return
+        self._calls.append((now, ok, latency))
+        self._trim(now)
+        if state == CLOSED and len(self._calls) >= self.min_calls and self.error_rate() >= self.failure_rate:
+            self._trip(now)
+
+    def _trip(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        print(f"[Breaker] {self.name} opened (error rate {self.error_rate():.0%})")
+
+    def error_rate(self) -> float:
+        """Share of calls in the window that failed or exceeded `slow_call_seconds`."""
+        if not self._calls:
+            return 0.0
+        bad = sum(1 for _, ok, latency in self._calls if not ok or latency >= self.slow_call_seconds)
+        return bad / len(self._calls)
+
+    def latency_percentile(self, pct: float = 0.95, min_samples: int = 10) -> float | None:
+        """Latency percentile of successful calls in the window, None if too few samples."""
+        self._trim(time.monotonic())
+        latencies = sorted(latency for _, ok, latency in self._calls if ok)
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(pct * len(latencies)))]
@@ -0,0 +1,241 @@
+"""Local, offline link classifier — a fast tier ahead of the LLM.
+
+Multinomial naive Bayes (NumPy) over URL and text tokens, trained from the
+category/tags already stored for processed links, plus hand-written domain
+priors (github.com → Coding …) that work even before any training data exists.
+
+LOCAL_CLASSIFIER_POLICY decides how much of the work it takes on:
+  off        never used
+  fallback   only replaces the "AI synthesis unavailable" result
+  confident  also handles links on its own when confidence ≥ LOCAL_CLASSIFIER_MIN_CONFIDENCE,
+             when there's too little text for the LLM to add anything, or when
+             LLM calls in flight exceed AI_MAX_IN_FLIGHT (load shedding)
+  always     the LLM is never called
+"""
+import os
+import math
+import asyncio
+from collections import Counter
+from urllib.parse import urlparse
+
+from models.link import AIResult, Category
+from db.supabase_client import scan_links
+from services.metrics import in_flight, LOCAL_CLASSIFIER_DECISIONS
+from services.prompt_compactor import compact_text, WORD_RE, STOPWORDS
+
+try:
+    import numpy as np
+    _numpy_available = True
+except ImportError:
+    _numpy_available = False
+
+LOCAL_CLASSIFIER_POLICY = os.getenv("LOCAL_CLASSIFIER_POLICY", "fallback")  # off | fallback | confident | always
+LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("LOCAL_CLASSIFIER_MIN_CONFIDENCE", "0.9"))
+LOCAL_CLASSIFIER_MIN_TEXT_CHARS = int(os.getenv("LOCAL_CLASSIFIER_MIN_TEXT_CHARS", "80"))
+LOCAL_CLASSIFIER_TRAIN_LIMIT = int(os.getenv("LOCAL_CLASSIFIER_TRAIN_LIMIT", "5000"))
+AI_MAX_IN_FLIGHT = int(os.getenv("AI_MAX_IN_FLIGHT", "0"))  # 0 = no load shedding
+
+DOMAIN_PRIORS = {
+    "github.com": "Coding",
+    "gitlab.com": "Coding",
+    "stackoverflow.com": "Coding",
+    "dev.to": "Coding",
+    "pypi.org": "Coding",
+    "npmjs.com": "Coding",
+    "docs.python.org": "Coding",
+    "news.ycombinator.com": "Coding",
+    "dribbble.com": "Design",
+    "behance.net": "Design",
+    "figma.com": "Design",
+    "awwwards.com": "Design",
+    "arxiv.org": "Science",
+    "nature.com": "Science",
+    "sciencedaily.com": "Science",
+    "bloomberg.com": "Finance",
+    "investopedia.com": "Finance",
+    "wsj.com": "Finance",
+    "reuters.com": "News",
+    "apnews.com": "News",
+    "bbc.com": "News",
+    "bbc.co.uk": "News",
+    "nytimes.com": "News",
+    "allrecipes.com": "Food",
+    "seriouseats.com": "Food",
+    "imdb.com": "Entertainment",
+    "netflix.com": "Entertainment",
+    "tripadvisor.com": "Travel",
+    "booking.com": "Travel",
+    "lonelyplanet.com": "Travel",
+    "strava.com": "Fitness",
+}
+DOMAIN_PRIOR_CONFIDENCE = 0.95
+DOMAIN_PRIOR_WEIGHT = math.log(20)  # log-odds boost for the prior's class when a model exists
+FALLBACK_TAGS = {"unprocessed", "saved"}  # tags of placeholder results, never trained on
+
+CATEGORIES = [c.value for c in Category]
+
+
+def _domain(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def tokenize(url: str, text: str) -> list[str]:
+    domain = _domain(url)
+    tokens = [f"domain:{domain}"] if domain else []
+    path = urlparse(url).path.lower().replace("-", " ").replace("_", " ").replace("/", " ")
+    tokens.extend(f"path:{w}" for w in WORD_RE.findall(path) if w not in STOPWORDS)
+    tokens.extend(w for w in WORD_RE.findall((text or "").lower()) if w not in STOPWORDS)
+    return tokens
+
+
+class NaiveBayesClassifier:
+    def __init__(self, alpha: float = 1.0, max_vocab: int = 30000):
+        self.alpha = alpha
+        self.max_vocab = max_vocab
+        self.vocab: dict[str, int] = {}
+        self.log_prior = None
+        self.log_likelihood = None
+        self.class_tags: list[list[str]] = []
+        self.trained_on = 0
+
+    def fit(self, docs: list[list[str]], labels: list[int], tags: list[list[str]]):
+        df = Counter(t for doc in docs for t in set(doc))
+        self.vocab = {t: i for i, (t, _) in enumerate(df.most_common(self.max_vocab))}
+        n_classes = len(CATEGORIES)
+        counts = np.zeros((n_classes, len(self.vocab)), dtype=np.float64)
+        class_counts = np.zeros(n_classes, dtype=np.float64)
+        tag_counts = [Counter() for _ in range(n_classes)]
+        for doc, label, doc_tags in zip(docs, labels, tags):
+            idx = [self.vocab[t] for t in doc if t in self.vocab]
+            np.add.at(counts[label], idx, 1)
+            class_counts[label] += 1
+            tag_counts[label].update(doc_tags)
+        self.log_prior = np.log((class_counts + 1) / (class_counts.sum() + n_classes))
+        smoothed = counts + self.alpha
+        self.log_likelihood = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        self.class_tags = [[t for t, _ in c.most_common(20)] for c in tag_counts]
+        self.trained_on = len(docs)
+
+    def predict_proba(self, tokens: list[str], prior_class: int | None = None):
+        idx = [self.vocab[t] for t in tokens if t in self.vocab]
+        scores = self.log_prior.copy()
+        if idx:
+            # Length-normalised evidence keeps long pages from producing
+            # degenerate, always-1.0 naive Bayes confidences.
+            scores += self.log_likelihood[:, idx].sum(axis=1) / math.sqrt(len(idx))
+        if prior_class is not None:
+            scores[prior_class] += DOMAIN_PRIOR_WEIGHT
+        scores -= scores.max()
+        probs = np.exp(scores)
+        return probs / probs.sum()
+
+
+_model: NaiveBayesClassifier | None = None
+
+
+def _train_sync(rows: list[dict]) -> NaiveBayesClassifier | None:
+    docs, labels, tags = [], [], []
+    for row in rows:
+        cat = row.get("category")
+        row_tags = row.get("tags") or []
+        if cat not in CATEGORIES or set(row_tags) & FALLBACK_TAGS:
+            continue
+        text = " ".join(filter(None, [row.get("title"), row.get("summary"), " ".join(row_tags)]))
+        docs.append(tokenize(row.get("raw_url", ""), text))
+        labels.append(CATEGORIES.index(cat))
+        tags.append(row_tags)
+    if len(docs) < 20 or len(set(labels)) < 2:
+        return None
+    model = NaiveBayesClassifier()
+    model.fit(docs, labels, tags)
+    return model
+
+
+async def train_from_store() -> int:
+    """(Re)train from the newest processed links in the store (at most
+    LOCAL_CLASSIFIER_TRAIN_LIMIT). Returns the number of examples used."""
+    global _model
+    if not _numpy_available or LOCAL_CLASSIFIER_POLICY == "off":
+        return 0
+
+    rows: list[dict] = []
+    cursor = None
+    while len(rows) < LOCAL_CLASSIFIER_TRAIN_LIMIT:
+        page = await scan_links(
+            after=cursor,
+            limit=min(500, LOCAL_CLASSIFIER_TRAIN_LIMIT - len(rows)),
+            processed=True,
+            newest_first=True,
+        )
+        if not page:
+            break
+        rows.extend(page)
+        cursor = (page[-1].get("created_at", ""), page[-1]["id"])
+    model = await asyncio.to_thread(_train_sync, rows)
+    if model is not None:
+        _model = model
+        print(f"[Classifier] Trained on {model.trained_on} links ({len(model.vocab)} tokens)")
+        return model.trained_on
+    return 0
+
+
+def _pick_tags(tokens: list[str], category_idx: int, limit: int = 5) -> list[str]:
+    """Tags seen for this category that occur in the text first, then the category's most common."""
+    if _model is None or not _model.class_tags:
+        return [CATEGORIES[category_idx].lower()]
+    token_set = set(tokens)
+    known = _model.class_tags[category_idx]
+    matched = [t for t in known if all(w in token_set for w in t.split())]
+    tags = matched + [t for t in known if t not in matched]
+    return tags[:limit] or [CATEGORIES[category_idx].lower()]
+
+
+def predict(url: str, raw_text: str, title: str = "") -> tuple[AIResult, float]:
+    """Local category/tags for a link, with a confidence in [0, 1]."""
+    tokens = tokenize(url, f"{title}\n{raw_text}")
+    prior = DOMAIN_PRIORS.get(_domain(url))
+    prior_idx = CATEGORIES.index(prior) if prior else None
+
+    if _model is not None:
+        probs = _model.predict_proba(tokens, prior_idx)
+        idx = int(probs.argmax())
+        confidence = float(probs[idx])
+    elif prior_idx is not None:
+        idx, confidence = prior_idx, DOMAIN_PRIOR_CONFIDENCE
+    else:
+        idx, confidence = CATEGORIES.index(Category.other.value), 0.0
+
+    first_line = next((l for l in (raw_text or "").splitlines() if l.strip()), "")
+    if first_line.strip() == url:
+        first_line = ""
+    display_title = (title or first_line or _domain(url) or url).strip()[:80]
+    summary = compact_text(raw_text or "", token_budget=60) if raw_text and raw_text != url else ""
+    result = AIResult(
+        title=display_title,
+        summary=summary or f"Saved from {_domain(url) or url}.",
+        category=CATEGORIES[idx],
+        tags=_pick_tags(tokens, idx),
+    )
+    return result, confidence
+
+
+def handles_alone(confidence: float, raw_text: str, url: str) -> bool:
+    """Whether the local result should be used without calling the LLM."""
+    policy = LOCAL_CLASSIFIER_POLICY
+    if policy == "always":
+        decision = True
+    elif policy != "confident":
+        decision = False
+    elif confidence >= LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+        decision = True
+    elif len((raw_text or "").strip()) < LOCAL_CLASSIFIER_MIN_TEXT_CHARS or raw_text == url:
+        decision = True  # low value: the LLM would only see a bare URL
+    else:
+        decision = bool(AI_MAX_IN_FLIGHT) and in_flight("llm") >= AI_MAX_IN_FLIGHT
+    LOCAL_CLASSIFIER_DECISIONS.inc(decision="local" if decision else "llm")
+    return decision
+
+
+def enabled() -> bool:
+    return LOCAL_CLASSIFIER_POLICY != "off"
@@ -0,0 +1,49 @@
+import os
+import time
+from collections import OrderedDict
+
+# ── Webhook delivery dedup ───────────────────────────────────────────
+# Twilio and Meta redeliver when our response is slow or lost. Message ids
+# seen within WEBHOOK_DEDUP_TTL are acknowledged without being processed
+# again. The store is per process; run a single worker (or a shared store)
+# if exactly-once across processes matters.
+
+WEBHOOK_DEDUP_TTL = float(os.getenv("WEBHOOK_DEDUP_TTL", str(48 * 3600)))  # Meta retries for ~36h
+WEBHOOK_DEDUP_MAX_KEYS = int(os.getenv("WEBHOOK_DEDUP_MAX_KEYS", "100000"))
+
+
+class RecentKeys:
+    """Keys seen in the last `ttl` seconds, oldest evicted beyond `max_keys`."""
+
+    def __init__(self, ttl: float = WEBHOOK_DEDUP_TTL, max_keys: int = WEBHOOK_DEDUP_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._expires: OrderedDict[str, float] = OrderedDict()  # insertion order = expiry order
+
+    def _expire(self, now: float):
+        while self._expires:
+            key, expires = next(iter(self._expires.items()))
+            if expires > now:
+                break
+            self._expires.popitem(last=False)
+
+    def claim(self, key: str) -> bool:
+        """Record `key`; False if it was already seen (a redelivery)."""
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._expires:
+            return False
+        self._expires[key] = now + self.ttl
+        if len(self._expires) > self.max_keys:
+            self._expires.popitem(last=False)
+        return True
+
+    def release(self, key: str):
+        """Forget `key` so a retry of a failed delivery is processed."""
+        self._expires.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+webhook_deliveries = RecentKeys()
@@ -0,0 +1,43 @@
+"""Shared httpx clients, one per upstream, reused across requests.
+
+Opening an `httpx.AsyncClient` per call costs a new connection pool, TLS
+context and handshake every time. Clients here are created on first use and
+kept for the life of the event loop, so keep-alive connections are reused.
+A client is bound to the loop it was created on; a new loop (tests, a
+restarted server) transparently gets a fresh one.
+"""
+import asyncio
+
+import httpx
+
+BOT_USER_AGENT = "Mozilla/5.0 (Social Saver Bot)"
+
+# name → keyword arguments for httpx.AsyncClient
+CLIENTS = {
+    "web": {"timeout": 20, "follow_redirects": True, "headers": {"User-Agent": BOT_USER_AGENT}},
+    "twitter": {"timeout": 15, "follow_redirects": True, "headers": {"User-Agent": "Twitterbot/1.0"}},
+    "rapidapi": {"timeout": 15},
+    "meta": {"timeout": 10},
+    "thumbnails": {"timeout": 15, "follow_redirects": True, "headers": {"User-Agent": BOT_USER_AGENT}},
+}
+
+_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """The shared client for `name` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(name)
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        entry = (loop, httpx.AsyncClient(**CLIENTS[name]))
+        _clients[name] = entry
+    return entry[1]
+
+
+async def aclose_all():
+    """Close every client owned by the running loop (app shutdown)."""
+    loop = asyncio.get_running_loop()
+    for name, (owner, client) in list(_clients.items()):
+        if owner is loop:
+            del _clients[name]
+            await client.aclose()
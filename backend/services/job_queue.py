@@ -0,0 +1,286 @@
+import os
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+
+from db.supabase_client import scan_links
+from services.rate_limit import RateLimiter
+
+# ── Durable enrichment queue ─────────────────────────────────────────
+# One job row per link, stored in a local SQLite file so scheduled work
+# survives restarts (uvicorn --reload, deploys, crashes). Workers claim jobs
+# with a lease; a job whose lease expires is picked up again, and failures
+# are retried with exponential backoff until JOB_MAX_ATTEMPTS.
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "job_queue.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RATE_PER_MIN = float(os.getenv("JOB_RATE_PER_MIN", "0"))  # all jobs; 0 = unpaced
+# Bulk imports (POST /links/bulk) trickle into the scrapers and the LLM at this
+# rate, so a 10k-link import can't take over every worker. 0 = unpaced.
+JOB_BULK_RATE_PER_MIN = float(os.getenv("JOB_BULK_RATE_PER_MIN", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "10"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+RECOVERY_PAGE_SIZE = 500
+
+# Lower value = claimed first. Interactive saves jump ahead of bulk imports.
+# Jobs at PRIORITY_BULK or above are paced by JOB_BULK_RATE_PER_MIN.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_RECOVERY = 5  # startup sweep: unpaced, so a restart recovers at full speed
+PRIORITY_BULK = 10
+
+JOB_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS link_jobs (
+  link_id      TEXT PRIMARY KEY,
+  url          TEXT NOT NULL,
+  source       TEXT NOT NULL,
+  sender       TEXT NOT NULL DEFAULT '',
+  priority     INTEGER NOT NULL DEFAULT 0,
+  status       TEXT NOT NULL DEFAULT 'pending',  -- pending | running | failed
+  attempts     INTEGER NOT NULL DEFAULT 0,
+  run_after    REAL NOT NULL,
+  lease_until  REAL,
+  last_error   TEXT,
+  created_at   REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_link_jobs_ready ON link_jobs(status, priority, run_after);
+"""
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+_wakeup: asyncio.Event | None = None
+_workers: list[asyncio.Task] = []
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(JOB_DB_PATH, check_same_thread=False, isolation_level=None)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(JOB_SCHEMA_SQL)
+    return _conn
+
+
+def _notify():
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _backoff(attempts: int) -> float:
+    """Exponential backoff with jitter: base, 2×base, 4×base … capped."""
+    delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# ── Sync primitives (run in a worker thread) ─────────────────────────
+def _enqueue_sync(jobs: list[tuple]):
+    with _lock:
+        conn = _get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO link_jobs "
+            "(link_id, url, source, sender, priority, run_after, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            jobs,
+        )
+        conn.execute("COMMIT")
+
+
+def _claim_sync(include_bulk: bool = True) -> dict | None:
+    now = time.time()
+    max_priority = float("inf") if include_bulk else PRIORITY_BULK
+    with _lock:
+        conn = _get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT * FROM link_jobs "
+            "WHERE ((status = 'pending' AND run_after <= ?) "
+            "   OR (status = 'running' AND lease_until < ?)) "
+            "  AND priority < ? "
+            "ORDER BY priority, run_after LIMIT 1",
+            (now, now, max_priority),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE link_jobs SET status = 'running', attempts = attempts + 1, lease_until = ? "
+            "WHERE link_id = ?",
+            (now + JOB_LEASE_SECONDS, row["link_id"]),
+        )
+        conn.execute("COMMIT")
+    job = dict(row)
+    job["attempts"] += 1
+    return job
+
+
+def _complete_sync(link_id: str):
+    with _lock:
+        _get_conn().execute("DELETE FROM link_jobs WHERE link_id = ?", (link_id,))
+
+
+def _fail_sync(link_id: str, attempts: int, error: str) -> str:
+    if attempts >= JOB_MAX_ATTEMPTS:
+        status, run_after = "failed", time.time()
+    else:
+        status, run_after = "pending", time.time() + _backoff(attempts)
+    with _lock:
+        _get_conn().execute(
+            "UPDATE link_jobs SET status = ?, run_after = ?, lease_until = NULL, last_error = ? "
+            "WHERE link_id = ?",
+            (status, run_after, error[:500], link_id),
+        )
+    return status
+
+
+def _reset_running_sync() -> int:
+    with _lock:
+        cur = _get_conn().execute(
+            "UPDATE link_jobs SET status = 'pending', lease_until = NULL, run_after = ? "
+            "WHERE status = 'running'",
+            (time.time(),),
+        )
+        return cur.rowcount
+
+
+def _backlog_sync(bulk: bool | None = None) -> int:
+    sql = "SELECT COUNT(*) FROM link_jobs WHERE status IN ('pending', 'running')"
+    params = ()
+    if bulk is not None:
+        sql += " AND priority >= ?" if bulk else " AND priority < ?"
+        params = (PRIORITY_BULK,)
+    with _lock:
+        row = _get_conn().execute(sql, params).fetchone()
+    return row[0]
+
+
+def _stats_sync() -> dict:
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT status, COUNT(*) AS n FROM link_jobs GROUP BY status"
+        ).fetchall()
+    return {row["status"]: row["n"] for row in rows}
+
+
+# ── Async API ────────────────────────────────────────────────────────
+def _job_tuple(link_id: str, url: str, source, sender: str, priority: int) -> tuple:
+    return (link_id, url, getattr(source, "value", source), sender or "", priority, time.time(), time.time())
+
+
+async def enqueue_link(link_id: str, url: str, source, sender: str, priority: int = PRIORITY_INTERACTIVE):
+    """Persist an enrichment job for a link and wake a worker."""
+    await asyncio.to_thread(_enqueue_sync, [_job_tuple(link_id, url, source, sender, priority)])
+    _notify()
+
+
+async def enqueue_links(items: list[dict], sender: str = "", priority: int = PRIORITY_BULK):
+    """Persist jobs for many link rows (id, raw_url, source) in one transaction."""
+    jobs = [_job_tuple(i["id"], i["raw_url"], i["source"], sender, priority) for i in items]
+    if jobs:
+        await asyncio.to_thread(_enqueue_sync, jobs)
+        _notify()
+
+
+async def queue_stats() -> dict:
+    return await asyncio.to_thread(_stats_sync)
+
+
+_backlog_cache: dict[bool | None, tuple[float, int]] = {}  # bulk → (monotonic timestamp, count)
+
+
+async def backlog(max_age: float = 1.0, bulk: bool | None = None) -> int:
+    """Jobs pending or running: only bulk jobs (priority >= PRIORITY_BULK) when
+    `bulk` is True, only the rest when False, all of them when None. Cached for
+    `max_age` seconds so admission checks on every request don't each hit SQLite."""
+    ts, count = _backlog_cache.get(bulk, (0.0, 0))
+    if time.monotonic() - ts > max_age:
+        count = await asyncio.to_thread(_backlog_sync, bulk)
+        _backlog_cache[bulk] = (time.monotonic(), count)
+    return count
+
+
+async def recover() -> int:
+    """Startup sweep: re-queue jobs orphaned by a previous process, and create
+    jobs for any link still marked unprocessed that has no job row."""
+    reset = await asyncio.to_thread(_reset_running_sync)
+    # Page through every unprocessed link: after a redeploy without a volume the
+    # job file is gone and the links table is the only record of pending work
+    checked, after = 0, None
+    while True:
+        page = await scan_links(after=after, limit=RECOVERY_PAGE_SIZE, processed=False)
+        if not page:
+            break
+        jobs = [
+            _job_tuple(l["id"], l["raw_url"], l.get("source", "web"), l.get("sender_phone") or "", PRIORITY_RECOVERY)
+            for l in page
+        ]
+        await asyncio.to_thread(_enqueue_sync, jobs)  # INSERT OR IGNORE keeps existing rows
+        checked += len(jobs)
+        after = (page[-1].get("created_at", ""), page[-1]["id"])
+    print(f"[Queue] Recovery: {reset} interrupted job(s) reset, {checked} unprocessed link(s) checked")
+    return reset + checked
+
+
+async def _claim(bulk_limiter: RateLimiter, bulk_lock: asyncio.Lock) -> dict | None:
+    """Interactive and recovery jobs first; a bulk job only when a bulk slot is
+    free, and the slot is only spent once a bulk job was actually claimed."""
+    job = await asyncio.to_thread(_claim_sync, False)
+    if job is not None:
+        return job
+    async with bulk_lock:  # one worker at a time, so a free slot isn't claimed twice
+        if bulk_limiter.wait_time() > 0:
+            return None
+        job = await asyncio.to_thread(_claim_sync, True)
+        if job is not None and job["priority"] >= PRIORITY_BULK:
+            bulk_limiter.try_acquire()
+    return job
+
+
+async def _worker(handler, limiter: RateLimiter, bulk_limiter: RateLimiter, bulk_lock: asyncio.Lock):
+    while True:
+        job = await _claim(bulk_limiter, bulk_lock)
+        if job is None:
+            _wakeup.clear()
+            timeout = min(JOB_POLL_INTERVAL, bulk_limiter.wait_time() or JOB_POLL_INTERVAL)
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await limiter.acquire()
+        try:
+            await handler(job)
+        except asyncio.CancelledError:
+            raise  # lease stays; the job is reset on next startup
+        except Exception as e:
+            status = await asyncio.to_thread(_fail_sync, job["link_id"], job["attempts"], str(e))
+            print(f"[Queue] Job {job['link_id']} failed (attempt {job['attempts']}, now {status}): {e}")
+        else:
+            await asyncio.to_thread(_complete_sync, job["link_id"])
+
+
+def start_workers(handler, count: int = JOB_WORKERS) -> list[asyncio.Task]:
+    """Start `count` workers that call `await handler(job)` for each claimed job.
+    The handler raising marks the attempt as failed and schedules a retry."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    limiter = RateLimiter(JOB_RATE_PER_MIN)
+    bulk_limiter = RateLimiter(JOB_BULK_RATE_PER_MIN)
+    bulk_lock = asyncio.Lock()
+    for _ in range(count):
+        _workers.append(asyncio.create_task(_worker(handler, limiter, bulk_limiter, bulk_lock)))
+    return _workers
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
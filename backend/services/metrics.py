@@ -0,0 +1,194 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+No external dependency: counters, gauges and histograms are plain dicts keyed
+by label values, so recording a sample costs a dict lookup and (for
+histograms) a bisect. Exposed at `GET /metrics`.
+"""
+import time
+import bisect
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_fmt_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # key -> [bucket counts..., overflow, sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 3)
+        # Past the last bound lands in the overflow slot (only counted in +Inf)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _fmt_labels(self.labels, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _fmt_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {series[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+# ── Pipeline metrics ─────────────────────────────────────────────────
+STAGE_LATENCY = Histogram(
+    "social_saver_stage_latency_seconds",
+    "Latency of pipeline stages and external calls.",
+    ("stage", "provider", "op"),
+)
+STAGE_ERRORS = Counter(
+    "social_saver_stage_errors_total",
+    "Failed pipeline stages / external calls.",
+    ("stage", "provider", "op"),
+)
+STAGE_IN_FLIGHT = Gauge(
+    "social_saver_stage_in_flight",
+    "Calls currently in progress per stage.",
+    ("stage", "provider"),
+)
+LLM_HEDGES = Counter(
+    "social_saver_llm_hedges_total",
+    "Hedged LLM requests (hedged, fallback, secondary_won).",
+    ("outcome",),
+)
+CIRCUIT_STATE = Gauge(
+    "social_saver_circuit_state",
+    "Provider circuit breaker state (0 closed, 1 half-open, 2 open).",
+    ("provider",),
+)
+LOCAL_CLASSIFIER_DECISIONS = Counter(
+    "social_saver_local_classifier_total",
+    "Links categorised locally vs sent to the LLM (local, llm).",
+    ("decision",),
+)
+ADMISSION_SHED = Counter(
+    "social_saver_admission_shed_total",
+    "Ingest requests rejected by admission control.",
+    ("endpoint", "reason"),
+)
+WEBHOOK_DUPLICATES = Counter(
+    "social_saver_webhook_duplicates_total",
+    "Redelivered webhook messages acknowledged without reprocessing.",
+    ("provider",),
+)
+LINKS_CACHE = Counter(
+    "social_saver_links_cache_total",
+    "GET /links read cache lookups.",
+    ("endpoint", "result"),
+)
+STARTUP_SECONDS = Gauge(
+    "social_saver_startup_seconds",
+    "Time spent starting up, per warm-up step and in total (from import to ready).",
+    ("phase",),
+)
+WS_CONNECTIONS = Gauge("social_saver_ws_connections", "Open dashboard WebSocket connections.")
+WS_MESSAGES = Counter("social_saver_ws_messages_total", "WebSocket messages sent.")
+WS_BROADCAST_LATENCY = Histogram(
+    "social_saver_ws_broadcast_seconds", "Time to fan a broadcast out to all WebSocket clients."
+)
+
+
+@contextmanager
+def track(stage: str, provider: str = "", op: str = ""):
+    """Time a block, count it as in flight, and record an error if it raises."""
+    STAGE_IN_FLIGHT.inc(stage=stage, provider=provider)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage, provider=provider, op=op)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage, provider=provider, op=op)
+        STAGE_IN_FLIGHT.dec(stage=stage, provider=provider)
+
+
+def record_error(stage: str, provider: str = "", op: str = ""):
+    """Count a failure that was handled without raising (e.g. a fallback result)."""
+    STAGE_ERRORS.inc(stage=stage, provider=provider, op=op)
+
+
+def in_flight(stage: str) -> float:
+    """Calls currently in flight for a stage, across providers."""
+    return sum(v for (s, _), v in STAGE_IN_FLIGHT._values.items() if s == stage)
+
+
+def errors(stage: str) -> float:
+    """Failures recorded for a stage, across providers and ops."""
+    return sum(v for (s, _, _), v in STAGE_ERRORS._values.items() if s == stage)
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,147 @@
+"""Extractive prompt compaction — shrink scraped text before it reaches the LLM.
+
+Drops boilerplate (cookie banners, nav/subscribe text) and repeated lines,
+then ranks sentences with a term-frequency scorer and keeps the best ones, in
+their original order, until the token budget is filled. Pure Python, no
+model or extra dependency.
+"""
+import os
+import re
+import math
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "600"))
+CHARS_PER_TOKEN = 4  # rough average for English text
+
+# A line is boilerplate only when it consists entirely of these phrases, so
+# content that merely mentions "log in" or "cookies" is kept. Menu-style
+# phrases may repeat with separators ("Home | About | Subscribe"); the
+# open-ended banners must make up the whole line on their own.
+BOILERPLATE_PHRASES = (
+    r"(accept|allow|reject|decline|manage) (all )?(cookies|cookie settings)",
+    r"cookie (policy|settings|preferences)",
+    r"privacy policy",
+    r"terms (of (use|service)|and conditions)",
+    r"(sign up|subscribe) (for|to) (our|the) newsletter",
+    r"subscribe( now| today)?",
+    r"newsletter",
+    r"(sign|log) ?(in|up|out)",
+    r"share (this( post| article| story)?|on [a-z]+)",
+    r"follow us( on [a-z]+)?",
+    r"advertisement",
+    r"skip to (main )?content",
+    r"read more|continue reading",
+    r"related (posts|articles|stories)",
+    r"click here",
+    r"home|about( us)?|contact( us)?|menu|search",
+)
+BOILERPLATE_BANNERS = (
+    r"(we use|this (site|website) uses) cookies\b.*",
+    r"(please )?enable javascript\b.*",
+    r"((©|\(c\)|copyright) )?[^|]{0,60}all rights reserved\.?",
+)
+_PHRASE = "(?:%s)" % "|".join(f"(?:{p})" for p in BOILERPLATE_PHRASES)
+BOILERPLATE_RE = re.compile(
+    r"^[\W_]*(?:%s|%s(?:[\W_]+%s)*)[\W_]*$" % ("|".join(f"(?:{p})" for p in BOILERPLATE_BANNERS), _PHRASE, _PHRASE),
+    re.IGNORECASE,
+)
+BOILERPLATE_MAX_CHARS = 300  # longer lines are always content
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+WORD_RE = re.compile(r"[a-z][a-z0-9'-]{2,}")
+
+STOPWORDS = frozenset("""
+the and for are but not you your with this that from have has had was were will would can could
+should they them their there then than what when where which who whom why how all any each few
+more most other some such only own same into over under again further once here also just very
+its it's our out off about above below between both being been because before after while during
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _clean_lines(text: str) -> list[str]:
+    """Strip boilerplate and duplicate lines, keeping the first line (usually the title)."""
+    lines = []
+    seen = set()
+    for i, line in enumerate(text.splitlines()):
+        line = " ".join(line.split())
+        if not line:
+            continue
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if i > 0 and len(line) <= BOILERPLATE_MAX_CHARS and BOILERPLATE_RE.match(line):
+            continue
+        lines.append(line)
+    return lines
+
+
+def _words(text: str) -> list[str]:
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _score_sentences(sentences: list[str], title: str = "") -> list[float]:
+    # Title terms count as extra occurrences: the title is the best query we have.
+    freq: dict[str, int] = {w: 2 for w in _words(title)}
+    tokenized = []
+    for sentence in sentences:
+        words = _words(sentence)
+        tokenized.append(words)
+        for w in set(words):
+            freq[w] = freq.get(w, 0) + 1
+    scores = []
+    n = len(sentences)
+    for pos, words in enumerate(tokenized):
+        if not words:
+            scores.append(0.0)
+            continue
+        # Sentences dense in the document's recurring terms carry its topic;
+        # sqrt length normalisation avoids favouring run-on sentences.
+        content = sum(freq[w] for w in words) / math.sqrt(len(words))
+        position = 1.0 + 0.5 * (1 - pos / n)  # lead sentences matter a bit more
+        scores.append(content * position)
+    return scores
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return cut[:space] if space > max_chars // 2 else cut
+
+
+def compact_text(text: str, token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Return the most informative part of `text` that fits in `token_budget` tokens."""
+    lines = _clean_lines(text or "")
+    cleaned = "\n".join(lines)
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    if len(cleaned) <= budget_chars:
+        return cleaned
+
+    # A short first line (title / caption head) is kept verbatim; the rest competes.
+    if len(lines[0]) <= min(200, budget_chars // 2):
+        head, body = lines[0], lines[1:]
+    else:
+        head, body = "", lines
+    sentences = []
+    for line in body:
+        sentences.extend(s for s in SENTENCE_SPLIT_RE.split(line) if s)
+    scores = _score_sentences(sentences, title=head)
+
+    remaining = budget_chars - len(head) - 1
+    chosen = set()
+    for idx in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        cost = len(sentences[idx]) + 1
+        if cost <= remaining:
+            chosen.add(idx)
+            remaining -= cost
+    if not chosen and sentences:
+        # Nothing fits whole (run-on text, no punctuation): cut the best
+        # sentence at a word boundary rather than sending the head alone.
+        best = max(range(len(sentences)), key=lambda i: scores[i])
+        return "\n".join(filter(None, [head, _truncate(sentences[best], remaining - 1)]))
+    kept = [sentences[i] for i in sorted(chosen)]
+    return "\n".join([head, *kept]).strip()
@@ -0,0 +1,87 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """Async pacing limiter — allows at most `per_minute` acquisitions per minute.
+
+    Callers are spaced evenly instead of bursting, so a large batch trickles
+    into the scrape/AI pipeline at a steady rate. A rate of 0 disables pacing.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now; never waits."""
+        if not self.interval:
+            return True
+        now = time.monotonic()
+        if now < self._next_slot:
+            return False
+        self._next_slot = now + self.interval
+        return True
+
+    def wait_time(self) -> float:
+        """Seconds until the next slot frees up."""
+        return max(0.0, self._next_slot - time.monotonic())
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` burst, refilled at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, cost: float = 1) -> bool:
+        self._refill(time.monotonic())
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def retry_after(self, cost: float = 1) -> float:
+        """Seconds until `cost` tokens are available."""
+        missing = min(cost, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+
+class KeyedTokenBuckets:
+    """One TokenBucket per key (e.g. per sender), least recently used keys evicted
+    beyond `max_keys` so a flood of distinct senders can't grow memory unbounded."""
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def get(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
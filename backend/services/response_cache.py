@@ -0,0 +1,95 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# ── Read cache for link responses ────────────────────────────────────
+# Serialized GET /links responses are kept here with a strong ETag. Every
+# write in the data layer invalidates exactly the entries it can affect:
+# inserts drop the list pages, updates and deletes also drop that link's
+# detail entry. The TTL is only a backstop for writes made by another
+# process (e.g. the backfill CLI or edits in the Supabase dashboard).
+
+LINKS_CACHE_TTL = float(os.getenv("LINKS_CACHE_TTL", "60"))  # 0 = disabled
+LINKS_CACHE_MAX_ENTRIES = int(os.getenv("LINKS_CACHE_MAX_ENTRIES", "256"))
+
+LIST_PREFIX = "list:"
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires: float
+    variants: dict[str, bytes] = field(default_factory=dict)  # compressed bodies by encoding
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+ENCODING_SUFFIXES = ('-br"', '-gzip"')
+
+
+def _base_etag(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/")
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if any tag in If-None-Match names `etag` or one of its compressed
+    representations (see services.responses.negotiated_response)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(_base_etag(c) == etag for c in candidates)
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = LINKS_CACHE_TTL, max_entries: int = LINKS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0  # bumped on every invalidation
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, body: bytes, generation: int) -> CachedResponse:
+        """Store a body rendered from data read at `generation`. If a write
+        invalidated the cache meanwhile, the (possibly stale) body is returned
+        but not stored."""
+        entry = CachedResponse(body, make_etag(body), time.monotonic() + self.ttl)
+        if self.ttl > 0 and generation == self.generation:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate_lists(self):
+        self.generation += 1
+        for key in [k for k in self._entries if k.startswith(LIST_PREFIX)]:
+            del self._entries[key]
+
+    def invalidate_link(self, link_id: str):
+        self.invalidate_lists()
+        self._entries.pop(f"link:{link_id}", None)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+links_cache = ResponseCache()
@@ -0,0 +1,104 @@
+import os
+import gzip
+import json
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+# ── Response encoding ────────────────────────────────────────────────
+# orjson serializes link lists several times faster than the stdlib, and
+# large bodies are compressed with the best encoding the client accepts.
+# Both dependencies are optional; without them we fall back to json / gzip.
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+    _orjson_available = True
+except ImportError:
+    DefaultJSONResponse = JSONResponse
+    _orjson_available = False
+
+try:
+    import brotli
+    _brotli_available = True
+except ImportError:
+    _brotli_available = False
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+
+def dumps(payload) -> bytes:
+    if _orjson_available:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("br", "gzip") if _brotli_available else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():  # preference order breaks ties
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def negotiate(request: Request, body: bytes) -> str | None:
+    """Content-Encoding to use for `body`, None to send it as is."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return None
+    return choose_encoding(request.headers.get("accept-encoding"))
+
+
+def representation_etag(etag: str, encoding: str | None) -> str:
+    """Strong ETags must differ per representation: "abc" → "abc-gzip"."""
+    return etag[:-1] + f'-{encoding}"' if encoding else etag
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiated_response(
+    request: Request,
+    body: bytes,
+    media_type: str = "application/json",
+    headers: dict | None = None,
+    variants: dict[str, bytes] | None = None,
+) -> Response:
+    """Response with `body` compressed per Accept-Encoding when it is large
+    enough. Pass a `variants` dict to memoize compressed bodies (read cache)."""
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    encoding = negotiate(request, body)
+    if encoding:
+        encoded = variants.get(encoding) if variants is not None else None
+        if encoded is None:
+            encoded = compress(body, encoding)
+            if variants is not None:
+                variants[encoding] = encoded
+        body = encoded
+        headers["Content-Encoding"] = encoding
+        if "ETag" in headers:
+            headers["ETag"] = representation_etag(headers["ETag"], encoding)
+    return Response(body, media_type=media_type, headers=headers)
@@ -1,10 +1,30 @@
 import os
-import httpx
+import codecs
 import asyncio
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlparse
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from models.link import LinkSource
+from services.metrics import track, record_error
+from services.http_clients import get_client
 
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY", "")
 RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "instagram-scraper-api2.p.rapidapi.com")
+RAPIDAPI_BASE_URL = os.getenv("RAPIDAPI_BASE_URL", f"https://{RAPIDAPI_HOST}")
+
+# HTML extraction is CPU-bound: it runs in a bounded pool, off the event loop.
+SCRAPE_PARSE_EXECUTOR = os.getenv("SCRAPE_PARSE_EXECUTOR", "process")  # process | thread
+SCRAPE_PARSE_WORKERS = int(os.getenv("SCRAPE_PARSE_WORKERS", "2"))
+# auto: skip full article extraction when <head> already has a title and a
+# description of at least SCRAPE_HEAD_MIN_CHARS characters.
+SCRAPE_FULL_EXTRACTION = os.getenv("SCRAPE_FULL_EXTRACTION", "auto")  # auto | always | never
+SCRAPE_HEAD_MIN_CHARS = int(os.getenv("SCRAPE_HEAD_MIN_CHARS", "120"))
+# Downloads are streamed and stop after this many bytes — enough for the
+# <head> and the start of the article.
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(1024 * 1024)))
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Article text handed on to the prompt compactor, which picks what the LLM sees.
+SCRAPE_MAX_TEXT_CHARS = int(os.getenv("SCRAPE_MAX_TEXT_CHARS", "20000"))
 
 
 async def scrape_instagram(url: str) -> dict:
@@ -18,63 +38,254 @@ async def scrape_instagram(url: str) -> dict:
     }
     params = {"url": url}
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.get(
-                f"https://{RAPIDAPI_HOST}/v1/post_info",
-                headers=headers,
-                params=params,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            media = data.get("data", {})
-            return {
-                "caption": media.get("caption", ""),
-                "thumbnail_url": media.get("thumbnail_url") or media.get("display_url", ""),
-                "owner_username": media.get("owner", {}).get("username", ""),
-                "raw_text": media.get("caption", ""),
-            }
+        resp = await get_client("rapidapi").get(
+            f"{RAPIDAPI_BASE_URL}/v1/post_info",
+            headers=headers,
+            params=params,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        media = data.get("data", {})
+        return {
+            "caption": media.get("caption", ""),
+            "thumbnail_url": media.get("thumbnail_url") or media.get("display_url", ""),
+            "owner_username": media.get("owner", {}).get("username", ""),
+            "raw_text": media.get("caption", ""),
+        }
     except Exception as e:
         return {"error": str(e), "raw_text": url}
 
 
+class _HeadDone(Exception):
+    pass
+
+
+class _HeadMetaParser(HTMLParser):
+    """Incremental parser that only reads the document <head>.
+
+    Collects <title> and the og:/author <meta> tags, then aborts as soon as
+    </head> or <body> is reached so the article body is never tokenized.
+    """
+
+    META_KEYS = {
+        "og:title": "og_title",
+        "og:description": "description",
+        "description": "description",
+        "twitter:description": "description",
+        "og:image": "thumbnail_url",
+        "twitter:image": "thumbnail_url",
+        "author": "author",
+        "article:author": "author",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: dict[str, str] = {}
+        self.done = False
+        self._in_title = False
+        self._title: list[str] = []
+
+    def feed_chunk(self, text: str) -> bool:
+        """Feed the next piece of the document; returns True once the head is complete."""
+        if not self.done:
+            try:
+                self.feed(text)
+            except _HeadDone:
+                self.done = True
+            except Exception:
+                self.done = True  # malformed markup: keep whatever was collected
+        return self.done
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            raise _HeadDone
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            key = self.META_KEYS.get((attrs.get("property") or attrs.get("name") or "").lower())
+            content = (attrs.get("content") or "").strip()
+            if key and content and key not in self.meta:  # first occurrence wins (og: before fallbacks)
+                self.meta[key] = content
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "head":
+            raise _HeadDone
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title.append(data)
+
+    def result(self) -> dict:
+        return {
+            "title": self.meta.get("og_title") or "".join(self._title).strip(),
+            "description": self.meta.get("description", ""),
+            "thumbnail_url": self.meta.get("thumbnail_url", ""),
+            "author": self.meta.get("author", ""),
+        }
+
+
+def extract_head_meta(html: str, chunk_size: int = 8192) -> dict:
+    """Fast path: pull title/description/og:image/author from <head> alone."""
+    parser = _HeadMetaParser()
+    for start in range(0, len(html), chunk_size):
+        if parser.feed_chunk(html[start: start + chunk_size]):
+            break
+    return parser.result()
+
+
+def _extract_article(url: str, html: str) -> dict:
+    """Full article extraction (CPU-bound). Runs in the parse pool, never on the event loop."""
+    # Try newspaper3k for rich extraction
+    try:
+        from newspaper import Article
+        article = Article(url)
+        article.set_html(html)
+        article.parse()
+        return {
+            "title": article.title,
+            "raw_text": article.text[:SCRAPE_MAX_TEXT_CHARS],
+            "thumbnail_url": article.top_image or "",
+            "author": ", ".join(article.authors) if article.authors else "",
+        }
+    except Exception:
+        pass
+
+    # Fallback: BeautifulSoup
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+    title = soup.title.string if soup.title else ""
+    paragraphs = [p.get_text(strip=True) for p in soup.find_all("p")]
+    raw_text = "\n".join(paragraphs)[:SCRAPE_MAX_TEXT_CHARS]
+    og_image = ""
+    og_tag = soup.find("meta", property="og:image")
+    if og_tag:
+        og_image = og_tag.get("content", "")
+    return {"title": title, "raw_text": raw_text, "thumbnail_url": og_image, "author": ""}
+
+
+_parse_executor: Executor | None = None
+_parse_slots: asyncio.Semaphore | None = None
+
+
+def _get_parse_executor() -> Executor:
+    global _parse_executor
+    if _parse_executor is None:
+        if SCRAPE_PARSE_EXECUTOR == "process":
+            _parse_executor = ProcessPoolExecutor(max_workers=SCRAPE_PARSE_WORKERS)
+        else:
+            _parse_executor = ThreadPoolExecutor(max_workers=SCRAPE_PARSE_WORKERS, thread_name_prefix="parse")
+    return _parse_executor
+
+
+def shutdown_parse_executor():
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+async def extract_article_off_loop(url: str, html: str) -> dict:
+    """Full article extraction on the parse pool, bounded so bursts queue here."""
+    global _parse_slots
+    if _parse_slots is None:
+        # Bound queued work too, so a burst can't pile up unbounded HTML in memory
+        _parse_slots = asyncio.Semaphore(SCRAPE_PARSE_WORKERS * 2)
+    async with _parse_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_parse_executor(), _extract_article, url, html)
+
+
+def _needs_full_extraction(head: dict) -> bool:
+    if SCRAPE_FULL_EXTRACTION == "always":
+        return True
+    if SCRAPE_FULL_EXTRACTION == "never":
+        return False
+    return not head["title"] or len(head["description"]) < SCRAPE_HEAD_MIN_CHARS
+
+
+def _filename_title(url: str) -> str:
+    name = unquote(urlparse(url).path.rstrip("/").rsplit("/", 1)[-1])
+    return os.path.splitext(name)[0].replace("-", " ").replace("_", " ").strip() or urlparse(url).netloc
+
+
+def _scrape_media(url: str, content_type: str, content_length: str | None) -> dict:
+    """Lightweight handler for non-HTML responses — built from headers and URL only,
+    the body is never downloaded."""
+    title = _filename_title(url)
+    size = f" ({int(content_length) // 1024} KB)" if content_length and content_length.isdigit() else ""
+    if content_type.startswith("image/"):
+        kind, thumbnail = "Image", url
+    elif content_type == "application/pdf":
+        kind, thumbnail = "PDF document", ""
+    elif content_type.startswith("video/"):
+        kind, thumbnail = "Video", ""
+    elif content_type.startswith("audio/"):
+        kind, thumbnail = "Audio", ""
+    else:
+        kind, thumbnail = f"File ({content_type})", ""
+    return {
+        "title": title,
+        "raw_text": f"{kind}{size}: {title}\n{url}",
+        "thumbnail_url": thumbnail,
+        "author": "",
+        "content_type": content_type,
+    }
+
+
+def _is_html(content_type: str) -> bool:
+    # Missing Content-Type: assume a page and let the byte cap protect us
+    return not content_type or content_type in HTML_CONTENT_TYPES
+
+
 async def scrape_web(url: str) -> dict:
-    """Extract readable content from a web page using httpx + BeautifulSoup."""
+    """Extract readable content from a web page.
+
+    The body is streamed and capped at SCRAPE_MAX_BYTES; non-HTML responses
+    are described from their headers without downloading the body. <head>
+    metadata is parsed as chunks arrive, and the download stops as soon as the
+    head alone is enough. Full article extraction (newspaper3k / BeautifulSoup)
+    only runs when it isn't, and then in a bounded worker pool.
+    """
     try:
-        async with httpx.AsyncClient(
-            timeout=20,
-            follow_redirects=True,
-            headers={"User-Agent": "Mozilla/5.0 (Social Saver Bot)"},
-        ) as client:
-            resp = await client.get(url)
+        async with get_client("web").stream("GET", url) as resp:
             resp.raise_for_status()
-            html = resp.text
-
-        # Try newspaper3k for rich extraction
-        try:
-            from newspaper import Article
-            article = Article(url)
-            article.set_html(html)
-            article.parse()
-            return {
-                "title": article.title,
-                "raw_text": article.text[:3000],  # cap at 3k chars
-                "thumbnail_url": article.top_image or "",
-                "author": ", ".join(article.authors) if article.authors else "",
-            }
-        except Exception:
-            pass
+            content_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+            if not _is_html(content_type):
+                return _scrape_media(url, content_type, resp.headers.get("content-length"))
+
+            try:
+                decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            parser = _HeadMetaParser()
+            parts: list[str] = []
+            received = 0
+            async for chunk in resp.aiter_bytes():
+                chunk = chunk[: SCRAPE_MAX_BYTES - received]
+                received += len(chunk)
+                text = decoder.decode(chunk)
+                parts.append(text)
+                if parser.feed_chunk(text) and not _needs_full_extraction(parser.result()):
+                    break  # the head alone is enough — skip the rest of the page
+                if received >= SCRAPE_MAX_BYTES:
+                    break
 
-        # Fallback: BeautifulSoup
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, "lxml")
-        title = soup.title.string if soup.title else ""
-        paragraphs = [p.get_text(strip=True) for p in soup.find_all("p")]
-        raw_text = " ".join(paragraphs)[:3000]
-        og_image = ""
-        og_tag = soup.find("meta", property="og:image")
-        if og_tag:
-            og_image = og_tag.get("content", "")
-        return {"title": title, "raw_text": raw_text, "thumbnail_url": og_image, "author": ""}
+        html = "".join(parts)
+        head = parser.result()
+        result = {
+            "title": head["title"],
+            "raw_text": "\n".join(filter(None, [head["title"], head["description"]])) or url,
+            "thumbnail_url": head["thumbnail_url"],
+            "author": head["author"],
+        }
+        if _needs_full_extraction(head):
+            article = await extract_article_off_loop(url, html)
+            # Prefer the article's fields, keep head metadata where it came back empty
+            result.update({k: v for k, v in article.items() if v})
+        return result
 
     except Exception as e:
         return {"error": str(e), "raw_text": url, "title": "", "thumbnail_url": "", "author": ""}
@@ -83,23 +294,25 @@ async def scrape_web(url: str) -> dict:
 async def scrape_twitter(url: str) -> dict:
     """Basic Twitter/X scrape — metadata only (no API required)."""
     try:
-        async with httpx.AsyncClient(
-            timeout=15,
-            follow_redirects=True,
-            headers={"User-Agent": "Twitterbot/1.0"},
-        ) as client:
-            resp = await client.get(url)
-            raw_text = f"Twitter/X link: {url}"
-            return {"raw_text": raw_text, "title": "Twitter Post", "thumbnail_url": "", "author": ""}
+        # Reachability check only — the page body is never read
+        async with get_client("twitter").stream("GET", url):
+            pass
+        raw_text = f"Twitter/X link: {url}"
+        return {"raw_text": raw_text, "title": "Twitter Post", "thumbnail_url": "", "author": ""}
     except Exception as e:
         return {"error": str(e), "raw_text": url, "title": "", "thumbnail_url": "", "author": ""}
 
 
 async def scrape(url: str, source: LinkSource) -> dict:
     """Dispatch scraping based on source type."""
-    if source == LinkSource.instagram:
-        return await scrape_instagram(url)
-    elif source == LinkSource.twitter:
-        return await scrape_twitter(url)
-    else:
-        return await scrape_web(url)
+    provider = getattr(source, "value", source)
+    with track("scrape", provider):
+        if source == LinkSource.instagram:
+            result = await scrape_instagram(url)
+        elif source == LinkSource.twitter:
+            result = await scrape_twitter(url)
+        else:
+            result = await scrape_web(url)
+    if result.get("error"):
+        record_error("scrape", provider)
+    return result
@@ -0,0 +1,218 @@
+"""Thumbnail proxy: fetch each preview image once, keep resized copies on disk.
+
+Scraped `thumbnail_url`s point at third-party CDNs — Instagram's expire, and
+og:images are often full-size photos. During the pipeline the image is
+downloaded once, resized to THUMBS_WIDTHS (when Pillow is installed) and
+stored under THUMBS_DIR keyed by a hash of the source bytes, so identical
+images shared by many links are stored once. Files are served from
+/thumbs/{hash} and never change, so they can be cached forever. The
+directory is capped at THUMBS_MAX_MB, evicting least recently served images;
+links keep the source URL in `thumbnail_source`, so an evicted image is
+fetched again on its next request.
+"""
+import os
+import io
+import re
+import asyncio
+import hashlib
+import shutil
+import threading
+from collections import OrderedDict
+
+from services.metrics import track, record_error
+from services.http_clients import get_client
+
+try:
+    from PIL import Image
+    _pillow_available = True
+except ImportError:
+    _pillow_available = False
+
+THUMBS_ENABLED = os.getenv("THUMBS_ENABLED", "true").lower() == "true"
+THUMBS_DIR = os.getenv("THUMBS_DIR", "thumbs")
+THUMBS_WIDTHS = tuple(sorted(int(w) for w in os.getenv("THUMBS_WIDTHS", "160,320,640").split(",") if w.strip()))
+THUMBS_QUALITY = int(os.getenv("THUMBS_QUALITY", "80"))
+THUMBS_MAX_SOURCE_BYTES = int(os.getenv("THUMBS_MAX_SOURCE_BYTES", str(10 * 1024 * 1024)))
+THUMBS_MAX_MB = float(os.getenv("THUMBS_MAX_MB", "512"))
+
+HASH_RE = re.compile(r"^[0-9a-f]{32}$")
+ORIGINAL_TYPES = {  # stored as-is when Pillow isn't available
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "image/avif": "avif",
+}
+MEDIA_TYPES = {ext: media for media, ext in ORIGINAL_TYPES.items()}
+
+
+class _Store:
+    """Index of cached images (hash → bytes on disk) in least-recently-used order.
+    Each image lives in its own directory: THUMBS_DIR/<hash>/<width>.jpg."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        # Rebuild the index from disk once, least recently served (mtime) first
+        if self._loaded:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        found = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or not HASH_RE.match(entry.name):
+                continue
+            files = [f.stat() for f in os.scandir(entry.path) if f.is_file()]
+            if files:
+                found.append((max(f.st_mtime for f in files), entry.name, sum(f.st_size for f in files)))
+        for _, digest, size in sorted(found):
+            self._entries[digest] = size
+        self.total = sum(size for _, _, size in found)
+        self._loaded = True
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest)
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return digest in self._entries
+
+    def add(self, digest: str, files: dict[str, bytes]):
+        with self._lock:
+            self._ensure_loaded()
+            directory = self.path(digest)
+            os.makedirs(directory, exist_ok=True)
+            size = 0
+            for name, data in files.items():
+                tmp = os.path.join(directory, f".{name}.tmp")
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, os.path.join(directory, name))  # atomic: readers never see partial files
+                size += len(data)
+            self.total += size - self._entries.get(digest, 0)
+            self._entries[digest] = size
+            self._entries.move_to_end(digest)
+            self._evict()
+
+    def touch(self, digest: str, path: str):
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+        try:
+            os.utime(path)  # keeps LRU order across restarts
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self.total > self.max_bytes and len(self._entries) > 1:
+            digest, size = self._entries.popitem(last=False)
+            shutil.rmtree(self.path(digest), ignore_errors=True)
+            self.total -= size
+
+
+_store = _Store(THUMBS_DIR, int(THUMBS_MAX_MB * 1024 * 1024))
+_by_url: OrderedDict[str, str] = OrderedDict()  # source URL → hash, so retries don't refetch
+_BY_URL_MAX = 10000
+
+
+def _resize_sync(data: bytes) -> dict[str, bytes]:
+    """JPEG variants for each width no larger than the source image."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (max(THUMBS_WIDTHS), max(THUMBS_WIDTHS)))  # fast JPEG downscale on decode
+        img = img.convert("RGB")
+        variants = {}
+        widths = [w for w in THUMBS_WIDTHS if w < img.width] or [img.width]
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            out = io.BytesIO()
+            img.resize((width, height), Image.LANCZOS).save(out, "JPEG", quality=THUMBS_QUALITY, optimize=True)
+            variants[f"{width}.jpg"] = out.getvalue()
+        return variants
+
+
+async def _download(url: str) -> tuple[bytes, str] | None:
+    async with get_client("thumbnails").stream("GET", url) as resp:
+        resp.raise_for_status()
+        content_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+        if not content_type.startswith("image/"):
+            return None
+        chunks, received = [], 0
+        async for chunk in resp.aiter_bytes():
+            received += len(chunk)
+            if received > THUMBS_MAX_SOURCE_BYTES:
+                return None
+            chunks.append(chunk)
+    return b"".join(chunks), content_type
+
+
+def thumb_path(digest: str) -> str:
+    """Relative URL a cached image is served from (resolved against the API base)."""
+    return f"/thumbs/{digest}"
+
+
+async def cache_thumbnail(url: str) -> str | None:
+    """Fetch and store the image at `url`; returns its /thumbs path, or None
+    if it could not be cached (callers keep the original URL then)."""
+    if not THUMBS_ENABLED or not url or not url.startswith(("http://", "https://")):
+        return None
+    digest = _by_url.get(url)  # hashes are only known after download
+    if digest is None or digest not in _store:
+        with track("thumbnail", "fetch"):
+            try:
+                downloaded = await _download(url)
+            except Exception as e:
+                record_error("thumbnail", "fetch")
+                print(f"[Thumbs] Fetch failed for {url}: {e}")
+                return None
+        if downloaded is None:
+            return None
+        data, content_type = downloaded
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest not in _store:
+            if _pillow_available:
+                try:
+                    files = await asyncio.to_thread(_resize_sync, data)
+                except Exception as e:
+                    print(f"[Thumbs] Could not decode {url}: {e}")
+                    return None
+            elif content_type in ORIGINAL_TYPES:
+                files = {f"original.{ORIGINAL_TYPES[content_type]}": data}
+            else:
+                return None
+            try:
+                await asyncio.to_thread(_store.add, digest, files)
+            except OSError as e:  # disk full, permissions — never fail the link over a preview
+                record_error("thumbnail", "store")
+                print(f"[Thumbs] Could not store {url}: {e}")
+                return None
+        _by_url[url] = digest
+        if len(_by_url) > _BY_URL_MAX:
+            _by_url.popitem(last=False)
+    return thumb_path(digest)
+
+
+def find(digest: str, width: int | None = None) -> tuple[str, str] | None:
+    """(path, media type) of the stored variant best matching `width`:
+    the smallest one at least that wide, else the largest."""
+    if not HASH_RE.match(digest) or digest not in _store:
+        return None
+    try:
+        names = [n for n in os.listdir(_store.path(digest)) if not n.startswith(".")]
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+    sized = sorted((int(n.split(".")[0]), n) for n in names if n.split(".")[0].isdigit())
+    if sized:
+        name = next((n for w, n in sized if width and w >= width), sized[-1][1])
+    else:
+        name = names[0]  # original, stored without Pillow
+    path = os.path.join(_store.path(digest), name)
+    _store.touch(digest, path)
+    return path, MEDIA_TYPES.get(name.rsplit(".", 1)[1], "application/octet-stream")
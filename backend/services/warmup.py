@@ -0,0 +1,90 @@
+"""Warm start: pay first-request costs during startup instead of on the first link.
+
+The SDKs and parsers are imported lazily and clients are built on first use,
+so without this the first link after a deploy pays for importing
+google.generativeai/openai/newspaper, building every client, forking the
+parse pool and so on. The lifespan runs `warm_up()` before /ready reports the
+worker as ready. A failing step is logged and skipped — a missing optional
+dependency must never keep a worker out of rotation.
+"""
+import os
+import time
+import asyncio
+import importlib
+
+from db import supabase_client as db
+from services import ai_synthesizer, http_clients, scraper, whatsapp
+from services.prompt_compactor import compact_text
+
+WARM_START = os.getenv("WARM_START", "true").lower() == "true"
+
+# Imported lazily inside hot functions; optional ones may be missing
+WARM_MODULES = (
+    "google.generativeai",
+    "openai",
+    "newspaper",
+    "bs4",
+    "lxml",
+    "twilio.rest",
+    "PIL.Image",
+    "numpy",
+)
+
+_SAMPLE_HTML = (
+    "<html><head><title>Warm-up</title>"
+    '<meta property="og:description" content="Startup warm-up page.">'
+    "</head><body>" + "<p>Warm-up paragraph with enough words to parse.</p>" * 20 + "</body></html>"
+)
+
+
+def _import_modules() -> list[str]:
+    loaded = []
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except ImportError:
+            pass
+    return loaded
+
+
+async def _warm_imports():
+    loaded = await asyncio.to_thread(_import_modules)
+    print(f"[Warmup] Imported {', '.join(loaded) or 'nothing'}")
+
+
+async def _warm_clients():
+    for name in http_clients.CLIENTS:
+        http_clients.get_client(name)
+    for name in ai_synthesizer.configured_providers():
+        ai_synthesizer.get_provider_client(name)
+    await asyncio.to_thread(whatsapp.get_twilio_client)
+    await db.get_links(limit=1, fields=["id"])  # opens the Supabase / SQLite connection; one-row probe
+
+
+async def _warm_parsers():
+    scraper.extract_head_meta(_SAMPLE_HTML)
+    compact_text(_SAMPLE_HTML)
+    # Starts the parse pool (forking workers when it is a process pool) and
+    # loads newspaper/bs4 wherever extraction actually runs
+    await scraper.extract_article_off_loop("https://example.com/warmup", _SAMPLE_HTML)
+
+
+STEPS = {
+    "imports": _warm_imports,
+    "clients": _warm_clients,
+    "parsers": _warm_parsers,
+}
+
+
+async def warm_up() -> dict[str, float]:
+    """Run every warm-up step; returns seconds spent per step."""
+    timings = {}
+    for name, step in STEPS.items():
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            print(f"[Warmup] {name} step failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 3)
+    return timings
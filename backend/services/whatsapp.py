@@ -1,5 +1,6 @@
 import os
-import httpx
+from services.metrics import track, record_error
+from services.http_clients import get_client
 
 try:
     from twilio.rest import Client as TwilioClient
@@ -14,21 +15,39 @@ TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238
 META_ACCESS_TOKEN = os.getenv("META_ACCESS_TOKEN", "")
 META_PHONE_NUMBER_ID = os.getenv("META_PHONE_NUMBER_ID", "")
 WEBHOOK_PROVIDER = os.getenv("WEBHOOK_PROVIDER", "twilio")
+META_GRAPH_BASE_URL = os.getenv("META_GRAPH_BASE_URL", "https://graph.facebook.com/v19.0")
 
 
 async def send_whatsapp_message(to: str, message: str) -> bool:
     """Send a WhatsApp message via Twilio or Meta Graph API."""
-    if WEBHOOK_PROVIDER == "meta":
-        return await _send_via_meta(to, message)
-    return _send_via_twilio(to, message)
+    provider = "meta" if WEBHOOK_PROVIDER == "meta" else "twilio"
+    with track("whatsapp", provider):
+        if provider == "meta":
+            sent = await _send_via_meta(to, message)
+        else:
+            sent = _send_via_twilio(to, message)
+    if not sent:
+        record_error("whatsapp", provider)
+    return sent
+
+
+_twilio_client = None
+
+
+def get_twilio_client():
+    """Twilio REST client, created once (None when Twilio isn't configured)."""
+    global _twilio_client
+    if _twilio_client is None and _twilio_available and TWILIO_ACCOUNT_SID and "placeholder" not in TWILIO_ACCOUNT_SID:
+        _twilio_client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _twilio_client
 
 
 def _send_via_twilio(to: str, message: str) -> bool:
-    if not _twilio_available or not TWILIO_ACCOUNT_SID or "placeholder" in TWILIO_ACCOUNT_SID:
+    client = get_twilio_client()
+    if client is None:
         print(f"[WhatsApp Demo] Would send to {to}: {message}")
         return True
     try:
-        client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
         # Normalize number format
         if not to.startswith("whatsapp:"):
             to = f"whatsapp:{to}"
@@ -53,14 +72,13 @@ async def _send_via_meta(to: str, message: str) -> bool:
         "text": {"preview_url": False, "body": message},
     }
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(
-                f"https://graph.facebook.com/v19.0/{META_PHONE_NUMBER_ID}/messages",
-                headers={"Authorization": f"Bearer {META_ACCESS_TOKEN}"},
-                json=payload,
-            )
-            resp.raise_for_status()
-            return True
+        resp = await get_client("meta").post(
+            f"{META_GRAPH_BASE_URL}/{META_PHONE_NUMBER_ID}/messages",
+            headers={"Authorization": f"Bearer {META_ACCESS_TOKEN}"},
+            json=payload,
+        )
+        resp.raise_for_status()
+        return True
     except Exception as e:
         print(f"[WhatsApp] Meta send error: {e}")
         return False
@@ -0,0 +1,17 @@
+"""Shared fixtures: every test starts from the same in-memory demo store."""
+import copy
+import pytest
+
+from db import supabase_client as db
+from services.response_cache import links_cache
+
+
+@pytest.fixture(autouse=True)
+def demo_store():
+    """Snapshot the module-level demo store and restore it after the test, so
+    inserts, renames and soft deletes don't leak into later tests."""
+    snapshot = copy.deepcopy(db._demo_store)
+    yield db._demo_store
+    db._demo_store[:] = snapshot
+    db.rebuild_sender_index()
+    links_cache.clear()
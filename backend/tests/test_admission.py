@@ -0,0 +1,128 @@
+"""Tests for ingest admission control."""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+with (
+    patch("db.supabase_client.get_supabase"),
+    patch("services.whatsapp.TwilioClient"),
+):
+    from main import app
+
+from services import admission
+from services.rate_limit import TokenBucket, KeyedTokenBuckets
+
+app.state.broadcast = AsyncMock()
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(admission, "_buckets", KeyedTokenBuckets(rate=1 / 60, capacity=2))
+    monkeypatch.setattr(admission, "_notices", KeyedTokenBuckets(rate=1 / 60, capacity=1))
+    monkeypatch.setattr(admission, "_bulk_buckets", KeyedTokenBuckets(rate=1 / 3600, capacity=1))
+    monkeypatch.setattr(admission, "INGEST_RATE_PER_MIN", 1)
+    monkeypatch.setattr(admission.job_queue, "backlog", AsyncMock(return_value=0))
+
+
+def test_token_bucket_burst_then_refill(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("services.rate_limit.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.retry_after() == pytest.approx(1.0)
+    now[0] += 1
+    assert bucket.try_acquire()
+
+
+def test_keyed_buckets_evict_least_recent():
+    buckets = KeyedTokenBuckets(rate=1, capacity=1, max_keys=2)
+    a = buckets.get("a")
+    buckets.get("b")
+    buckets.get("a")
+    buckets.get("c")
+    assert buckets.get("a") is a
+    assert "b" not in buckets._buckets
+
+
+def test_admit_per_sender():
+    assert asyncio.run(admission.admit("+1", 2, "test")) is None
+    reason, retry_after = asyncio.run(admission.admit("+1", 1, "test"))
+    assert reason == "sender_rate" and retry_after > 0
+    assert asyncio.run(admission.admit("+2", 1, "test")) is None
+
+
+def test_admit_charges_every_link():
+    reason, _ = asyncio.run(admission.admit("+1", 3, "test"))
+    assert reason == "sender_rate"
+    assert admission.max_links_per_request() == 2
+
+
+def test_admit_sheds_on_backlog(monkeypatch):
+    monkeypatch.setattr(admission, "INGEST_MAX_BACKLOG", 10)
+    monkeypatch.setattr(admission.job_queue, "backlog", AsyncMock(return_value=10))
+    assert asyncio.run(admission.admit("+1", 1, "test"))[0] == "backlog"
+
+
+def test_bulk_backlog_does_not_shed_interactive_links(monkeypatch):
+    monkeypatch.setattr(admission, "INGEST_MAX_BACKLOG", 5)
+    monkeypatch.setattr(admission, "INGEST_MAX_BULK_BACKLOG", 10)
+    # 8 paced bulk jobs queued, nothing else
+    monkeypatch.setattr(admission.job_queue, "backlog", AsyncMock(side_effect=lambda bulk=None, **_: 8 if bulk else 0))
+    assert asyncio.run(admission.admit("+1", 1, "twilio")) is None
+    # A bulk import is charged per link against the bulk backlog
+    assert asyncio.run(admission.admit_bulk("web:1", 2)) is None
+    assert asyncio.run(admission.admit_bulk("web:2", 3))[0] == "backlog"
+
+
+@patch("routers.links.enqueue_link", new_callable=AsyncMock)
+@patch("routers.links.insert_link", new_callable=AsyncMock)
+def test_manual_api_returns_429(mock_insert, mock_enqueue):
+    for _ in range(2):
+        assert client.post("/links/", json={"url": "https://example.com/a"}).status_code == 200
+    resp = client.post("/links/", json={"url": "https://example.com/a"})
+    assert resp.status_code == 429
+    assert int(resp.headers["retry-after"]) >= 1
+
+
+@patch("routers.webhook.enqueue_link", new_callable=AsyncMock)
+@patch("routers.webhook.send_whatsapp_message", new_callable=AsyncMock)
+@patch("routers.webhook.insert_link", new_callable=AsyncMock)
+def test_webhook_replies_politely_once(mock_insert, mock_send, mock_enqueue):
+    data = {"From": "whatsapp:+15550001111", "Body": "https://example.com/x"}
+    for _ in range(2):
+        client.post("/webhook/twilio", data=data)
+    assert mock_insert.call_count == 2
+
+    mock_send.reset_mock()
+    for _ in range(3):
+        assert client.post("/webhook/twilio", data=data).status_code == 200
+    assert mock_insert.call_count == 2
+    assert mock_send.call_count == 1
+    assert mock_send.call_args.args[1] == admission.RATE_LIMIT_REPLY
+
+
+@patch("routers.webhook.enqueue_link", new_callable=AsyncMock)
+@patch("routers.webhook.send_whatsapp_message", new_callable=AsyncMock)
+@patch("routers.webhook.insert_link", new_callable=AsyncMock)
+def test_oversized_message_saves_only_a_bucketful(mock_insert, mock_send, mock_enqueue):
+    body = " ".join(f"https://example.com/{i}" for i in range(5))
+    client.post("/webhook/twilio", data={"From": "whatsapp:+15550002222", "Body": body})
+    assert mock_insert.call_count == 2
+    assert "other 3" in mock_send.call_args.args[1]
+    # the bucket is now empty, so packing links can't bypass the limit
+    client.post("/webhook/twilio", data={"From": "whatsapp:+15550002222", "Body": body})
+    assert mock_insert.call_count == 2
+
+
+@patch("routers.links.enqueue_links", new_callable=AsyncMock)
+@patch("routers.links.insert_links", new_callable=AsyncMock)
+def test_bulk_import_is_throttled(mock_insert, mock_enqueue):
+    payload = {"urls": ["https://example.com/a", "https://example.com/b"]}
+    assert client.post("/links/bulk", json=payload).status_code == 200
+    resp = client.post("/links/bulk", json=payload)
+    assert resp.status_code == 429
+    assert int(resp.headers["retry-after"]) >= 1
+    assert mock_insert.call_count == 1
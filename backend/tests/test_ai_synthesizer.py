@@ -0,0 +1,128 @@
+"""Tests for AI provider routing: circuit breakers and hedged requests."""
+import asyncio
+import time
+import pytest
+
+from models.link import AIResult, Category
+from services import ai_synthesizer
+from services.circuit_breaker import CircuitBreaker, OPEN, HALF_OPEN, CLOSED
+
+
+def _result(title: str) -> AIResult:
+    return AIResult(title=title, summary="s", category=Category.other, tags=["t"])
+
+
+class FakeProvider:
+    """Provider stand-in with injectable latency and failures."""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, raw_text: str, url: str) -> AIResult:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return _result(self.name)
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    fakes = {"openai": FakeProvider("openai"), "gemini": FakeProvider("gemini")}
+    monkeypatch.setattr(ai_synthesizer, "PROVIDERS", fakes)
+    monkeypatch.setattr(ai_synthesizer, "_breakers", {
+        name: CircuitBreaker(name, min_calls=3, cooldown_seconds=0.2) for name in fakes
+    })
+    monkeypatch.setattr(ai_synthesizer, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(ai_synthesizer, "OPENAI_API_KEY", "k")
+    monkeypatch.setattr(ai_synthesizer, "GEMINI_API_KEY", "k")
+    monkeypatch.setattr(ai_synthesizer, "AI_HEDGE", False)
+    return fakes
+
+
+def test_falls_back_to_secondary_on_error(providers):
+    providers["openai"].fail = True
+    assert asyncio.run(ai_synthesizer.synthesize("text", "https://x.com")).title == "gemini"
+
+
+def test_open_breaker_skips_provider(providers):
+    providers["openai"].fail = True
+    for _ in range(3):
+        asyncio.run(ai_synthesizer.synthesize("text", "https://x.com"))
+    assert ai_synthesizer._breakers["openai"].state == OPEN
+
+    providers["openai"].delay = 5  # would stall if it were still called
+    start = time.monotonic()
+    assert asyncio.run(ai_synthesizer.synthesize("text", "https://x.com")).title == "gemini"
+    assert time.monotonic() - start < 0.5
+    assert providers["openai"].calls == 3
+
+
+def test_breaker_half_open_then_recovers(providers):
+    breaker = ai_synthesizer._breakers["openai"]
+    for _ in range(3):
+        breaker.record(False, 0.01)
+    assert breaker.state == OPEN
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+    assert asyncio.run(ai_synthesizer.synthesize("text", "https://x.com")).title == "openai"
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through(providers):
+    breaker = ai_synthesizer._breakers["openai"]
+    for _ in range(3):
+        breaker.record(False, 0.01)
+    time.sleep(0.25)
+    providers["openai"].delay = 0.2
+
+    async def burst():
+        return await asyncio.gather(*(ai_synthesizer.synthesize("text", "https://x.com") for _ in range(4)))
+
+    titles = [r.title for r in asyncio.run(burst())]
+    assert providers["openai"].calls == 1
+    assert sorted(titles) == ["gemini", "gemini", "gemini", "openai"]
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = CircuitBreaker("probe", min_calls=1, cooldown_seconds=0)
+    breaker.record(False, 0.01)
+    assert breaker.try_acquire() and not breaker.available()
+    breaker.release()
+    assert breaker.available() and breaker.state == HALF_OPEN
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("slow", min_calls=3, slow_call_seconds=1)
+    for _ in range(3):
+        breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_hedge_takes_faster_secondary(providers, monkeypatch):
+    monkeypatch.setattr(ai_synthesizer, "AI_HEDGE", True)
+    monkeypatch.setattr(ai_synthesizer, "AI_HEDGE_DELAY_SECONDS", 0.05)
+    providers["openai"].delay = 2
+    providers["gemini"].delay = 0.05
+    start = time.monotonic()
+    result = asyncio.run(ai_synthesizer.synthesize("text", "https://x.com"))
+    assert result.title == "gemini"
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedge_not_started_when_primary_is_fast(providers, monkeypatch):
+    monkeypatch.setattr(ai_synthesizer, "AI_HEDGE", True)
+    monkeypatch.setattr(ai_synthesizer, "AI_HEDGE_DELAY_SECONDS", 0.5)
+    assert asyncio.run(ai_synthesizer.synthesize("text", "https://x.com")).title == "openai"
+    assert providers["gemini"].calls == 0
+
+
+def test_hard_fallback_when_all_down(providers):
+    providers["openai"].fail = True
+    providers["gemini"].fail = True
+    result = asyncio.run(ai_synthesizer.synthesize("text", "https://x.com"))
+    assert result.tags == ["unprocessed"]
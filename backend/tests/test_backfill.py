@@ -0,0 +1,116 @@
+"""Tests for the re-enrichment backfill runner."""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from models.link import AIResult, Category
+from services import backfill
+
+LINKS = [
+    {"id": f"id-{i:02d}", "raw_url": f"https://example.com/{i}", "source": "web",
+     "title": f"Title {i}", "created_at": f"2024-01-{i + 1:02d}T00:00:00", "processed": True}
+    for i in range(10)
+]
+
+
+@pytest.fixture(autouse=True)
+def fake_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "BACKFILL_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(backfill, "BACKFILL_PAGE_SIZE", 3)
+
+    async def scan_links(after=None, limit=500, **filters):
+        rows = [l for l in LINKS if after is None or (l["created_at"], l["id"]) > tuple(after)]
+        return rows[:limit]
+
+    monkeypatch.setattr(backfill, "scan_links", scan_links)
+    monkeypatch.setattr(backfill, "count_links", AsyncMock(return_value=len(LINKS)))
+    monkeypatch.setattr(backfill, "update_link", AsyncMock(return_value={"id": "x"}))
+    monkeypatch.setattr(backfill, "synthesize", AsyncMock(return_value=AIResult(
+        title="New", summary="s", category=Category.coding, tags=["t"],
+    )))
+    monkeypatch.setattr(backfill, "scrape", AsyncMock(return_value={
+        "raw_text": "Fresh article body", "thumbnail_url": "", "author": "",
+    }))
+
+
+def test_synthesize_only_run_completes():
+    runner = backfill.BackfillRunner(name="all", stages=("synthesize",), rpm=0)
+    result = asyncio.run(runner.run())
+    assert result["status"] == "completed"
+    assert result["done"] == len(LINKS)
+    assert backfill.synthesize.call_count == len(LINKS)
+
+
+def test_synthesize_only_uses_scraped_source_text():
+    runner = backfill.BackfillRunner(name="src", stages=("synthesize",), rpm=0)
+    asyncio.run(runner.run())
+    assert backfill.synthesize.call_args.args[0] == "Fresh article body"
+    update = backfill.update_link.call_args.args[1]
+    assert "thumbnail_url" not in update and "author" not in update
+
+
+def test_synthesize_only_fails_link_when_source_is_gone(monkeypatch):
+    monkeypatch.setattr(backfill, "scrape", AsyncMock(return_value={"error": "404", "raw_text": "x"}))
+    runner = backfill.BackfillRunner(name="gone", stages=("synthesize",), rpm=0)
+    result = asyncio.run(runner.run())
+    assert result["failed"] == len(LINKS)
+    backfill.synthesize.assert_not_called()
+
+
+def test_progress_is_frozen_once_finished():
+    runner = backfill.BackfillRunner(name="frozen", stages=("synthesize",), rpm=0)
+    result = asyncio.run(runner.run())
+    assert runner.progress()["elapsed_seconds"] == result["elapsed_seconds"]
+    assert runner._t_end
+
+
+def test_resumes_from_checkpoint(tmp_path):
+    checkpoint = {
+        "name": "resume", "status": "cancelled", "stages": ["synthesize"],
+        "filters": {"since": None, "until": None, "category": None, "processed": None},
+        "cursor": [LINKS[5]["created_at"], LINKS[5]["id"]], "total": 10, "done": 6, "failed": 0,
+        "started_at": "2024-02-01T00:00:00", "until_cutoff": "2099-01-01T00:00:00",
+    }
+    (tmp_path / "resume.json").write_text(json.dumps(checkpoint))
+
+    runner = backfill.BackfillRunner(name="resume", stages=("synthesize",), rpm=0)
+    result = asyncio.run(runner.run())
+    assert backfill.synthesize.call_count == 4
+    assert result["done"] == 10
+
+
+def test_rejects_unknown_stage():
+    with pytest.raises(ValueError):
+        backfill.BackfillRunner(stages=("translate",))
+
+
+def test_admin_endpoints_fail_closed_without_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+    from routers import admin
+
+    client = TestClient(app)
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "")
+    assert client.get("/admin/backfill").status_code == 403
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/backfill", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+
+def test_mismatched_checkpoint_is_a_400(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+    from routers import admin
+
+    checkpoint = {
+        "name": "mismatch", "status": "cancelled", "stages": ["scrape"],
+        "filters": {"since": None, "until": None, "category": "Coding", "processed": None},
+        "cursor": None, "total": 10, "done": 0, "failed": 0, "started_at": None,
+    }
+    (tmp_path / "mismatch.json").write_text(json.dumps(checkpoint))
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    resp = TestClient(app).post(
+        "/admin/backfill", json={"name": "mismatch", "stages": ["synthesize"]}, headers={"X-Admin-Token": "secret"}
+    )
+    assert resp.status_code == 400
+    assert "different options" in resp.json()["detail"]
@@ -0,0 +1,84 @@
+"""Tests for the local offline classifier tier."""
+import asyncio
+import pytest
+
+from services import classifier
+
+TRAINING = (
+    [{"raw_url": f"https://blog.dev/{i}", "title": "Python async tutorial", "summary": "Learn asyncio and coroutines in python code",
+      "category": "Coding", "tags": ["python", "asyncio"]} for i in range(15)]
+    + [{"raw_url": f"https://eats.example/{i}", "title": "Easy pasta recipe", "summary": "Cook garlic pasta with tomato sauce for dinner",
+        "category": "Food", "tags": ["recipe", "pasta"]} for i in range(15)]
+    + [{"raw_url": "https://x.example/", "title": "Saved Content", "summary": "AI synthesis unavailable.",
+        "category": "Other", "tags": ["unprocessed"]}] * 10
+)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    trained = classifier._train_sync(TRAINING)
+    monkeypatch.setattr(classifier, "_model", trained)
+    return trained
+
+
+def test_domain_prior_without_training(monkeypatch):
+    monkeypatch.setattr(classifier, "_model", None)
+    result, confidence = classifier.predict("https://github.com/psf/requests", "")
+    assert result.category == "Coding"
+    assert confidence >= 0.9
+    assert result.title == "github.com"
+
+
+def test_placeholder_results_are_not_trained_on(model):
+    assert model.trained_on == 30
+
+
+def test_predicts_category_and_tags_from_text(model):
+    result, confidence = classifier.predict(
+        "https://someblog.example/post", "A weeknight pasta recipe with garlic and tomato sauce.", "Pasta night"
+    )
+    assert result.category == "Food"
+    assert "pasta" in result.tags
+    assert result.title == "Pasta night"
+    assert 0 < confidence <= 1
+
+
+def test_too_little_data_keeps_priors_only():
+    assert classifier._train_sync(TRAINING[:5]) is None
+
+
+@pytest.mark.parametrize("policy,confidence,text,expected", [
+    ("off", 0.99, "x" * 200, False),
+    ("fallback", 0.99, "x" * 200, False),
+    ("always", 0.1, "x" * 200, True),
+    ("confident", 0.99, "x" * 200, True),
+    ("confident", 0.5, "x" * 200, False),
+    ("confident", 0.5, "short", True),  # low-value: nothing for the LLM to read
+])
+def test_policy(monkeypatch, policy, confidence, text, expected):
+    monkeypatch.setattr(classifier, "LOCAL_CLASSIFIER_POLICY", policy)
+    assert classifier.handles_alone(confidence, text, "https://example.com") is expected
+
+
+def test_sheds_load_when_llm_saturated(monkeypatch):
+    monkeypatch.setattr(classifier, "LOCAL_CLASSIFIER_POLICY", "confident")
+    monkeypatch.setattr(classifier, "AI_MAX_IN_FLIGHT", 2)
+    monkeypatch.setattr(classifier, "in_flight", lambda stage: 2)
+    assert classifier.handles_alone(0.5, "x" * 200, "https://example.com")
+
+
+def test_trains_on_newest_links(monkeypatch):
+    rows = [{"id": f"id-{i:02d}", "created_at": f"2024-01-{i + 1:02d}T00:00:00", "processed": True} for i in range(20)]
+
+    async def scan_links(after=None, limit=500, newest_first=False, **filters):
+        ordered = sorted(rows, key=lambda l: (l["created_at"], l["id"]), reverse=newest_first)
+        if after:
+            ordered = [l for l in ordered if ((l["created_at"], l["id"]) < tuple(after)) == newest_first]
+        return ordered[:limit]
+
+    seen = []
+    monkeypatch.setattr(classifier, "scan_links", scan_links)
+    monkeypatch.setattr(classifier, "LOCAL_CLASSIFIER_TRAIN_LIMIT", 5)
+    monkeypatch.setattr(classifier, "_train_sync", lambda batch: seen.extend(batch))
+    asyncio.run(classifier.train_from_store())
+    assert [r["id"] for r in seen] == ["id-19", "id-18", "id-17", "id-16", "id-15"]
@@ -0,0 +1,120 @@
+"""Tests for the durable enrichment job queue."""
+import asyncio
+import pytest
+from services import job_queue
+from services.rate_limit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_queue, "_conn", None)
+    monkeypatch.setattr(job_queue, "JOB_BACKOFF_BASE", 0)
+    yield
+    if job_queue._conn is not None:
+        job_queue._conn.close()
+
+
+def test_enqueue_is_idempotent_per_link():
+    asyncio.run(job_queue.enqueue_link("a", "https://example.com", "web", "+1"))
+    asyncio.run(job_queue.enqueue_link("a", "https://example.com", "web", "+1"))
+    assert asyncio.run(job_queue.queue_stats()) == {"pending": 1}
+
+
+def test_interactive_jobs_claimed_before_bulk():
+    asyncio.run(job_queue.enqueue_links([{"id": "bulk", "raw_url": "https://a.com", "source": "web"}]))
+    asyncio.run(job_queue.enqueue_link("chat", "https://b.com", "web", "+1"))
+    assert job_queue._claim_sync()["link_id"] == "chat"
+
+
+def test_failures_retry_then_give_up(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    asyncio.run(job_queue.enqueue_link("a", "https://example.com", "web", ""))
+
+    job = job_queue._claim_sync()
+    assert job["attempts"] == 1
+    assert job_queue._fail_sync("a", job["attempts"], "boom") == "pending"
+
+    job = job_queue._claim_sync()
+    assert job["attempts"] == 2
+    assert job_queue._fail_sync("a", job["attempts"], "boom") == "failed"
+    assert job_queue._claim_sync() is None
+
+
+def test_interrupted_jobs_are_reset_on_startup():
+    asyncio.run(job_queue.enqueue_link("a", "https://example.com", "web", ""))
+    job_queue._claim_sync()  # process "crashes" while holding the lease
+    assert job_queue._claim_sync() is None
+    assert job_queue._reset_running_sync() == 1
+    assert job_queue._claim_sync()["link_id"] == "a"
+
+
+def test_worker_completes_jobs():
+    seen = []
+
+    async def handler(job):
+        seen.append(job["link_id"])
+
+    async def run():
+        await job_queue.enqueue_link("a", "https://example.com", "web", "")
+        job_queue.start_workers(handler, count=1)
+        await asyncio.sleep(0.2)
+        await job_queue.stop_workers()
+
+    asyncio.run(run())
+    assert seen == ["a"]
+    assert asyncio.run(job_queue.queue_stats()) == {}
+
+
+def test_bulk_jobs_wait_for_a_bulk_slot():
+    asyncio.run(job_queue.enqueue_links([{"id": "bulk", "raw_url": "https://a.com", "source": "web"}]))
+    assert job_queue._claim_sync(include_bulk=False) is None
+    assert job_queue._claim_sync(include_bulk=True)["link_id"] == "bulk"
+
+
+def test_bulk_pacing_does_not_hold_back_interactive_jobs():
+    asyncio.run(job_queue.enqueue_link("chat", "https://b.com", "web", "+1"))
+    assert job_queue._claim_sync(include_bulk=False)["link_id"] == "chat"
+
+
+def test_bulk_limiter_hands_out_one_slot_per_interval():
+    limiter = RateLimiter(60)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert 0 < limiter.wait_time() <= 1.0
+
+
+def test_bulk_slot_only_spent_on_bulk_jobs():
+    async def run():
+        limiter, lock = RateLimiter(60), asyncio.Lock()
+        await job_queue.enqueue_links([{"id": f"bulk-{i}", "raw_url": "https://a.com", "source": "web"} for i in range(2)])
+        await job_queue.enqueue_link("chat", "https://b.com", "web", "+1")
+        assert (await job_queue._claim(limiter, lock))["link_id"] == "chat"
+        assert limiter.wait_time() == 0
+        assert (await job_queue._claim(limiter, lock))["link_id"].startswith("bulk-")
+        assert limiter.wait_time() > 0
+        assert await job_queue._claim(limiter, lock) is None
+    asyncio.run(run())
+
+
+def test_recover_pages_through_every_unprocessed_link(monkeypatch):
+    from db import supabase_client as db
+    monkeypatch.setattr(job_queue, "RECOVERY_PAGE_SIZE", 2)
+    asyncio.run(db.insert_links([
+        {"id": f"orphan-{i}", "raw_url": f"https://example.com/o/{i}", "source": "web", "processed": False}
+        for i in range(5)
+    ]))
+    unprocessed = len(asyncio.run(db.scan_links(processed=False, limit=10_000)))
+    assert unprocessed >= 5
+    assert asyncio.run(job_queue.recover()) == unprocessed
+    assert asyncio.run(job_queue.queue_stats()) == {"pending": unprocessed}
+
+
+def test_backlog_splits_bulk_from_interactive():
+    async def run():
+        await job_queue.enqueue_links([{"id": f"bulk-{i}", "raw_url": "https://a.com", "source": "web"} for i in range(3)])
+        await job_queue.enqueue_link("chat", "https://b.com", "web", "+1")
+        assert await job_queue.backlog(max_age=0) == 4
+        assert await job_queue.backlog(max_age=0, bulk=True) == 3
+        assert await job_queue.backlog(max_age=0, bulk=False) == 1
+    asyncio.run(run())
@@ -0,0 +1,235 @@
+"""Tests for the links router."""
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+with (
+    patch("db.supabase_client.get_supabase"),
+    patch("services.whatsapp.TwilioClient"),
+):
+    from main import app
+
+app.state.broadcast = AsyncMock()
+client = TestClient(app)
+
+
+@patch("routers.links.enqueue_links", new_callable=AsyncMock)
+@patch("routers.links.insert_links", new_callable=AsyncMock)
+def test_bulk_dedupes_and_chunks(mock_insert, mock_enqueue):
+    urls = [f"https://example.com/{i}" for i in range(1200)]
+    resp = client.post("/links/bulk", json={
+        "urls": urls,
+        "text": "dupes: https://example.com/1 https://www.instagram.com/p/ABC/?utm_source=x",
+    })
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["inserted"] == 1201
+    assert mock_insert.call_count == 3  # 500 + 500 + 201
+    assert mock_enqueue.call_count == 3
+
+
+@patch("services.admission.admit_bulk", new_callable=AsyncMock, return_value=None)
+@patch("routers.links.enqueue_links", new_callable=AsyncMock)
+def test_bulk_retry_skips_saved_links(mock_enqueue, mock_admit):
+    urls = [f"https://example.com/retry/{i}" for i in range(5)]
+    first = client.post("/links/bulk", json={"urls": urls[:3]}).json()
+    assert first["inserted"] == 3 and first["existing"] == 0
+    again = client.post("/links/bulk", json={"urls": urls}).json()
+    assert again["inserted"] == 2 and again["existing"] == 3
+    assert client.post("/links/bulk", json={"urls": urls}).json()["inserted"] == 0
+    assert sum(len(call.args[0]) for call in mock_enqueue.call_args_list) == 5
+
+
+def test_bulk_no_urls():
+    resp = client.post("/links/bulk", json={"text": "nothing to see here"})
+    assert resp.status_code == 400
+
+
+def test_list_etag_and_not_modified():
+    from services.response_cache import links_cache
+    links_cache.clear()
+    first = client.get("/links/", params={"limit": 5})
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    with patch("routers.links.get_links", new_callable=AsyncMock) as mock_get:
+        resp = client.get("/links/", params={"limit": 5}, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert not mock_get.called  # served from cache, no DB query
+
+
+def test_cache_invalidated_by_writes():
+    import asyncio
+    from db import supabase_client as db
+    from services.response_cache import links_cache
+    links_cache.clear()
+    link_id = client.get("/links/", params={"limit": 1}).json()["links"][0]["id"]
+    etag = client.get(f"/links/{link_id}").headers["etag"]
+
+    asyncio.run(db.update_link(link_id, {"title": "Renamed"}))
+    resp = client.get(f"/links/{link_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["title"] == "Renamed"
+    assert resp.headers["etag"] != etag
+
+    list_etag = client.get("/links/", params={"limit": 1}).headers["etag"]
+    asyncio.run(db.insert_link({"id": "cache-test", "raw_url": "https://example.com/new", "source": "web"}))
+    resp = client.get("/links/", params={"limit": 1}, headers={"If-None-Match": list_etag})
+    assert resp.status_code == 200
+    assert resp.json()["links"][0]["id"] == "cache-test"
+    asyncio.run(db.delete_link("cache-test"))
+    assert client.get("/links/cache-test").status_code == 404
+
+
+def test_fields_projection():
+    resp = client.get("/links/", params={"limit": 3, "fields": "title,thumbnail_url"})
+    assert resp.status_code == 200
+    for link in resp.json()["links"]:
+        assert set(link) == {"id", "title", "thumbnail_url"}
+    assert client.get("/links/", params={"fields": "title,password"}).status_code == 400
+
+
+def test_list_compressed_when_accepted():
+    from services.response_cache import links_cache
+    links_cache.clear()
+    resp = client.get("/links/", params={"limit": 40}, headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.headers["etag"].endswith('-gzip"')
+    assert len(resp.json()["links"]) > 0
+
+    again = client.get("/links/", params={"limit": 40}, headers={
+        "Accept-Encoding": "gzip", "If-None-Match": resp.headers["etag"],
+    })
+    assert again.status_code == 304
+
+    plain = client.get("/links/", params={"limit": 40}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == resp.json()
+
+
+def test_choose_encoding_honours_q_values():
+    from services.responses import choose_encoding
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert choose_encoding(None) is None
+
+
+def test_change_feed_incremental(monkeypatch):
+    import asyncio
+    import routers.links as links_router
+    from db import supabase_client as db
+    monkeypatch.setattr(links_router, "CHANGES_SETTLE_SECONDS", 0)
+
+    token, pages = None, 0
+    while True:  # full sync
+        body = client.get("/links/changes", params={"since": token, "limit": 25} if token else {"limit": 25}).json()
+        token, pages = body["next"], pages + 1
+        if not body["has_more"]:
+            break
+    assert pages >= 2
+
+    asyncio.run(db.insert_link({"id": "feed-new", "raw_url": "https://example.com/feed", "source": "web"}))
+    victim = client.get("/links/", params={"limit": 1, "offset": 5}).json()["links"][0]["id"]
+    assert client.delete(f"/links/{victim}").status_code == 200
+
+    body = client.get("/links/changes", params={"since": token}).json()
+    assert [l["id"] for l in body["upserts"]] == ["feed-new"]
+    assert body["deletes"] == [victim]
+    assert not body["has_more"]
+    assert client.get(f"/links/{victim}").status_code == 404
+
+    body = client.get("/links/changes", params={"since": body["next"]}).json()
+    assert body["upserts"] == [] and body["deletes"] == []
+
+
+def test_change_feed_bad_tokens():
+    import base64
+    assert client.get("/links/changes", params={"since": "%%%"}).status_code == 400
+    old = base64.urlsafe_b64encode(b"2001-01-01T00:00:00|x").decode().rstrip("=")
+    assert client.get("/links/changes", params={"since": old}).status_code == 410
+    bad = base64.urlsafe_b64encode(b"2001-01-01T00:00:00|x|yesterday").decode().rstrip("=")
+    assert client.get("/links/changes", params={"since": bad}).status_code == 400
+    stale = base64.urlsafe_b64encode(b"2099-01-01T00:00:00|x|2001-01-01T00:00:00").decode().rstrip("=")
+    assert client.get("/links/changes", params={"since": stale}).status_code == 410
+
+
+def test_full_sync_pages_through_rows_older_than_retention(monkeypatch):
+    import asyncio
+    from datetime import datetime, timedelta
+    import routers.links as links_router
+    from db import supabase_client as db
+    monkeypatch.setattr(links_router, "CHANGES_SETTLE_SECONDS", 0)
+    monkeypatch.setattr(db, "_demo_store", [])
+    db.rebuild_sender_index()
+    old = (datetime.utcnow() - timedelta(days=90)).isoformat()
+    asyncio.run(db.insert_links([
+        {"id": f"old-{i}", "raw_url": f"https://example.com/old/{i}", "source": "web",
+         "created_at": old, "updated_at": old}
+        for i in range(5)
+    ]))
+
+    seen, token = [], None
+    while True:
+        resp = client.get("/links/changes", params={"limit": 3, **({"since": token} if token else {})})
+        assert resp.status_code == 200
+        body = resp.json()
+        seen += [l["id"] for l in body["upserts"]]
+        token = body["next"]
+        if not body["has_more"]:
+            break
+    assert sorted(seen) == [f"old-{i}" for i in range(5)]
+
+
+def test_change_feed_cutoff_from_store_clock(monkeypatch):
+    import base64
+    import routers.links as links_router
+    # The database hands back an offset-aware timestamp; it must round-trip as a token
+    db_now = "2099-01-01T00:00:00.123456+00:00"
+    monkeypatch.setattr(links_router, "get_change_cutoff", AsyncMock(return_value=db_now))
+    monkeypatch.setattr(links_router, "get_changes", AsyncMock(return_value=[]))
+    body = client.get("/links/changes").json()
+    assert base64.urlsafe_b64decode(body["next"] + "==").decode() == f"{db_now}||{db_now}"
+    assert client.get("/links/changes", params={"since": body["next"]}).status_code == 200
+    links_router.get_change_cutoff.assert_awaited_with(links_router.CHANGES_SETTLE_SECONDS)
+
+
+def test_updated_at_backfilled_before_default():
+    from db.supabase_client import MIGRATION_SQL
+    add = MIGRATION_SQL.index("ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;")
+    backfill = MIGRATION_SQL.index("UPDATE links SET updated_at = created_at")
+    default = MIGRATION_SQL.index("ALTER COLUMN updated_at SET DEFAULT NOW()")
+    assert add < backfill < default
+
+
+def test_sender_scoped_reads():
+    import asyncio
+    from db import supabase_client as db
+    me = "whatsapp:+15550009999"
+    asyncio.run(db.insert_links([
+        {"id": f"mine-{i}", "raw_url": f"https://example.com/mine/{i}", "source": "web",
+         "sender_phone": me, "processed": True, "category": "Coding", "title": f"Mine {i}",
+         "created_at": "2020-01-0%dT00:00:00" % (i + 1)}
+        for i in range(3)
+    ]))
+    body = client.get("/links/", params={"sender": me}).json()
+    assert [l["id"] for l in body["links"]] == ["mine-2", "mine-1", "mine-0"]
+    assert client.get("/links/", params={"sender": me, "category": "Design"}).json()["count"] == 0
+
+    assert client.get("/links/roulette", params={"sender": me}).json()["id"].startswith("mine-")
+    export = client.get("/export/markdown", params={"sender": me}).text
+    assert "Exported 3 links" in export and "Mine 1" in export
+
+    assert client.delete("/links/mine-1").status_code == 200
+    assert client.get("/links/", params={"sender": me}).json()["count"] == 2
+    asyncio.run(db.update_link("mine-0", {"title": "Renamed"}))
+    titles = {l["title"] for l in client.get("/links/", params={"sender": me}).json()["links"]}
+    assert titles == {"Mine 2", "Renamed"}
+
+    # Re-assigning a link moves it between sender buckets
+    other = "whatsapp:+15550008888"
+    asyncio.run(db.update_link("mine-0", {"sender_phone": other}))
+    assert [l["id"] for l in client.get("/links/", params={"sender": me}).json()["links"]] == ["mine-2"]
+    assert [l["id"] for l in client.get("/links/", params={"sender": other}).json()["links"]] == ["mine-0"]
+    # An empty sender means "everyone", as on Supabase and SQLite
+    assert client.get("/links/", params={"sender": ""}).json()["count"] == client.get("/links/").json()["count"]
@@ -0,0 +1,35 @@
+"""Tests for the Prometheus metrics module and the /metrics endpoint."""
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+with (
+    patch("db.supabase_client.get_supabase"),
+    patch("services.whatsapp.TwilioClient"),
+):
+    from main import app
+
+from services import metrics
+
+app.state.broadcast = AsyncMock()
+client = TestClient(app)
+
+
+def test_metrics_exposition():
+    client.get("/links/")  # touch the data layer
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'social_saver_stage_latency_seconds_count{stage="db"' in resp.text
+    assert "social_saver_ws_connections" in resp.text
+
+
+def test_histogram_value_above_top_bucket():
+    hist = metrics.Histogram("test_overflow_seconds", "test", buckets=(1, 5))
+    metrics._registry.remove(hist)
+    hist.observe(100)
+    hist.observe(0.5)
+    lines = hist.render()
+    assert 'test_overflow_seconds_bucket{le="5"} 1' in lines
+    assert 'test_overflow_seconds_bucket{le="+Inf"} 2' in lines
+    assert "test_overflow_seconds_sum 100.5" in lines
+    assert "test_overflow_seconds_count 2" in lines
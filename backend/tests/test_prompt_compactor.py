@@ -0,0 +1,68 @@
+"""Tests for extractive prompt compaction."""
+from services.prompt_compactor import compact_text, estimate_tokens
+
+ARTICLE = "\n".join([
+    "How Rust's borrow checker prevents data races",
+    "Accept all cookies",
+    "Skip to main content",
+    "Subscribe to our newsletter",
+    "The borrow checker enforces that references never outlive the data they point to.",
+    "Rust's ownership rules mean the borrow checker can reject data races at compile time.",
+    "Our office has a nice coffee machine.",
+    "Mutable references are exclusive, so the borrow checker stops two threads writing the same data.",
+    "The borrow checker enforces that references never outlive the data they point to.",
+] + [f"Lorem{i} ipsum{i} dolor{i} sit{i} amet{i} consectetur{i}." for i in range(40)])
+
+
+def test_short_text_is_only_cleaned():
+    text = "Title\nAccept all cookies\nA short post about sourdough."
+    assert compact_text(text, token_budget=500) == "Title\nA short post about sourdough."
+
+
+def test_removes_boilerplate_and_duplicates():
+    out = compact_text(ARTICLE, token_budget=100)
+    assert "cookies" not in out.lower()
+    assert "newsletter" not in out.lower()
+    assert out.count("never outlive") == 1
+
+
+def test_fits_budget_and_keeps_title_and_key_sentences():
+    out = compact_text(ARTICLE, token_budget=60)
+    assert estimate_tokens(out) <= 60
+    assert out.startswith("How Rust's borrow checker")
+    assert "compile time" in out
+    assert "coffee machine" not in out
+
+
+def test_single_long_line_is_not_truncated_blindly():
+    text = " ".join(["Filler words here."] * 200 + ["Quantum error correction uses surface codes and surface codes scale."])
+    out = compact_text(text, token_budget=50)
+    assert estimate_tokens(out) <= 50
+    assert out and all(line in text for line in out.splitlines())
+
+
+def test_unpunctuated_text_is_cut_not_dropped():
+    text = " ".join(f"word{i}" for i in range(1000))
+    out = compact_text(text, token_budget=50)
+    assert out and estimate_tokens(out) <= 50
+    assert text.startswith(out)
+
+
+def test_run_on_body_is_kept_after_title():
+    body = " ".join(f"clause{i} about tidal energy" for i in range(200))
+    out = compact_text("Title\n" + body, token_budget=50)
+    assert estimate_tokens(out) <= 50
+    head, rest = out.split("\n")
+    assert head == "Title" and rest and rest in body
+
+
+def test_boilerplate_matches_whole_lines_only():
+    text = "\n".join([
+        "Bank security",
+        "How to log in to your bank safely and avoid phishing",
+        "Log in",
+        "Home | About | Subscribe",
+        "© 2024 Example Media. All rights reserved.",
+        "We use cookies to improve your experience.",
+    ])
+    assert compact_text(text) == "Bank security\nHow to log in to your bank safely and avoid phishing"
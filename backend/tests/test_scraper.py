@@ -0,0 +1,98 @@
+"""Tests for the web scraper: fast <head> extraction and capped streaming downloads."""
+import asyncio
+import httpx
+from unittest.mock import AsyncMock
+from services import scraper, http_clients
+from services.scraper import extract_head_meta, _needs_full_extraction
+
+HEAD = """<html><head>
+<title>Fallback &amp; Title</title>
+<meta property="og:title" content="OG Title">
+<meta property="og:description" content="{desc}">
+<meta name="description" content="plain description">
+<meta property="og:image" content="https://cdn.example.com/img.jpg">
+<meta name="author" content="Ada Lovelace">
+</head><body><p>{body}</p><meta property="og:image" content="https://late.example.com/x.jpg"></body></html>"""
+
+
+def test_reads_og_tags_from_head():
+    meta = extract_head_meta(HEAD.format(desc="A long description", body="text"))
+    assert meta == {
+        "title": "OG Title",
+        "description": "A long description",
+        "thumbnail_url": "https://cdn.example.com/img.jpg",
+        "author": "Ada Lovelace",
+    }
+
+
+def test_stops_at_body():
+    html = HEAD.format(desc="d", body="x" * 100_000).replace('<meta property="og:image" content="https://cdn.example.com/img.jpg">', "")
+    assert extract_head_meta(html)["thumbnail_url"] == ""
+
+
+def test_title_tag_fallback_and_entities():
+    meta = extract_head_meta("<html><head><title> Fish &amp; Chips </title></head><body></body></html>")
+    assert meta["title"] == "Fish & Chips"
+
+
+def test_full_extraction_only_when_head_is_thin():
+    assert _needs_full_extraction({"title": "T", "description": "short"})
+    assert not _needs_full_extraction({"title": "T", "description": "x" * 200})
+    assert _needs_full_extraction({"title": "", "description": "x" * 200})
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.sent += len(chunk)
+            yield chunk
+
+
+def _serve(monkeypatch, content_type, chunks):
+    stream = _CountingStream(chunks)
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"content-type": content_type}, stream=stream)
+    )
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(http_clients.httpx, "AsyncClient", lambda **kw: real_client(transport=transport, **kw))
+    return stream
+
+
+def test_pdf_body_is_never_downloaded(monkeypatch):
+    stream = _serve(monkeypatch, "application/pdf", [b"%PDF" * 1000] * 100)
+    result = asyncio.run(scraper.scrape_web("https://example.com/papers/attention-is-all_you-need.pdf"))
+    assert stream.sent == 0
+    assert result["title"] == "attention is all you need"
+    assert result["raw_text"].startswith("PDF document")
+
+
+def test_download_stops_once_head_is_enough(monkeypatch):
+    head = HEAD.format(desc="x" * 200, body="").split("<body>")[0].encode() + b"<body>"
+    stream = _serve(monkeypatch, "text/html; charset=utf-8", [head] + [b"<p>filler</p>" * 1000] * 50)
+    result = asyncio.run(scraper.scrape_web("https://example.com/article"))
+    assert result["title"] == "OG Title"
+    assert stream.sent < 20_000
+
+
+def test_download_is_byte_capped(monkeypatch):
+    monkeypatch.setattr(scraper, "SCRAPE_MAX_BYTES", 50_000)
+    monkeypatch.setattr(scraper, "extract_article_off_loop", AsyncMock(return_value={"raw_text": "body"}))
+    stream = _serve(monkeypatch, "text/html", [b"<html><head></head><body>" + b"<p>x</p>" * 2000] * 100)
+    asyncio.run(scraper.scrape_web("https://example.com/huge"))
+    html = scraper.extract_article_off_loop.call_args.args[1]
+    assert len(html) == 50_000
+    assert stream.sent < 100_000
+
+
+def test_clients_are_shared_within_a_loop():
+    async def two_lookups():
+        return http_clients.get_client("web"), http_clients.get_client("web")
+
+    first, again = asyncio.run(two_lookups())
+    assert first is again
+    other, _ = asyncio.run(two_lookups())
+    assert other is not first  # a new event loop gets its own pool
@@ -0,0 +1,129 @@
+"""Tests for the SQLite storage backend, through the db.supabase_client API."""
+import asyncio
+import pytest
+
+from db import supabase_client as db
+from db import sqlite_store
+
+
+@pytest.fixture(autouse=True)
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(sqlite_store, "SQLITE_PATH", str(tmp_path / "links.db"))
+    yield
+    sqlite_store.shutdown()
+
+
+def _row(i: int, **extra) -> dict:
+    return {
+        "id": f"id-{i:03d}",
+        "raw_url": f"https://example.com/{i}",
+        "source": "web",
+        "sender_phone": "+1" if i % 2 else "+2",
+        "created_at": f"2024-01-01T00:00:{i:02d}",
+        **extra,
+    }
+
+
+def test_round_trip_and_types():
+    async def run():
+        await db.insert_link(_row(1, tags=["a", "b"], category="Coding", processed=True))
+        link = await db.get_link_by_id("id-001")
+        assert link["tags"] == ["a", "b"] and link["processed"] is True
+        updated = await db.update_link("id-001", {"title": "Hello", "tags": ["c"]})
+        assert updated["title"] == "Hello" and updated["tags"] == ["c"]
+        assert updated["updated_at"] > updated["created_at"]
+        assert db.storage_backend() == "sqlite"
+    asyncio.run(run())
+
+
+def test_queries_filters_and_projection():
+    async def run():
+        await db.insert_links([_row(i, category="Coding" if i < 5 else "Design", processed=i % 3 == 0) for i in range(10)])
+        newest = await db.get_links(limit=3)
+        assert [l["id"] for l in newest] == ["id-009", "id-008", "id-007"]
+        mine = await db.get_links(sender="+1", category="Design", fields=["id", "title"])
+        assert [set(l) for l in mine] == [{"id", "title"}] * 3
+        assert await db.count_links(processed=True) == 4
+        page = await db.scan_links(after=("2024-01-01T00:00:04", "id-004"), limit=2)
+        assert [l["id"] for l in page] == ["id-005", "id-006"]
+        page = await db.scan_links(after=("2024-01-01T00:00:04", "id-004"), limit=2, newest_first=True)
+        assert [l["id"] for l in page] == ["id-003", "id-002"]
+        assert len(await db.scan_links(processed=False)) == 6
+        assert len(await db.get_forgotten_gems(days_ago=1, sender="+2")) == 2  # id-000, id-006
+    asyncio.run(run())
+
+
+def test_soft_delete_and_change_feed():
+    async def run():
+        await db.insert_links([_row(i) for i in range(3)])
+        assert await db.delete_link("id-001")
+        assert not await db.delete_link("id-001")
+        assert await db.get_link_by_id("id-001") is None
+        assert await db.update_link("id-001", {"title": "ghost"}) == {}
+        changes = await db.get_changes(after=("2024-01-01T00:00:02", "id-002"))
+        assert [(c["id"], bool(c["deleted_at"])) for c in changes] == [("id-001", True)]
+        assert await db.purge_tombstones("9999") == 1
+    asyncio.run(run())
+
+
+def test_concurrent_writes_group_commit(monkeypatch):
+    batch_sizes = []
+    run_batch = sqlite_store._Writer._run_batch
+
+    def spy(conn, batch):
+        batch_sizes.append(len(batch))
+        run_batch(conn, batch)
+    monkeypatch.setattr(sqlite_store._Writer, "_run_batch", staticmethod(spy))
+
+    async def run():
+        await asyncio.gather(*(db.insert_link(_row(i)) for i in range(50)))
+        # Several writes shared one transaction
+        assert sum(batch_sizes) == 50 and len(batch_sizes) < 50 and max(batch_sizes) > 1
+        # A failing write (duplicate id) doesn't roll back the others in its batch
+        results = await asyncio.gather(
+            db.insert_link(_row(0)), db.insert_link(_row(60)), return_exceptions=True
+        )
+        assert isinstance(results[0], Exception) and results[1]["id"] == "id-060"
+        assert await db.count_links() == 51
+    asyncio.run(run())
+
+
+def test_writer_open_failure_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_store, "SQLITE_PATH", str(tmp_path / "missing" / "links.db"))
+    with pytest.raises(Exception):
+        asyncio.run(asyncio.wait_for(db.insert_link(_row(1)), timeout=5))
+    assert sqlite_store._writer is None
+
+
+def test_existing_urls():
+    async def run():
+        await db.insert_links([_row(i) for i in range(3)])
+        await db.delete_link("id-001")
+        urls = [f"https://example.com/{i}" for i in range(5)]
+        assert await db.get_existing_urls(urls) == {"https://example.com/0", "https://example.com/2"}
+    asyncio.run(run())
+
+
+def test_durable_across_restart():
+    asyncio.run(db.insert_link(_row(7)))
+    sqlite_store.shutdown()
+    assert asyncio.run(db.get_link_by_id("id-007"))["raw_url"] == "https://example.com/7"
+
+
+def test_older_files_gain_new_columns(tmp_path):
+    import sqlite3
+    old = sqlite3.connect(sqlite_store.SQLITE_PATH)
+    old.execute(
+        "CREATE TABLE links (id TEXT PRIMARY KEY, raw_url TEXT NOT NULL, source TEXT NOT NULL DEFAULT 'unknown', "
+        "title TEXT, summary TEXT, category TEXT, tags TEXT NOT NULL DEFAULT '[]', thumbnail_url TEXT, author TEXT, "
+        "sender_phone TEXT, processed INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL, "
+        "updated_at TEXT NOT NULL, deleted_at TEXT)"
+    )
+    old.close()
+
+    async def run():
+        await db.insert_link(_row(1, thumbnail_url="/thumbs/" + "a" * 32, thumbnail_source="https://cdn.example.com/a.jpg"))
+        assert await db.get_thumbnail_source("a" * 32) == "https://cdn.example.com/a.jpg"
+        assert await db.get_thumbnail_source("b" * 32) is None
+    asyncio.run(run())
@@ -0,0 +1,118 @@
+"""Tests for the thumbnail proxy cache."""
+import asyncio
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+with (
+    patch("db.supabase_client.get_supabase"),
+    patch("services.whatsapp.TwilioClient"),
+):
+    from main import app
+
+from services import thumbnails
+
+client = TestClient(app)
+
+GIF = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnails, "_store", thumbnails._Store(str(tmp_path), 10 * 1024 * 1024))
+    monkeypatch.setattr(thumbnails, "_by_url", OrderedDict())
+    monkeypatch.setattr(thumbnails, "_pillow_available", False)
+
+
+def test_fetched_once_and_served_immutable(monkeypatch):
+    download = AsyncMock(return_value=(GIF, "image/gif"))
+    monkeypatch.setattr(thumbnails, "_download", download)
+
+    url = asyncio.run(thumbnails.cache_thumbnail("https://cdn.example.com/a.gif"))
+    again = asyncio.run(thumbnails.cache_thumbnail("https://cdn.example.com/a.gif"))
+    assert url == again and "/thumbs/" in url
+    assert download.call_count == 1
+
+    resp = client.get("/thumbs/" + url.rsplit("/", 1)[-1], params={"w": 320})
+    assert resp.status_code == 200
+    assert resp.content == GIF
+    assert resp.headers["content-type"] == "image/gif"
+    assert "immutable" in resp.headers["cache-control"]
+
+
+def test_same_image_stored_once(monkeypatch):
+    monkeypatch.setattr(thumbnails, "_download", AsyncMock(return_value=(GIF, "image/gif")))
+    a = asyncio.run(thumbnails.cache_thumbnail("https://cdn-a.example.com/x.gif"))
+    b = asyncio.run(thumbnails.cache_thumbnail("https://cdn-b.example.com/y.gif?sig=123"))
+    assert a == b
+    assert len(thumbnails._store._entries) == 1
+
+
+def test_storage_errors_do_not_fail_the_link(monkeypatch):
+    monkeypatch.setattr(thumbnails, "_download", AsyncMock(return_value=(GIF, "image/gif")))
+
+    def disk_full(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(thumbnails._store, "add", disk_full)
+    assert asyncio.run(thumbnails.cache_thumbnail("https://cdn.example.com/a.gif")) is None
+
+
+def test_evicted_image_is_refetched_from_source(monkeypatch, tmp_path, demo_store):
+    download = AsyncMock(return_value=(GIF, "image/gif"))
+    monkeypatch.setattr(thumbnails, "_download", download)
+    source = "https://cdn.example.com/evicted.gif"
+    path = asyncio.run(thumbnails.cache_thumbnail(source))
+    assert path.startswith("/thumbs/")
+    demo_store.insert(0, {"id": "thumb-link", "raw_url": "https://example.com", "source": "web",
+                          "thumbnail_url": path, "thumbnail_source": source})
+
+    # evicted: empty cache, URL → hash map forgotten
+    monkeypatch.setattr(thumbnails, "_store", thumbnails._Store(str(tmp_path / "empty"), 10 * 1024 * 1024))
+    monkeypatch.setattr(thumbnails, "_by_url", OrderedDict())
+    resp = client.get(path)
+    assert resp.status_code == 200 and resp.content == GIF
+    assert download.call_count == 2
+
+    # source now serves a different image: send the client to the source instead
+    monkeypatch.setattr(thumbnails, "_store", thumbnails._Store(str(tmp_path / "empty2"), 10 * 1024 * 1024))
+    monkeypatch.setattr(thumbnails, "_by_url", OrderedDict())
+    download.return_value = (GIF + b"changed", "image/gif")
+    resp = client.get(path, follow_redirects=False)
+    assert resp.status_code == 302 and resp.headers["location"] == source
+
+
+def test_lru_eviction(tmp_path):
+    store = thumbnails._Store(str(tmp_path / "lru"), max_bytes=250)
+    for digest in ("a" * 32, "b" * 32):
+        store.add(digest, {"original.gif": b"x" * 100})
+    store.touch("a" * 32, str(tmp_path / "lru" / ("a" * 32) / "original.gif"))
+    store.add("c" * 32, {"original.gif": b"x" * 100})
+    assert ("b" * 32) not in store  # least recently used
+    assert ("a" * 32) in store and ("c" * 32) in store
+    assert not (tmp_path / "lru" / ("b" * 32)).exists()
+
+
+def test_non_image_and_unknown_hash(monkeypatch):
+    monkeypatch.setattr(thumbnails, "_download", AsyncMock(return_value=None))
+    assert asyncio.run(thumbnails.cache_thumbnail("https://example.com/page.html")) is None
+    assert asyncio.run(thumbnails.cache_thumbnail("")) is None
+    assert client.get("/thumbs/" + "0" * 32).status_code == 404
+    assert client.get("/thumbs/..%2F..%2Fetc").status_code == 404
+
+
+def test_resized_variants_picked_by_width(monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    import io
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 800), (200, 10, 10)).save(buf, "JPEG")
+    monkeypatch.setattr(thumbnails, "_pillow_available", True)
+    monkeypatch.setattr(thumbnails, "_download", AsyncMock(return_value=(buf.getvalue(), "image/jpeg")))
+
+    digest = asyncio.run(thumbnails.cache_thumbnail("https://cdn.example.com/big.jpg")).rsplit("/", 1)[-1]
+    for w, expected in ((100, 160), (300, 320), (2000, 640)):
+        resp = client.get(f"/thumbs/{digest}", params={"w": w})
+        assert resp.headers["content-type"] == "image/jpeg"
+        assert Image.open(io.BytesIO(resp.content)).width == expected
@@ -0,0 +1,67 @@
+"""Tests for the warm-start phase and the /ready probe."""
+import asyncio
+from fastapi.testclient import TestClient
+
+from main import app
+from db import sqlite_store
+from services import job_queue, metrics, thumbnails, warmup
+
+
+def test_failing_step_does_not_block_startup(monkeypatch):
+    ran = []
+
+    async def broken():
+        raise RuntimeError("no credentials")
+
+    async def ok():
+        ran.append("ok")
+
+    monkeypatch.setattr(warmup, "STEPS", {"clients": broken, "parsers": ok})
+    timings = asyncio.run(warmup.warm_up())
+    assert set(timings) == {"clients", "parsers"}
+    assert ran == ["ok"]
+
+
+def test_ready_reports_503_until_started(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(app.state, "ready", False)
+    resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert resp.json() == {"status": "starting"}
+
+    monkeypatch.setattr(app.state, "ready", True)
+    monkeypatch.setattr(app.state, "startup_seconds", 1.5, raising=False)
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.json()["startup_seconds"] == 1.5
+    assert client.get("/health").status_code == 200
+
+
+def test_lifespan_reports_ready_after_warm_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_queue, "_conn", None)
+    monkeypatch.setattr(sqlite_store, "SQLITE_PATH", str(tmp_path / "links.db"))
+    monkeypatch.setattr(thumbnails, "THUMBS_DIR", str(tmp_path / "thumbs"))
+    monkeypatch.setattr(app.state, "ready", False)
+    monkeypatch.setattr(metrics.STARTUP_SECONDS, "_values", {})
+    seen = []
+
+    async def probe():
+        # Still inside startup: the probe must keep the worker out of rotation
+        seen.append(TestClient(app).get("/ready").status_code)
+    monkeypatch.setattr(warmup, "STEPS", {**warmup.STEPS, "probe": probe})
+
+    assert TestClient(app).get("/ready").status_code == 503
+    try:
+        with TestClient(app) as client:
+            assert seen == [503]
+            resp = client.get("/ready")
+            assert resp.status_code == 200
+            assert resp.json()["startup_seconds"] > 0
+            text = client.get("/metrics").text
+            assert 'social_saver_startup_seconds{phase="total"}' in text
+            assert 'social_saver_startup_seconds{phase="probe"}' in text
+        assert app.state.ready is False
+    finally:
+        if job_queue._conn is not None:
+            job_queue._conn.close()
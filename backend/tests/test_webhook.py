@@ -10,6 +10,7 @@ with (
 ):
     from main import app
 
+app.state.broadcast = AsyncMock()
 client = TestClient(app)
 
 
@@ -38,10 +39,10 @@ def test_twilio_webhook_no_url(mock_insert, mock_send):
     assert mock_insert.call_count == 0
 
 
-@patch("routers.webhook.process_link_pipeline", new_callable=AsyncMock)
+@patch("routers.webhook.enqueue_link", new_callable=AsyncMock)
 @patch("routers.webhook.send_whatsapp_message", new_callable=AsyncMock)
 @patch("routers.webhook.insert_link", new_callable=AsyncMock, return_value={"id": "test-id"})
-def test_twilio_webhook_with_url(mock_insert, mock_send, mock_pipeline):
+def test_twilio_webhook_with_url(mock_insert, mock_send, mock_enqueue):
     """Should insert link and send ACK when URL is included."""
     mock_send.return_value = True
     resp = client.post(
@@ -53,6 +54,7 @@ def test_twilio_webhook_with_url(mock_insert, mock_send, mock_pipeline):
     )
     assert resp.status_code == 200
     assert mock_insert.called
+    assert mock_enqueue.called
 
 
 def test_meta_verify_valid_token():
@@ -72,3 +74,115 @@ def test_meta_verify_invalid_token():
         "hub.mode": "subscribe",
     })
     assert resp.status_code == 403
+
+
+def _meta_delivery(*messages_per_change):
+    return {"object": "whatsapp_business_account", "entry": [
+        {"id": f"entry-{i}", "changes": [{"field": "messages", "value": {"messages": msgs}}]}
+        for i, msgs in enumerate(messages_per_change)
+    ]}
+
+
+def _meta_msg(msg_id, sender, text):
+    return {"id": msg_id, "from": sender, "type": "text", "text": {"body": text}}
+
+
+@patch("routers.webhook.enqueue_link", new_callable=AsyncMock)
+@patch("routers.webhook.send_whatsapp_message", new_callable=AsyncMock)
+@patch("routers.webhook.insert_link", new_callable=AsyncMock)
+def test_meta_processes_whole_batch_once(mock_insert, mock_send, mock_enqueue):
+    delivery = _meta_delivery(
+        [_meta_msg("wamid.A1", "15550000001", "https://example.com/a1"),
+         _meta_msg("wamid.A2", "15550000001", "https://example.com/a2")],
+        [_meta_msg("wamid.B1", "15550000002", "https://example.com/b1")],
+    )
+    resp = client.post("/webhook/meta", json=delivery)
+    assert resp.json() == {"status": "ok", "messages": {"ok": 3}}
+    assert mock_insert.call_count == 3
+
+    # Meta redelivers the same batch after a timeout
+    resp = client.post("/webhook/meta", json=delivery)
+    assert resp.json() == {"status": "ok", "messages": {"duplicate": 3}}
+    assert mock_insert.call_count == 3
+    assert client.post("/webhook/meta", json={"entry": [{"changes": [{"value": {"statuses": []}}]}]}).json() == {
+        "status": "no messages"
+    }
+
+
+@patch("routers.webhook._ingest_once", new_callable=AsyncMock, side_effect=TypeError("bug downstream"))
+def test_meta_ingest_errors_are_not_parse_errors(mock_ingest):
+    # Malformed payloads are skipped...
+    assert client.post("/webhook/meta", json={"entry": "junk"}).json() == {"status": "no messages"}
+    assert client.post("/webhook/meta", json=_meta_delivery([{"id": "x"}])).json() == {"status": "no messages"}
+    mock_ingest.assert_not_awaited()
+    # ...but an error after parsing surfaces instead of being acknowledged
+    with pytest.raises(TypeError):
+        client.post("/webhook/meta", json=_meta_delivery([_meta_msg("wamid.E1", "15550000003", "hi")]))
+
+
+@patch("routers.webhook.enqueue_link", new_callable=AsyncMock)
+@patch("routers.webhook.send_whatsapp_message", new_callable=AsyncMock)
+@patch("routers.webhook.insert_link", new_callable=AsyncMock)
+def test_twilio_redelivery_is_ignored(mock_insert, mock_send, mock_enqueue):
+    data = {"From": "whatsapp:+15550000003", "Body": "https://example.com/t", "MessageSid": "SM-dedup-1"}
+    assert client.post("/webhook/twilio", data=data).status_code == 200
+    assert client.post("/webhook/twilio", data=data).status_code == 200
+    assert mock_insert.call_count == 1
+    assert mock_send.call_count == 1  # no second ACK either
+
+
+@patch("routers.webhook.send_whatsapp_message", new_callable=AsyncMock)
+@patch("routers.webhook.insert_link", new_callable=AsyncMock, side_effect=RuntimeError("db down"))
+def test_failed_delivery_can_be_retried(mock_insert, mock_send):
+    from services.dedup import webhook_deliveries
+    data = {"From": "whatsapp:+15550000004", "Body": "https://example.com/r", "MessageSid": "SM-retry-1"}
+    with pytest.raises(RuntimeError):
+        client.post("/webhook/twilio", data=data)
+    assert webhook_deliveries.claim("twilio:SM-retry-1")  # released for the retry
+
+
+def test_recent_keys_ttl_and_bound(monkeypatch):
+    from services import dedup
+    now = [0.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+    keys = dedup.RecentKeys(ttl=10, max_keys=2)
+    assert keys.claim("a") and not keys.claim("a")
+    now[0] = 11
+    assert keys.claim("a")  # expired
+    keys.claim("b")
+    keys.claim("c")
+    assert len(keys) == 2 and keys.claim("a")  # oldest evicted beyond max_keys
+
+
+@patch("routers.webhook.update_link", new_callable=AsyncMock)
+@patch("routers.webhook.scrape", new_callable=AsyncMock, return_value={
+    "raw_text": "body", "thumbnail_url": "https://cdn.example.com/a.jpg",
+})
+def test_failed_pipeline_cancels_thumbnail_download(mock_scrape, mock_update, monkeypatch):
+    import asyncio
+    import routers.webhook as webhook
+    from services import classifier, thumbnails
+    cancelled = []
+
+    async def failing_synthesize(*args, **kwargs):
+        await asyncio.sleep(0.01)  # the download is under way by now
+        raise RuntimeError("llm down")
+
+    async def slow_download(url):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+
+    monkeypatch.setattr(thumbnails, "cache_thumbnail", slow_download)
+    monkeypatch.setattr(webhook, "synthesize", failing_synthesize)
+    monkeypatch.setattr(classifier, "enabled", lambda: False)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await webhook.process_link_pipeline("id", "https://example.com", "web", "", AsyncMock())
+        # Cancelled by the pipeline itself, not by asyncio.run tearing the loop down
+        assert cancelled == ["https://cdn.example.com/a.jpg"]
+    asyncio.run(run())
+    mock_update.assert_awaited_with("id", {"processed": False})